@@ -0,0 +1,148 @@
+"""
+Session AMI (Asterisk Manager Interface) unique partagée par tous les appels
+Pré-remplit le numéro de l'appelant à partir des événements VarSet / Newchannel
+"""
+import logging
+from typing import Optional
+
+from panoramisk import Manager as AMIManager
+
+import config
+from db_utils import sanitize_string, TTLCache
+
+logger = logging.getLogger(__name__)
+
+CALLER_VARIABLE_PREFIX = "CALLER_"
+
+
+class CallerIdDirectory:
+    """
+    Annuaire UNIQUEID -> numéro de l'appelant alimenté par une session AMI persistante
+
+    Le dialplan exécute, avant AudioSocket :
+        Set(GLOBAL(CALLER_${UNIQUEID})=${CALLERID(num)})
+    Asterisk publie alors un événement VarSet que l'on reçoit avant le
+    handshake AudioSocket : handle_call résout le numéro en mémoire, sans
+    aller-retour AMI. Les événements Newchannel (CallerIDNum) servent de
+    seconde source. Un Getvar sur la même session reste possible en secours.
+    """
+
+    def __init__(self, ttl: float = config.AMI_CALLERID_TTL, max_entries: int = config.AMI_CALLERID_MAX_ENTRIES):
+        self._by_variable = TTLCache(ttl, max_entries)  # CALLER_<UNIQUEID> (VarSet)
+        self._by_channel = TTLCache(ttl, max_entries)   # Uniqueid (Newchannel)
+        self.manager: Optional[AMIManager] = None
+        self.stats = {'hits': 0, 'fallbacks': 0, 'misses': 0}
+
+    def start(self):
+        """Ouvre la session AMI (reconnexion automatique par panoramisk)"""
+        if self.manager is not None:
+            return
+
+        logger.info(f"Connecting to Asterisk AMI at {config.AMI_HOST}:{config.AMI_PORT}")
+        self.manager = AMIManager(
+            host=config.AMI_HOST,
+            port=config.AMI_PORT,
+            username=config.AMI_USERNAME,
+            secret=config.AMI_SECRET,
+            ping_delay=10,
+            ping_timeout=5,
+            on_login=self._on_login
+        )
+        self.manager.register_event('VarSet', self._on_varset)
+        self.manager.register_event('Newchannel', self._on_newchannel)
+        self.manager.connect()
+
+    @staticmethod
+    def _on_login(manager):
+        logger.info("✓ AMI session connected (caller-ID events subscribed)")
+
+    def _on_varset(self, manager, message):
+        variable = message.get('Variable') or ''
+        if not variable.startswith(CALLER_VARIABLE_PREFIX):
+            return
+
+        uniqueid = variable[len(CALLER_VARIABLE_PREFIX):]
+        phone_number = sanitize_string(message.get('Value') or '')
+        if uniqueid and phone_number:
+            self._by_variable.set(uniqueid, phone_number)
+
+    def _on_newchannel(self, manager, message):
+        uniqueid = message.get('Uniqueid')
+        phone_number = sanitize_string(message.get('CallerIDNum') or '')
+        # "<unknown>" / vide : pas de numéro exploitable
+        if uniqueid and phone_number and phone_number.lstrip('+').isdigit():
+            self._by_channel.set(uniqueid, phone_number)
+
+    def lookup(self, uniqueid: str) -> Optional[str]:
+        """Résolution en mémoire (aucune I/O)"""
+        return self._by_variable.get(uniqueid) or self._by_channel.get(uniqueid)
+
+    async def resolve(self, uniqueid: str, call_id: Optional[str] = None) -> Optional[str]:
+        """
+        Résout le numéro de l'appelant : mémoire, puis Getvar sur la session partagée
+
+        Args:
+            uniqueid: L'UNIQUEID de l'appel Asterisk (identifiant du handshake)
+            call_id: Identifiant pour les logs (défaut: uniqueid)
+
+        Returns:
+            Le numéro de téléphone (str) ou None si non trouvé
+        """
+        call_id = call_id or uniqueid
+
+        phone_number = self.lookup(uniqueid)
+        if phone_number:
+            self.stats['hits'] += 1
+            logger.info(f"[{call_id}] CALLERID resolved from AMI events: {phone_number}")
+            return phone_number
+
+        self.stats['fallbacks'] += 1
+        phone_number = await self._getvar(uniqueid, call_id)
+        if phone_number:
+            self._by_variable.set(uniqueid, phone_number)
+        else:
+            self.stats['misses'] += 1
+        return phone_number
+
+    async def _getvar(self, uniqueid: str, call_id: str) -> Optional[str]:
+        """Getvar CALLER_<UNIQUEID> via la session partagée (secours si l'événement a été manqué)"""
+        if self.manager is None or not self.manager.authenticated:
+            logger.warning(f"[{call_id}] AMI session not ready - cannot fetch CALLERID")
+            return None
+
+        variable_name = f'{CALLER_VARIABLE_PREFIX}{uniqueid}'
+        logger.info(f"[{call_id}] Fetching global variable '{variable_name}' via AMI")
+
+        try:
+            response = await self.manager.send_action({
+                'Action': 'Getvar',
+                'Variable': variable_name
+            })
+        except Exception as e:
+            logger.error(f"[{call_id}] Failed to retrieve CALLERID via AMI: {e}")
+            return None
+
+        value = getattr(response, 'Value', None) if response else None
+        if value:
+            # SÉCURITÉ : Nettoyer les octets nuls des données AMI
+            phone_number = sanitize_string(value)
+            logger.info(f"[{call_id}] CALLERID retrieved via AMI: {phone_number}")
+            return phone_number
+
+        logger.warning(
+            f"[{call_id}] Could not retrieve phone number from AMI. "
+            f"Make sure Asterisk dialplan sets: Set(GLOBAL(CALLER_${{UNIQUEID}})=${{CALLERID(num)}})"
+        )
+        return None
+
+    def forget(self, uniqueid: str):
+        """Libère l'entrée d'un appel terminé"""
+        self._by_variable.pop(uniqueid)
+        self._by_channel.pop(uniqueid)
+
+    def close(self):
+        """Ferme la session AMI"""
+        if self.manager is not None:
+            self.manager.close()
+            self.manager = None
+            logger.info(f"✓ AMI session closed (caller-ID stats: {self.stats})")
@@ -3,14 +3,25 @@ Audio Utilities - Fonctions CPU-bound pour conversion audio
 Ces fonctions seront exécutées dans le ProcessPoolExecutor
 """
 import io
+import os
+import json
+import mmap
+import struct
+import time
+import asyncio
 import subprocess
 import threading
+from collections import deque
 from pydub import AudioSegment
 from pydub.effects import normalize
 import numpy as np
-from typing import Optional
+from typing import Optional, Callable, Iterable, AsyncIterator, Dict
+from pathlib import Path
+from concurrent.futures import Executor
 import logging
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,27 +67,184 @@ def convert_24khz_to_8khz(audio_data_24khz: bytes, input_format: str = "mp3") ->
         return b'\x00\x00' * 8000
 
 
+# Commande FFmpeg de décodage MP3 (stdin) -> PCM 8kHz 16-bit mono (stdout)
+FFMPEG_DECODE_CMD = [
+    "ffmpeg",
+    "-i", "pipe:0",       # Entrée : le stream MP3
+    "-f", "s16le",        # Format de sortie : RAW PCM
+    "-acodec", "pcm_s16le",
+    "-ar", "8000",        # Force le 8kHz pour Asterisk
+    "-ac", "1",           # Mono
+    "-v", "quiet",        # Silence logs
+    "pipe:1"              # Sortie : vers Python
+]
+
+
+class FFmpegDecoderPool:
+    """
+    Pool de processus FFmpeg pré-lancés (chauds) pour le décodage MP3 -> 8kHz
+
+    FFmpeg ne sait pas délimiter plusieurs flux MP3 successifs sur le même pipe :
+    un processus décode donc une seule phrase, puis il est retiré et remplacé en
+    arrière-plan par un processus neuf. Le coût fork/exec + chargement de FFmpeg
+    sort ainsi du chemin critique (time-to-first-audio).
+    """
+
+    def __init__(self, size: int, max_concurrent: int, max_idle_seconds: float):
+        self.size = size
+        self.max_idle_seconds = max_idle_seconds
+        self._idle: deque = deque()  # (process, spawned_at)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._refilling = False
+        self._closed = False
+
+    @staticmethod
+    def _spawn() -> subprocess.Popen:
+        return subprocess.Popen(
+            FFMPEG_DECODE_CMD,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=4096
+        )
+
+    @staticmethod
+    def _discard(process: subprocess.Popen):
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+    def acquire(self) -> subprocess.Popen:
+        """
+        Récupère un décodeur prêt (chaud si disponible, sinon lancé à froid).
+        Bloque si le nombre maximal de décodages simultanés est atteint.
+        """
+        self._slots.acquire()
+        start_time = time.monotonic()
+        process = None
+
+        try:
+            with self._lock:
+                while self._idle:
+                    candidate, _ = self._idle.popleft()
+                    if candidate.poll() is None:
+                        process = candidate
+                        break
+                    # Processus mort pendant l'attente : on le recycle
+                    self._discard(candidate)
+
+            source = "warm" if process else "spawn"
+            if process is None:
+                process = self._spawn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        try:
+            metrics.track_decoder_acquire(source, time.monotonic() - start_time, len(self._idle))
+        except Exception as e:
+            logger.debug(f"Failed to track decoder acquire: {e}")
+
+        self._schedule_refill()
+        return process
+
+    def release(self, process: subprocess.Popen):
+        """Rend le créneau de décodage (le processus, à usage unique, est terminé)"""
+        try:
+            self._discard(process)
+        finally:
+            self._slots.release()
+
+    def maintain(self):
+        """Health check : recycle les décodeurs morts ou trop anciens, puis complète le pool"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            alive = deque()
+            for process, spawned_at in self._idle:
+                if process.poll() is not None or now - spawned_at > self.max_idle_seconds:
+                    expired.append(process)
+                else:
+                    alive.append((process, spawned_at))
+            self._idle = alive
+
+        for process in expired:
+            self._discard(process)
+        if expired:
+            logger.debug(f"FFmpeg pool: recycled {len(expired)} idle decoder(s)")
+
+        self._refill()
+
+    def _schedule_refill(self):
+        with self._lock:
+            if self._refilling or self._closed:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="ffmpeg-pool-refill", daemon=True).start()
+
+    def _refill(self):
+        try:
+            while not self._closed:
+                with self._lock:
+                    if len(self._idle) >= self.size:
+                        break
+                process = self._spawn()
+                with self._lock:
+                    self._idle.append((process, time.monotonic()))
+        except Exception as e:
+            logger.error(f"FFmpeg pool refill failed: {e}")
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def shutdown(self):
+        """Termine tous les décodeurs en attente"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+        for process, _ in idle:
+            self._discard(process)
+
+
+_decoder_pool: Optional[FFmpegDecoderPool] = None
+
+
+def init_decoder_pool(size: int, max_concurrent: int, max_idle_seconds: float = 300.0) -> FFmpegDecoderPool:
+    """Initialise le pool de décodeurs FFmpeg au démarrage du serveur"""
+    global _decoder_pool
+
+    _decoder_pool = FFmpegDecoderPool(size, max_concurrent, max_idle_seconds)
+    _decoder_pool.maintain()
+    logger.info(f"✓ FFmpeg decoder pool ready ({size} warm decoders, max {max_concurrent} concurrent)")
+    return _decoder_pool
+
+
+def get_decoder_pool() -> Optional[FFmpegDecoderPool]:
+    """Retourne le pool de décodeurs s'il a été initialisé"""
+    return _decoder_pool
+
+
+def close_decoder_pool():
+    """Arrête le pool de décodeurs FFmpeg"""
+    global _decoder_pool
+
+    if _decoder_pool:
+        _decoder_pool.shutdown()
+        _decoder_pool = None
+
+
 def stream_and_convert_to_8khz(audio_stream_iterator):
     """
     Convertit le flux MP3 d'ElevenLabs en PCM 8kHz à la volée via FFmpeg.
+    Utilise un décodeur chaud du pool s'il est initialisé.
     """
-    import subprocess
-    import threading
-
-    # 1. On lance FFmpeg en mode "Tube" (Pipe)
-    cmd = [
-        "ffmpeg",
-        "-i", "pipe:0",       # Entrée : le stream MP3
-        "-f", "s16le",        # Format de sortie : RAW PCM
-        "-acodec", "pcm_s16le",
-        "-ar", "8000",        # Force le 8kHz pour Asterisk
-        "-ac", "1",           # Mono
-        "-v", "quiet",        # Silence logs
-        "pipe:1"              # Sortie : vers Python
-    ]
+    pool = _decoder_pool
 
+    # 1. On récupère FFmpeg en mode "Tube" (Pipe)
     try:
-        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=4096)
+        process = pool.acquire() if pool else subprocess.Popen(
+            FFMPEG_DECODE_CMD, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=4096
+        )
     except FileNotFoundError:
         logger.error("FFmpeg not installed or not found in PATH")
         return
@@ -101,14 +269,288 @@ def stream_and_convert_to_8khz(audio_stream_iterator):
 
     # 3. Lecture de la sortie 8kHz
     chunk_size = 320  # 20ms
-    while True:
-        data = process.stdout.read(chunk_size)
-        if not data:
-            break
-        yield data
-    
-    writer_thread.join()
-    process.wait()
+    try:
+        while True:
+            data = process.stdout.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        # Interruption (barge-in) : le générateur est fermé avant la fin du flux,
+        # on tue FFmpeg pour débloquer le thread d'écriture
+        if process.poll() is None:
+            process.kill()
+        writer_thread.join()
+        if pool:
+            pool.release(process)
+        else:
+            process.wait()
+
+
+async def iterate_in_thread(
+    iterable_factory: Callable[[], Iterable[bytes]],
+    stop_event: threading.Event,
+    executor: Optional[Executor] = None
+) -> AsyncIterator[bytes]:
+    """
+    Consomme un itérateur bloquant (HTTP streaming, pipe FFmpeg) dans un thread
+    et expose ses éléments de façon asynchrone, sans bloquer la boucle d'événements.
+
+    Args:
+        iterable_factory: Fonction créant l'itérateur (appelée dans le thread)
+        stop_event: Event à positionner pour interrompre la production (barge-in)
+        executor: Pool de threads à utiliser (défaut: executor de la boucle)
+
+    Yields:
+        bytes: Éléments produits par l'itérateur, dans l'ordre
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    end_marker = object()
+
+    def publish(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # Boucle fermée (arrêt du serveur)
+            stop_event.set()
+
+    def producer():
+        iterator = None
+        try:
+            iterator = iter(iterable_factory())
+            for item in iterator:
+                if stop_event.is_set():
+                    break
+                publish(item)
+        except Exception as e:
+            publish(e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Error closing stream iterator: {e}")
+            publish(end_marker)
+
+    loop.run_in_executor(executor, producer)
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is end_marker:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Arrête le producteur si le consommateur sort avant la fin du flux
+        stop_event.set()
+
+
+# === Formats TTS natifs (PCM / μ-law) : décodage sans FFmpeg ===
+# Formats ElevenLabs supportés sans FFmpeg -> fréquence d'échantillonnage source
+NATIVE_TTS_FORMATS = {
+    "pcm_16000": 16000,
+    "pcm_24000": 24000,
+    "ulaw_8000": 8000,
+}
+
+
+def _build_ulaw_table() -> np.ndarray:
+    """Table de décodage G.711 μ-law (256 valeurs -> PCM 16-bit)"""
+    u = ~np.arange(256, dtype=np.uint8)
+    exponent = (u >> 4) & 0x07
+    mantissa = (u & 0x0F).astype(np.int32)
+    magnitude = ((mantissa << 3) + 0x84) << exponent
+    samples = np.where(u & 0x80, 0x84 - magnitude, magnitude - 0x84)
+    return samples.astype(np.int16)
+
+
+ULAW_DECODE_TABLE = _build_ulaw_table()
+
+
+def ulaw_to_pcm16(ulaw_data: bytes) -> bytes:
+    """
+    Décode de l'audio μ-law 8kHz en PCM 16-bit (slin16) via table de correspondance
+
+    Args:
+        ulaw_data: Octets μ-law (1 octet par échantillon)
+
+    Returns:
+        bytes: PCM 16-bit Little Endian, même fréquence d'échantillonnage
+    """
+    return ULAW_DECODE_TABLE[np.frombuffer(ulaw_data, dtype=np.uint8)].tobytes()
+
+
+class PCMDecimator:
+    """
+    Rééchantillonneur polyphase streaming (décimation entière) PCM 16-bit -> 8kHz
+
+    Filtre passe-bas FIR (sinc fenêtré) suivi d'une décimation, avec conservation
+    de l'historique du filtre et de la phase entre deux chunks : le résultat est
+    identique à un traitement du flux complet en une fois.
+    """
+
+    def __init__(self, input_rate: int, output_rate: int = 8000, taps: int = 63):
+        if input_rate % output_rate != 0:
+            raise ValueError(f"Unsupported resampling ratio: {input_rate} -> {output_rate}")
+
+        self.factor = input_rate // output_rate
+        cutoff = 0.45 / self.factor  # 0.9 x Nyquist de sortie (normalisé à la fréquence d'entrée)
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+        self._kernel = (kernel / kernel.sum()).astype(np.float32)
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._phase = 0
+        self._carry = b''
+
+    def process(self, data: bytes) -> bytes:
+        """Rééchantillonne un chunk PCM 16-bit (taille quelconque)"""
+        data = self._carry + data
+        usable = len(data) - (len(data) % 2)
+        self._carry = data[usable:]
+        if usable == 0:
+            return b''
+
+        samples = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32)
+        if self.factor == 1:
+            return samples.astype(np.int16).tobytes()
+
+        buffer = np.concatenate((self._history, samples))
+        filtered = np.convolve(buffer, self._kernel, mode='valid')
+        self._history = buffer[-len(self._history):]
+
+        decimated = filtered[self._phase::self.factor]
+        self._phase = (self._phase - len(filtered)) % self.factor
+
+        return np.clip(np.rint(decimated), -32768, 32767).astype(np.int16).tobytes()
+
+
+def _frame_pcm_stream(pcm_chunks: Iterable[bytes], frame_size: int = 320):
+    """Redécoupe un flux PCM en trames de 20ms (la dernière peut être plus courte)"""
+    pending = bytearray()
+    for chunk in pcm_chunks:
+        pending.extend(chunk)
+        while len(pending) >= frame_size:
+            yield bytes(pending[:frame_size])
+            del pending[:frame_size]
+    if pending:
+        yield bytes(pending)
+
+
+def stream_native_to_8khz(audio_stream_iterator, output_format: str):
+    """
+    Convertit un flux TTS natif (pcm_16000, pcm_24000, ulaw_8000) en trames PCM 8kHz
+    directement dans le process (NumPy), sans FFmpeg.
+    """
+    if output_format == "ulaw_8000":
+        pcm_chunks = (ulaw_to_pcm16(chunk) for chunk in audio_stream_iterator if chunk)
+    else:
+        decimator = PCMDecimator(NATIVE_TTS_FORMATS[output_format])
+        pcm_chunks = (decimator.process(chunk) for chunk in audio_stream_iterator if chunk)
+
+    yield from _frame_pcm_stream(pcm_chunks)
+
+
+def stream_tts_to_8khz(audio_stream_iterator, output_format: str):
+    """
+    Convertit un flux TTS ElevenLabs en trames PCM 8kHz selon son format
+
+    Args:
+        audio_stream_iterator: Itérateur de chunks renvoyé par ElevenLabs
+        output_format: Format demandé à ElevenLabs (mp3_44100_128, pcm_16000, ulaw_8000, ...)
+    """
+    if output_format in NATIVE_TTS_FORMATS:
+        return stream_native_to_8khz(audio_stream_iterator, output_format)
+    return stream_and_convert_to_8khz(audio_stream_iterator)
+
+
+def decode_native_tts(audio_data: bytes, output_format: str) -> bytes:
+    """Décode un audio TTS natif complet (pcm/ulaw) en PCM 8kHz 16-bit"""
+    return b''.join(stream_native_to_8khz(iter([audio_data]), output_format))
+
+
+# === Banque de phrases statiques (fichier unique mappé en mémoire) ===
+# Format : MAGIC (4) + version (uint16) + taille index (uint32) + index JSON + données
+# Chaque phrase commence sur un offset multiple de 320 octets et sa dernière trame
+# est complétée par du silence : le serveur sert des trames sans copie ni padding.
+PHRASE_BANK_MAGIC = b"VBPB"
+PHRASE_BANK_VERSION = 1
+PHRASE_BANK_FRAME = 320
+_PHRASE_BANK_HEADER = struct.Struct(">4sHI")
+
+
+def _pad_to_frame(size: int, frame_size: int = PHRASE_BANK_FRAME) -> int:
+    return -size % frame_size
+
+
+def write_phrase_bank(path: Path, phrases: Dict[str, bytes], texts: Dict[str, str]) -> int:
+    """
+    Écrit la banque de phrases (écriture atomique : fichier temporaire + os.replace)
+
+    Args:
+        path: Chemin du fichier banque
+        phrases: Audio RAW 8kHz par clé de phrase
+        texts: Texte source par clé (pour détecter une banque obsolète)
+
+    Returns:
+        int: Taille du fichier écrit (octets)
+    """
+    # Offsets relatifs au début de la zone de données
+    index = {}
+    offset = 0
+    for key, audio in phrases.items():
+        padded_length = len(audio) + _pad_to_frame(len(audio))
+        index[key] = {'offset': offset, 'length': padded_length, 'text': texts.get(key, '')}
+        offset += padded_length
+
+    index_bytes = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    header_size = _PHRASE_BANK_HEADER.size + len(index_bytes)
+    data_start = header_size + _pad_to_frame(header_size)
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(_PHRASE_BANK_HEADER.pack(PHRASE_BANK_MAGIC, PHRASE_BANK_VERSION, len(index_bytes)))
+        f.write(index_bytes)
+        f.write(b'\x00' * (data_start - header_size))
+        for audio in phrases.values():
+            f.write(audio)
+            f.write(b'\x00' * _pad_to_frame(len(audio)))
+    os.replace(tmp_path, path)
+
+    return data_start + offset
+
+
+def open_phrase_bank(path: Path) -> tuple:
+    """
+    Mappe la banque de phrases en mémoire (lecture seule, partagée entre processus)
+
+    Returns:
+        (views, texts): vues memoryview sans copie par clé, et texte source par clé
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, index_length = _PHRASE_BANK_HEADER.unpack_from(mapped, 0)
+    if magic != PHRASE_BANK_MAGIC or version != PHRASE_BANK_VERSION:
+        mapped.close()
+        raise ValueError(f"Invalid phrase bank format: {path}")
+
+    index_start = _PHRASE_BANK_HEADER.size
+    index = json.loads(bytes(mapped[index_start:index_start + index_length]).decode('utf-8'))
+    header_size = index_start + index_length
+    data_start = header_size + _pad_to_frame(header_size)
+
+    # Les vues gardent le mmap vivant tant qu'elles sont référencées
+    buffer = memoryview(mapped)
+    views = {
+        key: buffer[data_start + entry['offset']:data_start + entry['offset'] + entry['length']]
+        for key, entry in index.items()
+    }
+    texts = {key: entry.get('text', '') for key, entry in index.items()}
+    return views, texts
 
 
 def convert_raw_to_mp3(
@@ -232,6 +674,60 @@ def mix_audio(audio_chunks: list[bytes]) -> bytes:
         return b''
 
 
+def trim_silence(audio_data: bytes, threshold: int = 300, margin_ms: int = 20, sample_rate: int = 8000) -> bytes:
+    """
+    Retire le silence en début et fin d'un audio RAW 16-bit (clips de noms à assembler)
+
+    Args:
+        audio_data: Audio en format RAW 8kHz 16-bit
+        threshold: Amplitude en dessous de laquelle un échantillon est considéré silencieux
+        margin_ms: Marge conservée autour de la parole
+
+    Returns:
+        bytes: Audio sans silence aux extrémités
+    """
+    samples = np.frombuffer(audio_data[:len(audio_data) - len(audio_data) % 2], dtype=np.int16)
+    voiced = np.flatnonzero(np.abs(samples.astype(np.int32)) > threshold)
+    if len(voiced) == 0:
+        return audio_data
+
+    margin = int(margin_ms * sample_rate / 1000)
+    start = max(voiced[0] - margin, 0)
+    end = min(voiced[-1] + margin + 1, len(samples))
+    return samples[start:end].tobytes()
+
+
+def splice_audio(segments: list, crossfade_ms: int = 15, sample_rate: int = 8000) -> bytes:
+    """
+    Assemble plusieurs segments RAW 16-bit avec un court fondu enchaîné entre chacun
+    (phrases personnalisées construites à partir de clips pré-générés)
+
+    Args:
+        segments: Liste de segments audio (bytes, memoryview ou mmap) RAW 8kHz 16-bit
+        crossfade_ms: Durée du fondu enchaîné entre deux segments
+
+    Returns:
+        bytes: Audio assemblé
+    """
+    fade = int(crossfade_ms * sample_rate / 1000)
+    output = np.zeros(0, dtype=np.float32)
+
+    for segment in segments:
+        samples = np.frombuffer(segment, dtype=np.int16, count=len(segment) // 2).astype(np.float32)
+        if len(samples) == 0:
+            continue
+
+        overlap = min(fade, len(output), len(samples))
+        if overlap:
+            ramp = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+            output[-overlap:] = output[-overlap:] * (1.0 - ramp) + samples[:overlap] * ramp
+            samples = samples[overlap:]
+
+        output = np.concatenate((output, samples))
+
+    return np.clip(output, -32768, 32767).astype(np.int16).tobytes()
+
+
 def adjust_volume(audio_data: bytes, volume_db: float) -> bytes:
     """
     Ajuste le volume d'un audio RAW
@@ -271,3 +767,25 @@ if __name__ == "__main__":
     # Test de validation
     is_valid = validate_audio_format(silence)
     print(f"Silence is valid: {is_valid}")
+
+    # Benchmark : décodage natif PCM 16kHz (NumPy) vs MP3 + FFmpeg sur un flux factice
+    seconds = 5
+    t = np.arange(16000 * seconds) / 16000
+    tone_16k = (np.sin(2 * np.pi * 440 * t) * 8000).astype(np.int16).tobytes()
+    fake_stream = [tone_16k[i:i + 4096] for i in range(0, len(tone_16k), 4096)]
+
+    start = time.perf_counter()
+    native_pcm = b''.join(stream_native_to_8khz(iter(fake_stream), "pcm_16000"))
+    native_elapsed = time.perf_counter() - start
+    print(f"Native pcm_16000: {len(native_pcm)} bytes in {native_elapsed * 1000:.1f}ms")
+
+    try:
+        mp3_buffer = io.BytesIO()
+        AudioSegment(data=tone_16k, sample_width=2, frame_rate=16000, channels=1).export(mp3_buffer, format="mp3")
+        mp3_data = mp3_buffer.getvalue()
+        start = time.perf_counter()
+        ffmpeg_pcm = b''.join(stream_and_convert_to_8khz(iter([mp3_data[i:i + 4096] for i in range(0, len(mp3_data), 4096)])))
+        ffmpeg_elapsed = time.perf_counter() - start
+        print(f"MP3 + FFmpeg: {len(ffmpeg_pcm)} bytes in {ffmpeg_elapsed * 1000:.1f}ms")
+    except Exception as e:
+        print(f"MP3 + FFmpeg benchmark skipped: {e}")
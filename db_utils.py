@@ -2,11 +2,21 @@
 Utilitaires de base de données PostgreSQL (asyncpg)
 Gestion asynchrone des clients et tickets
 """
+import os
+import json
+import math
+import time
+import uuid
+import asyncio
 import asyncpg
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import date, datetime, timedelta, time as dt_time
+from pathlib import Path
 import config
+import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +72,44 @@ def sanitize_dict(data: Dict) -> Dict:
     return cleaned
 
 
+class TTLCache:
+    """Petit dictionnaire borné dont les entrées expirent après `ttl` secondes (LRU)"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # clé -> (valeur, expiration)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key):
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def purge_expired(self):
+        now = time.monotonic()
+        for key in [k for k, (_, expires_at) in self._entries.items() if expires_at < now]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
 # === Connection Pools (singleton) ===
 _clients_pool: Optional[asyncpg.Pool] = None
 _tickets_pool: Optional[asyncpg.Pool] = None
@@ -127,33 +175,48 @@ async def get_client_info(phone_number: str) -> Optional[Dict]:
         return None
 
     try:
-        async with _clients_pool.acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                SELECT first_name, last_name, box_model
-                FROM clients
-                WHERE phone_number = $1
-                """,
-                phone_number
-            )
-
-            if row:
-                client_info = {
-                    'first_name': row['first_name'],
-                    'last_name': row['last_name'],
-                    'box_model': row['box_model']
-                }
-                logger.info(f"Client found: {client_info['first_name']} {client_info['last_name']}")
-                return client_info
-            else:
-                logger.info(f"Client not found: {phone_number}")
-                return None
-
+        return await _query_client_info([phone_number])
     except Exception as e:
         logger.error(f"Error fetching client info: {e}")
         return None
 
 
+async def _query_client_info(phone_numbers: List[str]) -> Optional[Dict]:
+    """
+    Requête de la fiche client (les erreurs sont propagées à l'appelant)
+
+    Args:
+        phone_numbers: Formes du numéro à chercher, par ordre de préférence
+            (ex: canonique puis brut) : la première fiche trouvée est retenue
+    """
+    if not _clients_pool:
+        raise RuntimeError("Clients pool not initialized")
+
+    async with _clients_pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+            SELECT first_name, last_name, box_model
+            FROM clients
+            WHERE phone_number = ANY($1::text[])
+            ORDER BY array_position($1::text[], phone_number)
+            LIMIT 1
+            """,
+            phone_numbers
+        )
+
+    if row:
+        client_info = {
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'box_model': row['box_model']
+        }
+        logger.info(f"Client found: {client_info['first_name']} {client_info['last_name']}")
+        return client_info
+
+    logger.info(f"Client not found: {', '.join(phone_numbers)}")
+    return None
+
+
 async def create_ticket(call_data: Dict) -> Optional[int]:
     """
     Crée un ticket dans la base de données
@@ -173,6 +236,7 @@ async def create_ticket(call_data: Dict) -> Optional[int]:
             - severity (str): Sévérité (LOW, MEDIUM, HIGH)
             - call_date (date): Date de l'appel (JJ/MM/AAAA)
             - call_time (time): Heure de l'appel (HH:MM:SS)
+            - turn_log (str): Tours de parole sérialisés en JSON (optionnel)
 
     Returns:
         ID du ticket créé ou None si erreur
@@ -195,59 +259,385 @@ async def create_ticket(call_data: Dict) -> Optional[int]:
         ... })
         42
     """
-    if not _tickets_pool:
-        logger.error("Tickets pool not initialized")
-        return None
+    # SÉCURITÉ : Nettoyer toutes les chaînes pour retirer les octets nuls (0x00)
+    # incompatibles avec PostgreSQL UTF-8
+    record = _ticket_record(sanitize_dict(call_data))
+
+    # Écriture différée : le ticket rejoint le prochain lot (COPY), l'ID est
+    # renvoyé une fois le lot écrit (None si la base est indisponible : le
+    # ticket est alors journalisé sur disque et rejoué plus tard)
+    return await ticket_writer.submit(record)
+
+
+# === Écriture différée des tickets (lots COPY + journal disque) ===
+TICKET_COLUMNS = (
+    'call_uuid',
+    'phone_number',
+    'client_name',
+    'client_email',
+    'problem_type',
+    'status',
+    'sentiment',
+    'summary',
+    'duration_seconds',
+    'tag',
+    'severity',
+    'call_date',
+    'call_time',
+    'created_at',
+    'turn_log'
+)
+
+# Insertion idempotente (réécriture ligne par ligne, rejeu du journal)
+_TICKET_INSERT_SQL = f"""
+    INSERT INTO tickets ({', '.join(TICKET_COLUMNS)})
+    VALUES ({', '.join(f'${i}' for i in range(1, len(TICKET_COLUMNS) + 1))})
+    ON CONFLICT (call_uuid) DO NOTHING
+"""
+
+# Erreurs liées aux données d'un ticket (le lot est rejoué ligne par ligne)
+_TICKET_DATA_ERRORS = (asyncpg.IntegrityConstraintViolationError, asyncpg.DataError)
 
-    try:
-        # SÉCURITÉ : Nettoyer toutes les chaînes pour retirer les octets nuls (0x00)
-        # incompatibles avec PostgreSQL UTF-8
-        clean_data = sanitize_dict(call_data)
+
+def _ticket_record(clean_data: Dict) -> Dict:
+    """Ticket complet (valeurs par défaut appliquées) prêt à être inséré"""
+    now = datetime.now()
+    return {
+        'call_uuid': clean_data['call_uuid'],
+        'phone_number': clean_data['phone_number'],
+        'client_name': clean_data.get('client_name'),  # Peut être NULL
+        'client_email': clean_data.get('client_email'),  # Peut être NULL
+        'problem_type': clean_data.get('problem_type', 'unknown'),
+        'status': clean_data.get('status', 'unknown'),
+        'sentiment': clean_data.get('sentiment', 'neutral'),
+        'summary': clean_data.get('summary', 'Aucun résumé disponible'),
+        'duration_seconds': clean_data.get('duration_seconds', 0),
+        'tag': clean_data.get('tag', 'UNKNOWN'),
+        'severity': clean_data.get('severity', 'MEDIUM'),
+        'call_date': clean_data.get('call_date', now.date()),
+        'call_time': clean_data.get('call_time', now.time()),
+        'created_at': clean_data.get('created_at', now),
+        'turn_log': clean_data.get('turn_log')  # JSON des tours de parole (peut être NULL)
+    }
+
+
+def _after_ticket_created(record: Dict, ticket_id: int):
+    """Effets locaux d'un ticket écrit : charge techniciens et cache appelant"""
+    logger.info(f"✓ Ticket created: {ticket_id} (call: {record['call_uuid']}, tag: {record['tag']})")
+
+    if record['status'] == 'transferred':
+        technician_load.record(record['created_at'].timestamp())
+
+    # Cache appelant : le ticket est visible dès le prochain appel du numéro
+    _record_ticket_in_cache(record, ticket_id, record['created_at'])
+
+
+class TicketWriter:
+    """
+    Écriture différée des tickets par lots
+
+    Les fins d'appel déposent leur ticket et attendent un Future ; les tickets
+    sont écrits toutes les TICKET_FLUSH_INTERVAL_MS ou dès TICKET_BATCH_SIZE
+    tickets en attente, avec deux requêtes par lot :
+    1. réservation des IDs (nextval sur la séquence de tickets.id)
+    2. copy_records_to_table (COPY binaire)
+    Une rafale de fins d'appel n'occupe ainsi qu'une connexion du pool.
+
+    Si un ticket du lot est invalide (doublon call_uuid, contrainte), le lot
+    est réécrit ligne par ligne. Si la base est injoignable, le lot est
+    ajouté au journal disque (JSON lines) puis rejoué, sans doublon
+    (ON CONFLICT (call_uuid)), quand la base répond de nouveau.
+    """
+
+    def __init__(
+        self,
+        flush_interval_ms: int = config.TICKET_FLUSH_INTERVAL_MS,
+        batch_size: int = config.TICKET_BATCH_SIZE,
+        journal_path: Path = config.TICKET_JOURNAL_PATH
+    ):
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.journal_path = Path(journal_path)
+        self._pending: List[Tuple[Dict, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._journal_lock: Optional[asyncio.Lock] = None
+        self._journal_dirty = self.journal_path.exists() and self.journal_path.stat().st_size > 0
+        self._last_replay = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, record: Dict) -> Optional[int]:
+        """Ajoute un ticket au prochain lot et attend son ID"""
+        future = asyncio.get_running_loop().create_future()
+
+        if self._task is None:
+            # Pas de tâche d'écriture (outil en ligne de commande) : écriture immédiate
+            await self._write_batch([(record, future)])
+            return future.result()
+
+        self._pending.append((record, future))
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return await future
+
+    def start(self):
+        """Lance la tâche d'écriture (nécessite init_db_pools)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Écrit les tickets en attente (ou les journalise) puis arrête la tâche"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._flush()
+
+    async def _run(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                await self._flush()
+
+                if self._journal_dirty and time.monotonic() - self._last_replay >= config.TICKET_JOURNAL_REPLAY_INTERVAL:
+                    await self.replay_journal()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Ticket writer error: {e}")
+
+    async def _flush(self):
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[Tuple[Dict, asyncio.Future]]):
+        records = [record for record, _ in batch]
+        start_time = time.perf_counter()
+
+        try:
+            ticket_ids = await self._copy_batch(records)
+            created = [True] * len(records)
+            result = 'copy'
+        except _TICKET_DATA_ERRORS as e:
+            logger.warning(f"Ticket batch rejected ({e}), retrying row by row")
+            rows = await self._insert_rows(records)
+            ticket_ids = [ticket_id for ticket_id, _ in rows]
+            created = [inserted for _, inserted in rows]
+            result = 'rows'
+        except Exception as e:
+            logger.error(f"Ticket batch failed ({len(records)} ticket(s)): {e}")
+            await self._spill(records)
+            ticket_ids = [None] * len(records)
+            created = [False] * len(records)
+            result = 'journaled'
+
+        try:
+            metrics.track_ticket_flush(result, len(records), time.perf_counter() - start_time)
+        except Exception as e:
+            logger.debug(f"Failed to track ticket flush: {e}")
+
+        for (record, future), ticket_id, inserted in zip(batch, ticket_ids, created):
+            # Ticket déjà présent (job rejoué) : ses effets ont été appliqués à sa première écriture
+            if ticket_id and inserted:
+                _after_ticket_created(record, ticket_id)
+            if not future.done():
+                future.set_result(ticket_id)
+
+    async def _copy_batch(self, records: List[Dict]) -> List[int]:
+        """Réserve les IDs puis écrit le lot par COPY (une transaction)"""
+        if not _tickets_pool:
+            raise RuntimeError("Tickets pool not initialized")
 
         async with _tickets_pool.acquire() as conn:
-            ticket_id = await conn.fetchval(
-                """
-                INSERT INTO tickets (
-                    call_uuid,
-                    phone_number,
-                    client_name,
-                    client_email,
-                    problem_type,
-                    status,
-                    sentiment,
-                    summary,
-                    duration_seconds,
-                    tag,
-                    severity,
-                    call_date,
-                    call_time,
-                    created_at
+            async with conn.transaction():
+                rows = await conn.fetch(
+                    """
+                    SELECT nextval(pg_get_serial_sequence('tickets', 'id')) AS id
+                    FROM generate_series(1, $1)
+                    """,
+                    len(records)
+                )
+                ticket_ids = [row['id'] for row in rows]
+
+                await conn.copy_records_to_table(
+                    'tickets',
+                    records=[
+                        (ticket_id, *(record[column] for column in TICKET_COLUMNS))
+                        for ticket_id, record in zip(ticket_ids, records)
+                    ],
+                    columns=('id', *TICKET_COLUMNS)
                 )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
-                RETURNING id
-                """,
-                clean_data['call_uuid'],
-                clean_data['phone_number'],
-                clean_data.get('client_name'),  # Peut être NULL
-                clean_data.get('client_email'),  # Peut être NULL
-                clean_data.get('problem_type', 'unknown'),
-                clean_data.get('status', 'unknown'),
-                clean_data.get('sentiment', 'neutral'),
-                clean_data.get('summary', 'Aucun résumé disponible'),
-                clean_data.get('duration_seconds', 0),
-                clean_data.get('tag', 'UNKNOWN'),
-                clean_data.get('severity', 'MEDIUM'),
-                clean_data.get('call_date', datetime.now().date()),
-                clean_data.get('call_time', datetime.now().time()),
-                datetime.now()
-            )
-
-            logger.info(f"✓ Ticket created: {ticket_id} (call: {clean_data['call_uuid']}, tag: {clean_data.get('tag', 'UNKNOWN')})")
-            return ticket_id
 
-    except Exception as e:
-        logger.error(f"Error creating ticket: {e}")
-        return None
+                # Charge techniciens des autres processus (NOTIFY livré au commit)
+                for record in records:
+                    if record['status'] == 'transferred':
+                        await technician_load.notify(conn, record['created_at'].timestamp())
+
+        return ticket_ids
+
+    async def _insert_rows(self, records: List[Dict]) -> List[Tuple[Optional[int], bool]]:
+        """
+        Écrit les tickets un par un, de façon idempotente
+
+        Renvoie (ID, inséré) par ticket : un call_uuid déjà présent renvoie
+        l'ID existant avec inséré=False (job rejoué) ; un ticket invalide est
+        abandonné (None). Si la base devient injoignable, les tickets
+        restants sont journalisés.
+        """
+        ticket_ids: List[Tuple[Optional[int], bool]] = []
+
+        for index, record in enumerate(records):
+            values = [record[column] for column in TICKET_COLUMNS]
+            try:
+                async with _tickets_pool.acquire() as conn:
+                    ticket_id = await conn.fetchval(_TICKET_INSERT_SQL + " RETURNING id", *values)
+                    inserted = ticket_id is not None
+                    if not inserted:
+                        ticket_id = await conn.fetchval(
+                            "SELECT id FROM tickets WHERE call_uuid = $1",
+                            record['call_uuid']
+                        )
+                    elif record['status'] == 'transferred':
+                        await technician_load.notify(conn, record['created_at'].timestamp())
+                ticket_ids.append((ticket_id, inserted))
+
+            except _TICKET_DATA_ERRORS as e:
+                logger.error(f"Error creating ticket (call: {record['call_uuid']}): {e}")
+                ticket_ids.append((None, False))
+
+            except Exception as e:
+                logger.error(f"Ticket write failed: {e}")
+                await self._spill(records[index:])
+                ticket_ids.extend([(None, False)] * (len(records) - index))
+                break
+
+        return ticket_ids
+
+    # --- Journal disque ---
+
+    @staticmethod
+    def _encode(record: Dict) -> str:
+        return json.dumps({
+            key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in record.items()
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _decode(line: str) -> Dict:
+        record = json.loads(line)
+        record['call_date'] = date.fromisoformat(record['call_date'])
+        record['call_time'] = dt_time.fromisoformat(record['call_time'])
+        record['created_at'] = datetime.fromisoformat(record['created_at'])
+        record.setdefault('turn_log', None)  # Journal écrit avant la colonne turn_log
+        return record
+
+    def _lock(self) -> asyncio.Lock:
+        if self._journal_lock is None:
+            self._journal_lock = asyncio.Lock()
+        return self._journal_lock
+
+    def journal_pending(self):
+        """Journalise les tickets en attente de façon synchrone (arrêt brutal du processus)"""
+        if not self._pending:
+            return
+        records = [record for record, _ in self._pending]
+        self._pending.clear()
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(self._encode(record) + '\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        logger.warning(f"{len(records)} pending ticket(s) journaled on shutdown")
+
+    async def _spill(self, records: List[Dict]):
+        """Ajoute des tickets au journal disque (fsync) pour un rejeu ultérieur"""
+        lines = ''.join(self._encode(record) + '\n' for record in records)
+
+        def append():
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+
+        async with self._lock():
+            try:
+                await asyncio.to_thread(append)
+                self._journal_dirty = True
+                logger.warning(f"{len(records)} ticket(s) journaled to {self.journal_path} (replayed when DB is back)")
+            except Exception as e:
+                logger.error(f"Failed to journal {len(records)} ticket(s): {e}")
+
+    async def replay_journal(self):
+        """Rejoue le journal disque ; les tickets encore en échec y restent"""
+        self._last_replay = time.monotonic()
+
+        async with self._lock():
+            if not self.journal_path.exists():
+                self._journal_dirty = False
+                return
+
+            lines = await asyncio.to_thread(self.journal_path.read_text, encoding='utf-8')
+            records = []
+            for line in lines.splitlines():
+                if line.strip():
+                    try:
+                        records.append(self._decode(line))
+                    except (ValueError, KeyError) as e:
+                        logger.error(f"Skipping corrupted journal entry: {e}")
+
+            remaining = []
+            replayed = 0
+            for index, record in enumerate(records):
+                try:
+                    async with _tickets_pool.acquire() as conn:
+                        ticket_id = await conn.fetchval(
+                            _TICKET_INSERT_SQL + " RETURNING id",
+                            *[record[column] for column in TICKET_COLUMNS]
+                        )
+                        # Déjà écrit (call_uuid présent) : ses effets ont déjà été appliqués
+                        if ticket_id is not None and record['status'] == 'transferred':
+                            await technician_load.notify(conn, record['created_at'].timestamp())
+                    if ticket_id is not None:
+                        _after_ticket_created(record, ticket_id)
+                    replayed += 1
+                except _TICKET_DATA_ERRORS as e:
+                    logger.error(f"Dropping invalid journaled ticket (call: {record['call_uuid']}): {e}")
+                except Exception as e:
+                    logger.warning(f"Ticket journal replay paused: {e}")
+                    remaining = records[index:]
+                    break
+
+            def rewrite():
+                if not remaining:
+                    self.journal_path.unlink(missing_ok=True)
+                    return
+                tmp_path = self.journal_path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(''.join(self._encode(record) + '\n' for record in remaining))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.journal_path)
+
+            await asyncio.to_thread(rewrite)
+            self._journal_dirty = bool(remaining)
+
+        if replayed:
+            logger.info(f"✓ Replayed {replayed} journaled ticket(s) ({len(remaining)} remaining)")
+        try:
+            metrics.track_ticket_journal(len(remaining))
+        except Exception as e:
+            logger.debug(f"Failed to track ticket journal: {e}")
+
+
+ticket_writer = TicketWriter()
 
 
 async def get_today_stats() -> Dict:
@@ -380,6 +770,164 @@ async def is_technician_available(max_active: int = 5, window_minutes: int = 10)
         return True  # fail-open pour ne pas bloquer la prise en charge
 
 
+# === Charge techniciens (fenêtre glissante en mémoire) ===
+class TechnicianLoadTracker:
+    """
+    Nombre de transferts vers un technicien sur une fenêtre glissante, sans requête
+
+    Anneau de compteurs par tranche de `bucket_seconds` : enregistrer un
+    transfert et lire la charge sont en O(1) (amorti). La fenêtre est
+    donc arrondie à la tranche près.
+    - Amorçage au démarrage depuis la table tickets
+    - Mis à jour par create_ticket (transferts de ce processus)
+    - Mis à jour par LISTEN/NOTIFY (transferts des autres processus serveur)
+    """
+
+    def __init__(
+        self,
+        window_minutes: int = config.TECHNICIAN_LOAD_WINDOW_MIN,
+        bucket_seconds: int = config.TECHNICIAN_LOAD_BUCKET_SECONDS,
+        channel: str = config.TECHNICIAN_NOTIFY_CHANNEL
+    ):
+        self.window_minutes = window_minutes
+        self.bucket_seconds = bucket_seconds
+        self.channel = channel
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"  # Ignorer ses propres notifications
+        self._counts = [0] * max(1, math.ceil(window_minutes * 60 / bucket_seconds))
+        self._head: Optional[int] = None  # Index absolu de la tranche la plus récente
+        self._total = 0
+        self._listener: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _advance(self, now: float):
+        """Fait glisser la fenêtre jusqu'à `now` (remise à zéro des tranches expirées)"""
+        bucket = int(now // self.bucket_seconds)
+        if self._head is None:
+            self._head = bucket
+            return
+        if bucket <= self._head:
+            return
+
+        size = len(self._counts)
+        for step in range(1, min(bucket - self._head, size) + 1):
+            slot = (self._head + step) % size
+            self._total -= self._counts[slot]
+            self._counts[slot] = 0
+        self._head = bucket
+
+    def record(self, timestamp: Optional[float] = None):
+        """Enregistre un transfert (horodatage epoch, défaut: maintenant)"""
+        now = time.time()
+        self._advance(now)
+
+        bucket = min(int((timestamp or now) // self.bucket_seconds), self._head)
+        if bucket <= self._head - len(self._counts):
+            return  # Hors fenêtre
+
+        self._counts[bucket % len(self._counts)] += 1
+        self._total += 1
+        self._publish()
+
+    def count(self) -> int:
+        """Transferts sur la fenêtre glissante"""
+        self._advance(time.time())
+        return self._total
+
+    def is_available(self, max_active: int = config.TECHNICIAN_MAX_ACTIVE_TRANSFERS) -> bool:
+        """True si la charge est inférieure au seuil (aucune requête)"""
+        return self.count() < max_active
+
+    def _publish(self):
+        try:
+            load = self._total
+            metrics.track_technician_load(load, load / max(1, config.TECHNICIAN_MAX_ACTIVE_TRANSFERS))
+        except Exception as e:
+            logger.debug(f"Failed to track technician load: {e}")
+
+    def _reset(self):
+        self._counts = [0] * len(self._counts)
+        self._head = None
+        self._total = 0
+
+    async def seed(self):
+        """Recharge la fenêtre depuis la base (démarrage, ou après une perte de LISTEN)"""
+        if not _tickets_pool:
+            logger.error("Tickets pool not initialized")
+            return
+
+        since_ts = datetime.now() - timedelta(minutes=self.window_minutes)
+        async with _tickets_pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT created_at FROM tickets
+                WHERE status = 'transferred'
+                  AND created_at >= $1
+                """,
+                since_ts
+            )
+
+        self._reset()
+        for row in rows:
+            self.record(row['created_at'].timestamp())
+        self._publish()
+        logger.info(f"Technician load seeded: {self._total} transfer(s) in last {self.window_minutes}m")
+
+    async def notify(self, conn: asyncpg.Connection, timestamp: float):
+        """Publie un transfert aux autres processus (NOTIFY, livré au commit)"""
+        payload = json.dumps({'origin': self.origin, 'ts': timestamp})
+        await conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.debug(f"Invalid technician load notification: {payload}")
+            return
+
+        if event.get('origin') != self.origin:
+            self.record(event.get('ts'))
+
+    async def _listen(self):
+        self._listener = await asyncpg.connect(config.DB_TICKETS_DSN)
+        await self._listener.add_listener(self.channel, self._on_notification)
+        # Les transferts notifiés pendant la déconnexion sont récupérés par l'amorçage
+        await self.seed()
+        logger.info(f"✓ Technician load tracker listening on '{self.channel}'")
+
+    async def _run(self):
+        """Maintient la connexion LISTEN et publie la charge (qui décroît avec le temps)"""
+        while True:
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    await self._listen()
+                self.count()
+                self._publish()
+                await asyncio.sleep(self.bucket_seconds)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Technician load listener error: {e} (retrying in 5s)")
+                self._listener = None
+                await asyncio.sleep(5)
+
+    def start(self):
+        """Lance l'écoute LISTEN/NOTIFY (nécessite init_db_pools)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._listener and not self._listener.is_closed():
+            await self._listener.close()
+        self._listener = None
+
+
+technician_load = TechnicianLoadTracker()
+
+
 async def get_pending_tickets(phone_number: str) -> list:
     """
     Récupère les tickets non résolus pour un numéro de téléphone
@@ -517,6 +1065,340 @@ async def get_client_history(phone_number: str, limit: int = 10) -> list:
         return []
 
 
+@dataclass
+class CallerContext:
+    """Contexte d'un appelant chargé au décroché (fiche client + tickets)"""
+    phone_number: str
+    client_info: Optional[Dict] = None
+    history: List[Dict] = field(default_factory=list)          # Derniers tickets (mémoire long terme)
+    pending_tickets: List[Dict] = field(default_factory=list)  # Tickets non résolus, plus récent en premier
+
+    @property
+    def is_known_client(self) -> bool:
+        return self.client_info is not None
+
+
+async def _fetch_caller_tickets(phone_numbers: List[str], history_limit: int, pending_limit: int) -> Tuple[list, list]:
+    """
+    Historique et tickets en attente d'un numéro (toutes ses formes) en une seule requête
+
+    Même résultat que get_client_history + get_pending_tickets : les deux
+    fenêtres (N derniers tickets, M derniers non résolus) sont calculées
+    par row_number() sur le même parcours de la table.
+    Les erreurs sont propagées (un résultat incomplet n'est pas mis en cache).
+    """
+    if not _tickets_pool:
+        raise RuntimeError("Tickets pool not initialized")
+
+    async with _tickets_pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT
+                id,
+                call_uuid,
+                phone_number,
+                problem_type,
+                status,
+                sentiment,
+                summary,
+                duration_seconds,
+                tag,
+                severity,
+                created_at,
+                is_pending,
+                rn_all,
+                rn_pending
+            FROM (
+                SELECT
+                    *,
+                    (status != 'resolved') IS TRUE AS is_pending,
+                    row_number() OVER (ORDER BY created_at DESC) AS rn_all,
+                    row_number() OVER (
+                        PARTITION BY (status != 'resolved') IS TRUE
+                        ORDER BY created_at DESC
+                    ) AS rn_pending
+                FROM tickets
+                WHERE phone_number = ANY($1::text[])
+            ) AS caller_tickets
+            WHERE rn_all <= $2
+               OR (is_pending AND rn_pending <= $3)
+            ORDER BY created_at DESC
+            """,
+            phone_numbers,
+            history_limit,
+            pending_limit
+        )
+
+    history = []
+    pending = []
+    for row in rows:
+        if row['rn_all'] <= history_limit:
+            history.append({
+                'summary': row['summary'],
+                'created_at': row['created_at'],
+                'status': row['status'],
+                'problem_type': row['problem_type']
+            })
+        if row['is_pending'] and row['rn_pending'] <= pending_limit:
+            pending.append({
+                'id': row['id'],
+                'call_uuid': row['call_uuid'],
+                'phone_number': row['phone_number'],
+                'problem_type': row['problem_type'],
+                'status': row['status'],
+                'sentiment': row['sentiment'],
+                'summary': row['summary'],
+                'duration_seconds': row['duration_seconds'],
+                'tag': row['tag'],
+                'severity': row['severity'],
+                'created_at': row['created_at']
+            })
+
+    return history, pending
+
+
+# === Cache du contexte appelant (TTL / LRU, cache négatif, write-through) ===
+_caller_cache = TTLCache(config.CALLER_CACHE_TTL, config.CALLER_CACHE_MAX_ENTRIES)  # numéro -> ((limites), CallerContext)
+_caller_loads: Dict[Tuple, asyncio.Future] = {}  # Chargements en cours (un seul par numéro)
+_caller_writes = TTLCache(60, config.CALLER_CACHE_MAX_ENTRIES)  # numéro -> instant du dernier ticket écrit
+_caller_cache_stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
+
+def normalize_phone_number(phone_number: str) -> str:
+    """
+    Forme canonique d'un numéro (clé du cache appelant)
+
+    Example:
+        >>> normalize_phone_number("+33 6 12 34 56 78")
+        '0612345678'
+    """
+    digits = ''.join(c for c in str(phone_number) if c.isdigit())
+    if digits.startswith('0033'):
+        digits = '0' + digits[4:]
+    elif digits.startswith('33') and len(digits) == 11:
+        digits = '0' + digits[2:]
+    return digits or str(phone_number)
+
+
+def _is_unknown_caller(ctx: CallerContext) -> bool:
+    return ctx.client_info is None and not ctx.history and not ctx.pending_tickets
+
+
+def _copy_caller_context(ctx: CallerContext, phone_number: str) -> CallerContext:
+    """Copie remise à l'appelant (les entrées du cache ne sont jamais modifiées en place)"""
+    return replace(
+        ctx,
+        phone_number=phone_number,
+        client_info=dict(ctx.client_info) if ctx.client_info else None,
+        history=list(ctx.history),
+        pending_tickets=list(ctx.pending_tickets)
+    )
+
+
+def _track_caller_lookup(result: str, start_time: float):
+    _caller_cache_stats[result] += 1
+    lookups = sum(_caller_cache_stats.values())
+    hits = _caller_cache_stats['hits'] + _caller_cache_stats['negative_hits']
+    try:
+        metrics.track_caller_context_lookup(result, time.perf_counter() - start_time, hits / lookups)
+    except Exception as e:
+        logger.debug(f"Failed to track caller context lookup: {e}")
+
+
+async def _load_caller_context_from_db(
+    phone_number: str, key: str, history_limit: int, pending_limit: int
+) -> CallerContext:
+    """Interroge les deux bases en parallèle et met le résultat complet en cache"""
+    started_at = time.monotonic()
+    # Fiches clients et tickets enregistrés sous le numéro canonique ou brut
+    phone_numbers = list(dict.fromkeys([key, phone_number]))
+    client_info, tickets = await asyncio.gather(
+        _query_client_info(phone_numbers),
+        _fetch_caller_tickets(phone_numbers, history_limit, pending_limit),
+        return_exceptions=True
+    )
+
+    complete = True
+    if isinstance(client_info, Exception):
+        logger.error(f"Error fetching client info: {client_info}")
+        client_info, complete = None, False
+    if isinstance(tickets, Exception):
+        logger.error(f"Error fetching caller tickets: {tickets}")
+        tickets, complete = ([], []), False
+    history, pending = tickets
+
+    if pending:
+        logger.info(f"Found {len(pending)} pending ticket(s) for {phone_number}")
+    if history:
+        logger.info(f"Found {len(history)} historical ticket(s) for {phone_number}")
+
+    ctx = CallerContext(
+        phone_number=phone_number,
+        client_info=client_info,
+        history=history,
+        pending_tickets=pending
+    )
+
+    # Ne pas mettre en cache un résultat partiel, ni un résultat antérieur à un ticket écrit entre-temps
+    last_write = _caller_writes.get(key)
+    if complete and (last_write is None or last_write < started_at):
+        ttl = config.CALLER_CACHE_NEGATIVE_TTL if _is_unknown_caller(ctx) else None
+        _caller_cache.set(key, ((history_limit, pending_limit), ctx), ttl=ttl)
+
+    return ctx
+
+
+async def load_caller_context(phone_number: str, history_limit: int = 10, pending_limit: int = 5) -> CallerContext:
+    """
+    Charge tout le contexte d'un appelant en un aller-retour (ou depuis le cache)
+
+    Les rappels rapprochés (ex: rappel après transfert) sont servis depuis un
+    cache en mémoire (TTL, taille bornée) ; les numéros inconnus sont aussi
+    mis en cache (TTL plus court). Sinon, la fiche client (base clients) et
+    les tickets (une seule requête sur la base tickets) sont récupérés en
+    parallèle avec asyncio.gather. Les appels simultanés d'un même numéro
+    partagent le même chargement.
+
+    Args:
+        phone_number: Numéro de téléphone (format: "0612345678")
+        history_limit: Nombre de tickets d'historique (défaut: 10)
+        pending_limit: Nombre de tickets en attente (défaut: 5)
+
+    Returns:
+        CallerContext (champs vides si le client est inconnu ou en cas d'erreur)
+
+    Example:
+        >>> ctx = await load_caller_context("0612345678")
+        >>> ctx.client_info, len(ctx.history), len(ctx.pending_tickets)
+        ({'first_name': 'Pierre', ...}, 3, 1)
+    """
+    start_time = time.perf_counter()
+    key = normalize_phone_number(phone_number)
+    limits = (history_limit, pending_limit)
+
+    entry = _caller_cache.get(key)
+    if entry is not None and entry[0] == limits:
+        ctx = entry[1]
+        _track_caller_lookup('negative_hits' if _is_unknown_caller(ctx) else 'hits', start_time)
+        logger.info(f"Caller context cache HIT: {phone_number}")
+        return _copy_caller_context(ctx, phone_number)
+
+    load_key = (key, limits)
+    load = _caller_loads.get(load_key)
+    if load is None:
+        load = asyncio.ensure_future(_load_caller_context_from_db(phone_number, key, history_limit, pending_limit))
+        _caller_loads[load_key] = load
+        load.add_done_callback(lambda _: _caller_loads.pop(load_key, None))
+
+    ctx = await asyncio.shield(load)
+    _track_caller_lookup('misses', start_time)
+    return _copy_caller_context(ctx, phone_number)
+
+
+def _record_ticket_in_cache(ticket: Dict, ticket_id: int, created_at: datetime):
+    """
+    Write-through : reporte un ticket créé dans le contexte appelant en cache
+
+    Le prochain appel du même numéro voit ce ticket (historique, et tickets en
+    attente s'il n'est pas résolu) sans relire la base.
+    """
+    key = normalize_phone_number(ticket['phone_number'])
+    _caller_writes.set(key, time.monotonic())
+
+    entry = _caller_cache.get(key)
+    if entry is None:
+        return
+
+    (history_limit, pending_limit), ctx = entry
+    status = ticket.get('status', 'unknown')
+
+    history = [{
+        'summary': ticket.get('summary', 'Aucun résumé disponible'),
+        'created_at': created_at,
+        'status': status,
+        'problem_type': ticket.get('problem_type', 'unknown')
+    }] + ctx.history
+
+    pending = ctx.pending_tickets
+    if status != 'resolved':
+        pending = [{
+            'id': ticket_id,
+            'call_uuid': ticket['call_uuid'],
+            'phone_number': ticket['phone_number'],
+            'problem_type': ticket.get('problem_type', 'unknown'),
+            'status': status,
+            'sentiment': ticket.get('sentiment', 'neutral'),
+            'summary': ticket.get('summary', 'Aucun résumé disponible'),
+            'duration_seconds': ticket.get('duration_seconds', 0),
+            'tag': ticket.get('tag', 'UNKNOWN'),
+            'severity': ticket.get('severity', 'MEDIUM'),
+            'created_at': created_at
+        }] + pending
+
+    ctx = replace(ctx, history=history[:history_limit], pending_tickets=pending[:pending_limit])
+    _caller_cache.set(key, ((history_limit, pending_limit), ctx))
+
+
+def invalidate_caller_context(phone_number: str):
+    """Retire un numéro du cache appelant (ex: fiche client modifiée)"""
+    key = normalize_phone_number(phone_number)
+    _caller_cache.pop(key)
+    _caller_writes.set(key, time.monotonic())
+
+
+def get_caller_cache_stats() -> Dict:
+    """Statistiques du cache appelant"""
+    lookups = sum(_caller_cache_stats.values())
+    hits = _caller_cache_stats['hits'] + _caller_cache_stats['negative_hits']
+    return {
+        **_caller_cache_stats,
+        'entries': len(_caller_cache),
+        'hit_ratio': round(hits / lookups, 3) if lookups else 0.0
+    }
+
+
+async def get_name_vocabulary() -> Dict[str, list]:
+    """
+    Récupère les prénoms, noms et entreprises connus (pré-génération des clips audio de noms)
+
+    Returns:
+        Dict avec 'first_names', 'last_names' et 'companies' (listes de chaînes distinctes)
+
+    Example:
+        >>> await get_name_vocabulary()
+        {'first_names': ['Pierre', ...], 'last_names': ['Dupont', ...], 'companies': ['SNCF', ...]}
+    """
+    vocabulary = {'first_names': [], 'last_names': [], 'companies': []}
+
+    if not _clients_pool:
+        logger.error("Clients pool not initialized")
+        return vocabulary
+
+    try:
+        async with _clients_pool.acquire() as conn:
+            rows = await conn.fetch("SELECT DISTINCT first_name FROM clients WHERE first_name <> ''")
+            vocabulary['first_names'] = [row['first_name'] for row in rows]
+
+            rows = await conn.fetch("SELECT DISTINCT last_name FROM clients WHERE last_name <> ''")
+            vocabulary['last_names'] = [row['last_name'] for row in rows]
+
+            try:
+                rows = await conn.fetch("SELECT name FROM companies WHERE is_active")
+                vocabulary['companies'] = [row['name'] for row in rows]
+            except asyncpg.UndefinedTableError:
+                logger.info("Table companies absente (migration 005 non appliquée)")
+
+        logger.info(
+            f"Name vocabulary: {len(vocabulary['first_names'])} first names, "
+            f"{len(vocabulary['last_names'])} last names, {len(vocabulary['companies'])} companies"
+        )
+        return vocabulary
+
+    except Exception as e:
+        logger.error(f"Error fetching name vocabulary: {e}")
+        return vocabulary
+
+
 # Pour tester les fonctions (si exécuté directement)
 if __name__ == "__main__":
     import asyncio
@@ -1,36 +1,53 @@
 #!/usr/bin/env python3
 """
 Script de génération du cache audio 8kHz
-À lancer une seule fois pour pré-générer les phrases courantes
+Génération incrémentale : seules les phrases nouvelles ou modifiées (texte, voix,
+modèle, réglages) sont régénérées, d'après le manifeste du cache.
 
 Usage:
-    python generate_cache.py
+    python generate_cache.py                 # Génère les phrases manquantes / modifiées
+    python generate_cache.py --force         # Régénère tout
+    python generate_cache.py --verify        # Vérifie durées, niveaux et empreintes
+    python generate_cache.py --names         # Clips de noms depuis db_clients (cron nocturne)
 """
+import argparse
 import asyncio
+import json
+import os
+import random
 import sys
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from elevenlabs.client import ElevenLabs
 from elevenlabs import VoiceSettings
 import io
 from pydub import AudioSegment
 from pydub.effects import normalize
+import numpy as np
 import config
+from audio_utils import NATIVE_TTS_FORMATS, decode_native_tts, write_phrase_bank, trim_silence
+from static_phrases import all_static_phrases, tts_fingerprint
+import db_utils
 import logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
 def convert_to_8khz(audio_bytes: bytes, input_format: str = "mp3") -> bytes:
     """
-    Convertit l'audio OpenAI (24kHz MP3) en RAW 8kHz 16-bit Mono
+    Convertit l'audio ElevenLabs (MP3, PCM ou μ-law) en RAW 8kHz 16-bit Mono
     """
     try:
-        # Charger l'audio
-        audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=input_format)
+        # Charger l'audio (formats natifs décodés sans FFmpeg)
+        if input_format in NATIVE_TTS_FORMATS:
+            audio = AudioSegment(
+                data=decode_native_tts(audio_bytes, input_format),
+                sample_width=2,
+                frame_rate=8000,
+                channels=1
+            )
+        else:
+            audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=input_format)
 
         # Convertir en mono
         if audio.channels > 1:
@@ -52,47 +69,105 @@ def convert_to_8khz(audio_bytes: bytes, input_format: str = "mp3") -> bytes:
         raise
 
 
-async def generate_phrase(client: ElevenLabs, phrase_key: str, phrase_text: str) -> bool:
+def load_manifest() -> dict:
+    """Charge le manifeste {clé: empreinte} des phrases déjà générées"""
+    try:
+        with open(config.CACHE_MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Manifeste illisible ({e}), toutes les phrases seront régénérées")
+        return {}
+
+
+def save_manifest(manifest: dict):
+    """Écrit le manifeste de façon atomique"""
+    tmp_path = config.CACHE_MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, config.CACHE_MANIFEST_PATH)
+
+
+def fetch_tts_audio(client: ElevenLabs, phrase_text: str) -> bytes:
+    """Appel ElevenLabs TTS bloquant (exécuté dans un thread)"""
+    audio_generator = client.text_to_speech.convert(
+        voice_id=config.ELEVENLABS_VOICE_ID,
+        optimize_streaming_latency=0,
+        output_format=config.ELEVENLABS_OUTPUT_FORMAT,
+        text=phrase_text,
+        model_id=config.ELEVENLABS_MODEL,
+        voice_settings=VoiceSettings(
+            stability=config.ELEVENLABS_STABILITY,
+            similarity_boost=config.ELEVENLABS_SIMILARITY_BOOST,
+            style=config.ELEVENLABS_STYLE,
+            use_speaker_boost=config.ELEVENLABS_USE_SPEAKER_BOOST
+        )
+    )
+
+    # Récupérer les bytes audio
+    return b"".join(chunk for chunk in audio_generator if chunk)
+
+
+async def fetch_with_backoff(client: ElevenLabs, phrase_key: str, phrase_text: str) -> bytes:
+    """
+    Appelle ElevenLabs avec backoff exponentiel (+ jitter) sur rate limiting (429)
+    et erreurs serveur/réseau transitoires
     """
-    Génère un fichier audio 8kHz pour une phrase donnée
+    for attempt in range(config.CACHE_GEN_MAX_RETRIES + 1):
+        try:
+            return await asyncio.to_thread(fetch_tts_audio, client, phrase_text)
+        except Exception as e:
+            status_code = getattr(e, 'status_code', None)
+            retryable = status_code is None or status_code == 429 or status_code >= 500
+            if not retryable or attempt == config.CACHE_GEN_MAX_RETRIES:
+                raise
+
+            delay = config.CACHE_GEN_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, config.CACHE_GEN_BACKOFF_BASE)
+            logger.warning(f"  {phrase_key}: erreur {status_code or e}, nouvel essai dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def generate_phrase(
+    client: ElevenLabs,
+    process_pool: ProcessPoolExecutor,
+    semaphore: asyncio.Semaphore,
+    manifest: dict,
+    phrase_key: str,
+    phrase_text: str,
+    force: bool = False
+) -> bool:
+    """
+    Génère un fichier audio 8kHz pour une phrase donnée (si absent ou modifié)
     """
     output_path = config.CACHE_DIR / f"{phrase_key}.raw"
+    fingerprint = tts_fingerprint(phrase_text)
 
-    # Vérifier si le fichier existe déjà
-    if output_path.exists():
-        logger.info(f"✓ {phrase_key}.raw existe déjà (skip)")
+    # Vérifier si le fichier existe déjà pour ce texte / cette voix / ces réglages
+    if not force and output_path.exists() and manifest.get(phrase_key) == fingerprint:
+        logger.info(f"✓ {phrase_key}.raw à jour (skip)")
         return True
 
     try:
         logger.info(f"Génération: '{phrase_text}' -> {phrase_key}.raw")
 
-        # Appeler ElevenLabs TTS
-        audio_generator = client.text_to_speech.convert(
-            voice_id=config.ELEVENLABS_VOICE_ID,
-            optimize_streaming_latency=0,
-            output_format="mp3_44100_128",
-            text=phrase_text,
-            model_id=config.ELEVENLABS_MODEL,
-            voice_settings=VoiceSettings(
-                stability=config.ELEVENLABS_STABILITY,
-                similarity_boost=config.ELEVENLABS_SIMILARITY_BOOST,
-                style=config.ELEVENLABS_STYLE,
-                use_speaker_boost=config.ELEVENLABS_USE_SPEAKER_BOOST
-            )
-        )
-
-        # Récupérer les bytes audio
-        audio_bytes = b""
-        for chunk in audio_generator:
-            if chunk:
-                audio_bytes += chunk
+        # Appeler ElevenLabs TTS (concurrence bornée)
+        async with semaphore:
+            audio_bytes = await fetch_with_backoff(client, phrase_key, phrase_text)
 
-        # Convertir en 8kHz RAW
-        audio_8khz = convert_to_8khz(audio_bytes, input_format="mp3")
+        # Convertir en 8kHz RAW (CPU-bound : pool de processus)
+        input_format = config.ELEVENLABS_OUTPUT_FORMAT
+        if input_format not in NATIVE_TTS_FORMATS:
+            input_format = "mp3"
+        loop = asyncio.get_running_loop()
+        audio_8khz = await loop.run_in_executor(process_pool, convert_to_8khz, audio_bytes, input_format)
 
-        # Sauvegarder
-        with open(output_path, 'wb') as f:
+        # Sauvegarder (écriture atomique)
+        tmp_path = output_path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
             f.write(audio_8khz)
+        os.replace(tmp_path, output_path)
+        manifest[phrase_key] = fingerprint
 
         file_size_kb = len(audio_8khz) / 1024
         duration_sec = len(audio_8khz) / (8000 * 2)  # sample_rate * sample_width
@@ -105,36 +180,214 @@ async def generate_phrase(client: ElevenLabs, phrase_key: str, phrase_text: str)
         return False
 
 
-async def main():
+def convert_clip_to_8khz(audio_bytes: bytes, input_format: str) -> bytes:
+    """Convertit un clip de nom en RAW 8kHz sans silence aux extrémités (pour assemblage)"""
+    return trim_silence(convert_to_8khz(audio_bytes, input_format=input_format))
+
+
+async def generate_name_clip(
+    client: ElevenLabs,
+    process_pool: ProcessPoolExecutor,
+    semaphore: asyncio.Semaphore,
+    name: str
+) -> Optional[bool]:
+    """
+    Génère le clip audio d'un prénom / nom / entreprise (fichier adressé par empreinte)
+
+    Returns:
+        True si généré, None si déjà présent, False en cas d'erreur
+    """
+    output_path = config.NAME_CLIPS_DIR / f"{tts_fingerprint(name)}.raw"
+    if output_path.exists():
+        return None
+
+    try:
+        async with semaphore:
+            audio_bytes = await fetch_with_backoff(client, name, name)
+
+        input_format = config.ELEVENLABS_OUTPUT_FORMAT
+        if input_format not in NATIVE_TTS_FORMATS:
+            input_format = "mp3"
+        loop = asyncio.get_running_loop()
+        clip = await loop.run_in_executor(process_pool, convert_clip_to_8khz, audio_bytes, input_format)
+
+        tmp_path = output_path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(clip)
+        os.replace(tmp_path, output_path)
+
+        logger.info(f"✓ Clip '{name}' créé ({len(clip) / (8000 * 2):.2f}s)")
+        return True
+
+    except Exception as e:
+        logger.error(f"✗ Erreur clip '{name}': {e}")
+        return False
+
+
+async def generate_name_clips(client: ElevenLabs, concurrency: int) -> int:
+    """
+    Pré-génère les clips de noms connus de db_clients (batch nocturne)
+
+    Returns:
+        0 si tous les clips ont pu être générés, 1 sinon
+    """
+    config.NAME_CLIPS_DIR.mkdir(parents=True, exist_ok=True)
+
+    await db_utils.init_db_pools()
+    try:
+        vocabulary = await db_utils.get_name_vocabulary()
+    finally:
+        await db_utils.close_db_pools()
+
+    names = sorted({
+        name.strip()
+        for values in vocabulary.values()
+        for name in values
+        if name and name.strip()
+    })
+    logger.info(f"Clips de noms: {len(names)} noms distincts")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    with ProcessPoolExecutor(max_workers=config.PROCESS_POOL_WORKERS) as process_pool:
+        outcomes = await asyncio.gather(*(
+            generate_name_clip(client, process_pool, semaphore, name) for name in names
+        ))
+
+    generated = sum(1 for outcome in outcomes if outcome is True)
+    skipped = sum(1 for outcome in outcomes if outcome is None)
+    failed = sum(1 for outcome in outcomes if outcome is False)
+    logger.info(f"Clips de noms: {generated} générés, {skipped} déjà présents, {failed} en erreur")
+    return 0 if failed == 0 else 1
+
+
+def verify_cache(static_phrases: dict, manifest: dict) -> int:
+    """
+    Vérifie les fichiers du cache : présence, empreinte, durée et niveaux
+
+    Returns:
+        0 si tout est valide, 1 sinon
+    """
+    problems = 0
+
+    for phrase_key, phrase_text in static_phrases.items():
+        raw_path = config.CACHE_DIR / f"{phrase_key}.raw"
+        issues = []
+
+        if not raw_path.exists():
+            logger.error(f"✗ {phrase_key}: fichier manquant")
+            problems += 1
+            continue
+
+        if manifest.get(phrase_key) != tts_fingerprint(phrase_text):
+            issues.append("obsolète (texte, voix ou réglages modifiés)")
+
+        samples = np.frombuffer(raw_path.read_bytes(), dtype=np.int16)
+        duration_sec = len(samples) / 8000
+        expected_max = max(config.CACHE_VERIFY_MAX_SECONDS_PER_CHAR * len(phrase_text), 2.0)
+
+        if duration_sec < config.CACHE_VERIFY_MIN_DURATION:
+            issues.append(f"trop court ({duration_sec:.2f}s)")
+        elif duration_sec > expected_max:
+            issues.append(f"trop long ({duration_sec:.1f}s pour {len(phrase_text)} caractères)")
+
+        if len(samples):
+            as_float = samples.astype(np.float64)
+            rms = np.sqrt(np.mean(as_float ** 2))
+            rms_dbfs = 20 * np.log10(rms / 32768) if rms > 0 else float('-inf')
+            clipped_ratio = np.mean(np.abs(as_float) >= 32767)
+
+            if rms_dbfs < config.CACHE_VERIFY_MIN_RMS_DBFS:
+                issues.append(f"niveau trop faible ({rms_dbfs:.1f} dBFS)")
+            if clipped_ratio > config.CACHE_VERIFY_MAX_CLIPPED_RATIO:
+                issues.append(f"saturation ({clipped_ratio * 100:.2f}% d'échantillons écrêtés)")
+        else:
+            rms_dbfs = float('-inf')
+
+        if issues:
+            logger.error(f"✗ {phrase_key}: {', '.join(issues)}")
+            problems += 1
+        else:
+            logger.info(f"✓ {phrase_key} ({duration_sec:.1f}s, {rms_dbfs:.1f} dBFS)")
+
+    logger.info("")
+    logger.info(f"Vérification: {len(static_phrases) - problems}/{len(static_phrases)} phrases valides")
+    return 0 if problems == 0 else 1
+
+
+def build_phrase_bank(static_phrases: dict) -> bool:
+    """
+    Regroupe les fichiers .raw des phrases en une banque unique (phrases.bank)
+    mappée en mémoire par le serveur
+    """
+    phrases = {}
+    for phrase_key in static_phrases:
+        raw_path = config.CACHE_DIR / f"{phrase_key}.raw"
+        if raw_path.exists():
+            phrases[phrase_key] = raw_path.read_bytes()
+
+    if not phrases:
+        logger.warning("Aucune phrase à regrouper dans la banque")
+        return False
+
+    try:
+        bank_size = write_phrase_bank(config.PHRASE_BANK_PATH, phrases, static_phrases)
+        logger.info(f"✓ Banque de phrases créée: {config.PHRASE_BANK_PATH.name} ({len(phrases)} phrases, {bank_size / 1024:.1f} KB)")
+        return True
+    except Exception as e:
+        logger.error(f"✗ Erreur création banque de phrases: {e}")
+        return False
+
+
+async def main(args: argparse.Namespace) -> int:
     """
     Génère tous les fichiers audio du cache
     """
+    # Créer le répertoire cache
+    config.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Phrases de config + phrases constantes récoltées dans server.py
+    static_phrases = all_static_phrases()
+    harvested_count = len(static_phrases) - len(config.CACHED_PHRASES)
+    manifest = load_manifest()
+
+    if args.verify:
+        return verify_cache(static_phrases, manifest)
+
     # Vérifier les clés API
     if not config.ELEVENLABS_API_KEY:
         logger.error(" ELEVENLABS_API_KEY non définie dans .env")
         sys.exit(1)
 
-    # Créer le répertoire cache
-    config.CACHE_DIR.mkdir(parents=True, exist_ok=True)
-
     # Initialiser le client ElevenLabs
     client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
 
+    if args.names:
+        return await generate_name_clips(client, args.concurrency)
+
     logger.info("=" * 60)
     logger.info("🎵 Génération du cache audio 8kHz pour SAV Wouippleul")
     logger.info("=" * 60)
     logger.info(f"Répertoire: {config.CACHE_DIR}")
-    logger.info(f"Nombre de phrases: {len(config.CACHED_PHRASES)}")
+    logger.info(f"Nombre de phrases: {len(static_phrases)} ({harvested_count} récoltées dans server.py)")
+    logger.info(f"Requêtes simultanées: {args.concurrency}")
     logger.info("")
 
-    # Générer toutes les phrases
-    results = []
-    for phrase_key, phrase_text in config.CACHED_PHRASES.items():
-        success = await generate_phrase(client, phrase_key, phrase_text)
-        results.append((phrase_key, success))
+    # Générer toutes les phrases (concurrence bornée, conversions en parallèle)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    with ProcessPoolExecutor(max_workers=config.PROCESS_POOL_WORKERS) as process_pool:
+        try:
+            outcomes = await asyncio.gather(*(
+                generate_phrase(client, process_pool, semaphore, manifest, phrase_key, phrase_text, args.force)
+                for phrase_key, phrase_text in static_phrases.items()
+            ))
+        finally:
+            # Conserver les phrases déjà générées même en cas d'interruption
+            save_manifest(manifest)
+
+    results = list(zip(static_phrases.keys(), outcomes))
 
-        # Pause pour éviter le rate limiting
-        await asyncio.sleep(0.5)
+    # Banque de phrases (fichier unique mappé par le serveur)
+    build_phrase_bank(static_phrases)
 
     # Résumé
     logger.info("")
@@ -161,5 +414,16 @@ async def main():
 
 
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Génération du cache audio 8kHz")
+    parser.add_argument("--verify", action="store_true", help="Vérifie le cache (durées, niveaux, empreintes) sans rien générer")
+    parser.add_argument("--force", action="store_true", help="Régénère toutes les phrases, même à jour")
+    parser.add_argument("--names", action="store_true", help="Pré-génère les clips des prénoms, noms et entreprises de db_clients (batch nocturne)")
+    parser.add_argument("--concurrency", type=int, default=config.CACHE_GEN_CONCURRENCY, help="Requêtes ElevenLabs simultanées")
+
+    exit_code = asyncio.run(main(parser.parse_args()))
     sys.exit(exit_code)
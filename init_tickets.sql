@@ -16,7 +16,8 @@ CREATE TABLE IF NOT EXISTS tickets (
     severity VARCHAR(20) DEFAULT 'MEDIUM',
     call_date DATE DEFAULT CURRENT_DATE,
     call_time TIME DEFAULT CURRENT_TIME,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    turn_log JSONB  -- Tours de parole compacts [{role, text, at}]
 );
 
 CREATE INDEX IF NOT EXISTS idx_tickets_phone ON tickets(phone_number);
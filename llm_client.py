@@ -0,0 +1,152 @@
+"""
+Client LLM asynchrone partagé (Groq) pour tous les appels
+Un seul pool de connexions HTTP keep-alive, timeouts par requête et limite de concurrence
+"""
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+from groq import AsyncGroq
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClient:
+    """
+    Client Groq asynchrone partagé, possédé par AudioSocketServer
+
+    Les requêtes ne bloquent plus la boucle d'événements : 20 appels simultanés
+    attendent leurs réponses LLM en parallèle, sur un pool de connexions commun
+    (keep-alive, pas de handshake TLS par requête).
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrent: int = config.LLM_MAX_CONCURRENT_REQUESTS,
+        timeout: float = config.API_TIMEOUT,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Args:
+            http_client: Pool HTTP fourni par le registre des fournisseurs
+                (instrumenté) ; sinon un pool keep-alive dédié est créé
+        """
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._http_client = http_client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_concurrent,
+                max_keepalive_connections=max_concurrent,
+                keepalive_expiry=config.PROVIDER_KEEPALIVE_EXPIRY
+            ),
+            timeout=timeout
+        )
+        self._client = AsyncGroq(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=config.API_RETRY_ATTEMPTS,
+            http_client=self._http_client
+        )
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        task: str = "understanding",
+        temperature: float = config.GROQ_TEMPERATURE,
+        max_tokens: int = config.GROQ_MAX_TOKENS,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> str:
+        """
+        Envoie une requête de complétion et retourne le texte de la réponse
+
+        Args:
+            messages: Messages au format chat (system / user / assistant)
+            task: Tâche pour les métriques (understanding, analysis)
+            timeout: Timeout de la requête (défaut: config.API_TIMEOUT)
+            **kwargs: Paramètres supplémentaires transmis à Groq (ex: response_format)
+
+        Raises:
+            Exception: Erreur API ou timeout (gérée par l'appelant)
+        """
+        async with self._semaphore:
+            start_time = time.time()
+            response = await self._client.chat.completions.create(
+                model=config.GROQ_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout or self.timeout,
+                **kwargs
+            )
+
+        self._track(task, getattr(response, 'usage', None), time.time() - start_time)
+        return response.choices[0].message.content.strip()
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        task: str = "understanding",
+        temperature: float = config.GROQ_TEMPERATURE,
+        max_tokens: int = config.GROQ_MAX_TOKENS,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Envoie une requête de complétion en streaming et produit les fragments de texte
+
+        Fermer le générateur (ex: barge-in) ferme la réponse HTTP en cours.
+        """
+        async with self._semaphore:
+            start_time = time.time()
+            response = await self._client.chat.completions.create(
+                model=config.GROQ_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout or self.timeout,
+                stream=True
+            )
+
+            usage = None
+            try:
+                async for chunk in response:
+                    # Groq renvoie l'usage des tokens sur le dernier fragment
+                    x_groq = getattr(chunk, 'x_groq', None)
+                    if x_groq is not None and getattr(x_groq, 'usage', None):
+                        usage = x_groq.usage
+
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                await response.close()
+                self._track(task, usage, time.time() - start_time)
+
+    async def ping(self):
+        """Requête légère (liste des modèles) : ouvre ou garde chaude une connexion du pool"""
+        await self._client.models.list(timeout=self.timeout)
+
+    @staticmethod
+    def _track(task: str, usage, response_time: float):
+        try:
+            metrics.track_llm_request(
+                model=config.GROQ_MODEL,
+                task=task,
+                tokens_in=getattr(usage, 'prompt_tokens', 0) or 0,
+                tokens_out=getattr(usage, 'completion_tokens', 0) or 0,
+                response_time=response_time
+            )
+        except Exception as e:
+            logger.debug(f"Failed to track LLM request: {e}")
+
+    async def close(self):
+        """Ferme le pool de connexions HTTP"""
+        await self._client.close()
+        logger.info("✓ LLM client closed")
@@ -3,6 +3,7 @@
 Métriques Prometheus pour le voicebot - Orienté ROI et KPIs business
 """
 
+from typing import Optional
 from prometheus_client import Counter, Histogram, Gauge, Info, start_http_server
 import logging
 
@@ -108,10 +109,59 @@ stt_response_time = Histogram(
 llm_response_time = Histogram(
     'voicebot_llm_response_seconds',
     'Temps de réponse Groq LLM',
-    ['task'],  # 'understanding', 'summary', 'classification'
+    ['task'],  # 'understanding', 'analysis' (fin d'appel)
     buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 20.0]
 )
 
+# Playout audio (horloge partagée 20ms)
+playout_jitter_seconds = Histogram(
+    'voicebot_playout_jitter_seconds',
+    'Retard des ticks de playout par rapport à leur échéance',
+    buckets=[0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1]
+)
+
+playout_underruns = Counter(
+    'voicebot_playout_underruns_total',
+    'Trames de silence envoyées alors que le bot devait parler (underrun)'
+)
+
+playout_dropped_frames = Counter(
+    'voicebot_playout_dropped_frames_total',
+    "Trames abandonnées car la socket AudioSocket n'absorbe plus l'audio"
+)
+
+# Pool de décodeurs FFmpeg (processus chauds vs lancement à froid)
+ffmpeg_decoder_acquire_seconds = Histogram(
+    'voicebot_ffmpeg_decoder_acquire_seconds',
+    'Temps d\'obtention d\'un décodeur FFmpeg',
+    ['source'],  # 'warm' (pool) ou 'spawn' (lancement à froid)
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25]
+)
+
+ffmpeg_decoder_pool_idle = Gauge(
+    'voicebot_ffmpeg_decoder_pool_idle',
+    'Nombre de décodeurs FFmpeg chauds disponibles'
+)
+
+# Pools de connexions des fournisseurs (Deepgram, ElevenLabs, Groq)
+provider_pool_connections = Gauge(
+    'voicebot_provider_pool_connections',
+    'Connexions ouvertes vers un fournisseur',
+    ['provider', 'state']  # state: 'open' ou 'idle'
+)
+
+provider_pool_reuse_ratio = Gauge(
+    'voicebot_provider_pool_reuse_ratio',
+    'Part des requêtes servies par une connexion keep-alive existante (0-1)',
+    ['provider']
+)
+
+provider_requests = Counter(
+    'voicebot_provider_requests_total',
+    'Requêtes HTTP envoyées aux fournisseurs',
+    ['provider', 'connection']  # connection: 'reused' ou 'new'
+)
+
 # ==============================================================================
 # MÉTRIQUES SYSTÈME
 # ==============================================================================
@@ -128,6 +178,156 @@ cache_size = Gauge(
     'Nombre de phrases pré-enregistrées en cache'
 )
 
+# Cache TTS dynamique (persistant)
+dynamic_cache_events = Counter(
+    'voicebot_dynamic_cache_events_total',
+    'Événements du cache TTS dynamique',
+    ['event']  # 'hits', 'misses', 'evictions'
+)
+
+dynamic_cache_hit_ratio = Gauge(
+    'voicebot_dynamic_cache_hit_ratio',
+    'Taux de hit du cache TTS dynamique (0-1, depuis le démarrage)'
+)
+
+dynamic_cache_entries = Gauge(
+    'voicebot_dynamic_cache_entries',
+    'Nombre d\'entrées du cache TTS dynamique'
+)
+
+dynamic_cache_bytes = Gauge(
+    'voicebot_dynamic_cache_bytes',
+    'Taille du cache TTS dynamique sur disque (octets)'
+)
+
+# Cache du contexte appelant (fiche client + tickets)
+caller_context_lookups = Counter(
+    'voicebot_caller_context_lookups_total',
+    'Chargements du contexte appelant',
+    ['result']  # 'hits', 'negative_hits' (numéro inconnu en cache), 'misses'
+)
+
+caller_context_hit_ratio = Gauge(
+    'voicebot_caller_context_hit_ratio',
+    'Taux de hit du cache du contexte appelant (0-1, depuis le démarrage)'
+)
+
+caller_context_lookup_seconds = Histogram(
+    'voicebot_caller_context_lookup_seconds',
+    'Temps de chargement du contexte appelant',
+    ['result'],
+    buckets=[0.0001, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+# Charge techniciens (fenêtre glissante en mémoire)
+technician_transfers_window = Gauge(
+    'voicebot_technician_transfers_window',
+    'Transferts vers un technicien sur la fenêtre glissante (file d\'attente)'
+)
+
+technician_load_ratio = Gauge(
+    'voicebot_technician_load_ratio',
+    'Charge techniciens (transferts sur la fenêtre / seuil max)'
+)
+
+# Écriture différée des tickets
+ticket_flush_seconds = Histogram(
+    'voicebot_ticket_flush_seconds',
+    'Durée d\'écriture d\'un lot de tickets',
+    ['result'],  # 'copy', 'rows' (réécriture ligne par ligne), 'journaled'
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+ticket_flush_rows = Counter(
+    'voicebot_ticket_flush_rows_total',
+    'Tickets écrits par lot',
+    ['result']
+)
+
+ticket_journal_depth = Gauge(
+    'voicebot_ticket_journal_depth',
+    'Tickets en attente de rejeu dans le journal disque'
+)
+
+# File durable des traitements de fin d'appel
+post_call_queue_depth = Gauge(
+    'voicebot_post_call_queue_depth',
+    'Jobs de fin d\'appel en attente (file SQLite)'
+)
+
+post_call_job_latency = Histogram(
+    'voicebot_post_call_job_latency_seconds',
+    'Délai entre la fin d\'appel et le ticket écrit',
+    ['result'],  # 'done', 'degraded', 'failed'
+    buckets=[0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0]
+)
+
+post_call_jobs = Counter(
+    'voicebot_post_call_jobs_total',
+    'Jobs de fin d\'appel traités',
+    ['result']  # 'done', 'degraded', 'retry', 'failed'
+)
+
+# VAD locale et barge-in
+vad_events = Counter(
+    'voicebot_vad_events_total',
+    'Événements de la VAD locale',
+    ['event']  # 'speech_start', 'speech_end', 'duck', 'duck_released'
+)
+
+vad_speech_segment_seconds = Histogram(
+    'voicebot_vad_speech_segment_seconds',
+    'Durée des segments de parole détectés par la VAD locale',
+    buckets=[0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0]
+)
+
+barge_in_total = Counter(
+    'voicebot_barge_in_total',
+    'Interruptions du bot par le client',
+    ['trigger']  # 'vad' (locale), 'transcript' (Deepgram)
+)
+
+deepgram_uplink_messages = Counter(
+    'voicebot_deepgram_uplink_messages_total',
+    'Messages envoyés sur les websockets Deepgram',
+    ['kind']  # 'audio', 'keepalive', 'finalize'
+)
+
+deepgram_uplink_bytes = Counter(
+    'voicebot_deepgram_uplink_bytes_total',
+    'Audio envoyé à Deepgram (octets)'
+)
+
+stt_profile_switches = Counter(
+    'voicebot_stt_profile_switches_total',
+    'Changements de profil STT (websocket Deepgram rouverte)',
+    ['profile', 'result']  # result: 'ok', 'failed'
+)
+
+stt_attach_seconds = Histogram(
+    'voicebot_stt_attach_seconds',
+    'Délai entre le début de l\'appel et l\'attachement de la websocket Deepgram',
+    ['source'],  # 'pool' (pré-ouverte), 'new' (ouverte pour l'appel)
+    buckets=[0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
+)
+
+stt_preroll_dropped_frames = Counter(
+    'voicebot_stt_preroll_dropped_frames_total',
+    'Trames perdues avant l\'attachement de la websocket Deepgram (pré-roll plein)'
+)
+
+speculations_total = Counter(
+    'voicebot_speculations_total',
+    'Traitements spéculatifs sur transcription intermédiaire',
+    ['result']  # 'hit' (utilisé), 'miss' (transcription divergente, annulé)
+)
+
+speculation_saved_seconds = Histogram(
+    'voicebot_speculation_saved_seconds',
+    'Latence gagnée par un traitement spéculatif utilisé',
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0]
+)
+
 # Erreurs système
 errors_total = Counter(
     'voicebot_errors_total',
@@ -228,6 +428,151 @@ def track_tts_api_call(characters: int, response_time: float):
     tts_response_time.labels(source='elevenlabs').observe(response_time)
 
 
+def track_dynamic_cache_event(event: str, hit_ratio: float):
+    """
+    Enregistre un événement du cache TTS dynamique
+
+    Args:
+        event: 'hits', 'misses' ou 'evictions'
+        hit_ratio: Taux de hit courant (0-1)
+    """
+    dynamic_cache_events.labels(event=event).inc()
+    dynamic_cache_hit_ratio.set(hit_ratio)
+
+
+def track_dynamic_cache_usage(entries: int, size_bytes: int):
+    """
+    Met à jour l'occupation du cache TTS dynamique
+
+    Args:
+        entries: Nombre d'entrées
+        size_bytes: Taille totale sur disque (octets)
+    """
+    dynamic_cache_entries.set(entries)
+    dynamic_cache_bytes.set(size_bytes)
+
+
+def track_caller_context_lookup(result: str, duration: float, hit_ratio: float):
+    """
+    Enregistre un chargement du contexte appelant
+
+    Args:
+        result: 'hits', 'negative_hits' ou 'misses'
+        duration: Temps de chargement (secondes)
+        hit_ratio: Taux de hit cumulé (0-1)
+    """
+    caller_context_lookups.labels(result=result).inc()
+    caller_context_lookup_seconds.labels(result=result).observe(duration)
+    caller_context_hit_ratio.set(hit_ratio)
+
+
+def track_technician_load(transfers: int, load_ratio: float):
+    """Met à jour la charge techniciens (transferts sur la fenêtre, ratio au seuil)"""
+    technician_transfers_window.set(transfers)
+    technician_load_ratio.set(load_ratio)
+
+
+def track_ticket_flush(result: str, rows: int, duration: float):
+    """
+    Enregistre l'écriture d'un lot de tickets
+
+    Args:
+        result: 'copy', 'rows' ou 'journaled'
+        rows: Nombre de tickets du lot
+        duration: Durée d'écriture (secondes)
+    """
+    ticket_flush_seconds.labels(result=result).observe(duration)
+    ticket_flush_rows.labels(result=result).inc(rows)
+
+
+def track_ticket_journal(depth: int):
+    """Met à jour le nombre de tickets restant dans le journal disque"""
+    ticket_journal_depth.set(depth)
+
+
+def track_post_call_job(result: str, latency: Optional[float] = None):
+    """
+    Enregistre un job de fin d'appel
+
+    Args:
+        result: 'done', 'degraded' (sans LLM), 'retry' ou 'failed'
+        latency: Délai depuis la fin d'appel (secondes), si le job est terminé
+    """
+    post_call_jobs.labels(result=result).inc()
+    if latency is not None:
+        post_call_job_latency.labels(result=result).observe(latency)
+
+
+def track_post_call_queue(depth: int):
+    """Met à jour le nombre de jobs de fin d'appel en attente"""
+    post_call_queue_depth.set(depth)
+
+
+def track_vad_event(event: str, segment_duration: Optional[float] = None):
+    """
+    Enregistre un événement de la VAD locale
+
+    Args:
+        event: 'speech_start', 'speech_end', 'duck' ou 'duck_released'
+        segment_duration: Durée du segment de parole (secondes), pour 'speech_end'
+    """
+    vad_events.labels(event=event).inc()
+    if segment_duration is not None:
+        vad_speech_segment_seconds.observe(segment_duration)
+
+
+def track_barge_in(trigger: str):
+    """Enregistre une interruption du bot ('vad' ou 'transcript')"""
+    barge_in_total.labels(trigger=trigger).inc()
+
+
+def track_stt_uplink(kind: str, size: int = 0, audio_duration: float = 0.0):
+    """
+    Enregistre un message envoyé sur une websocket Deepgram
+
+    Args:
+        kind: 'audio', 'keepalive' ou 'finalize'
+        size: Taille de l'audio envoyé (octets)
+        audio_duration: Durée de l'audio envoyé (secondes, facturée)
+    """
+    deepgram_uplink_messages.labels(kind=kind).inc()
+    if size:
+        deepgram_uplink_bytes.inc(size)
+        deepgram_audio_seconds.inc(audio_duration)
+
+
+def track_stt_profile_switch(profile: str, result: str):
+    """Enregistre un changement de profil STT ('ok' ou 'failed')"""
+    stt_profile_switches.labels(profile=profile, result=result).inc()
+
+
+def track_stt_attach(source: str, delay: float, dropped_frames: int = 0):
+    """
+    Enregistre l'attachement de la websocket Deepgram d'un appel
+
+    Args:
+        source: 'pool' ou 'new'
+        delay: Délai depuis le début de l'appel (secondes)
+        dropped_frames: Trames perdues faute de place dans le pré-roll
+    """
+    stt_attach_seconds.labels(source=source).observe(delay)
+    if dropped_frames:
+        stt_preroll_dropped_frames.inc(dropped_frames)
+
+
+def track_speculation(result: str, saved: Optional[float] = None):
+    """
+    Enregistre l'issue d'un traitement spéculatif
+
+    Args:
+        result: 'hit' ou 'miss'
+        saved: Latence gagnée (secondes), pour 'hit'
+    """
+    speculations_total.labels(result=result).inc()
+    if saved is not None:
+        speculation_saved_seconds.observe(saved)
+
+
 def track_stt_request(audio_duration: float, response_time: float):
     """
     Enregistre une requête Deepgram STT
@@ -247,7 +592,7 @@ def track_llm_request(model: str, task: str, tokens_in: int, tokens_out: int, re
 
     Args:
         model: Modèle utilisé (llama-3.1-70b-versatile)
-        task: Tâche (understanding, summary, classification)
+        task: Tâche (understanding, analysis)
         tokens_in: Tokens d'entrée
         tokens_out: Tokens de sortie
         response_time: Temps de réponse (secondes)
@@ -258,6 +603,59 @@ def track_llm_request(model: str, task: str, tokens_in: int, tokens_out: int, re
     llm_response_time.labels(task=task).observe(response_time)
 
 
+def track_playout_tick(jitter: float):
+    """
+    Enregistre le retard d'un tick de l'horloge de playout
+
+    Args:
+        jitter: Retard par rapport à l'échéance (secondes)
+    """
+    playout_jitter_seconds.observe(jitter)
+
+
+def track_playout_underrun():
+    """Enregistre une trame de silence insérée pendant que le bot parle"""
+    playout_underruns.inc()
+
+
+def track_playout_drop():
+    """Enregistre une trame abandonnée (tampon d'écriture AudioSocket plein)"""
+    playout_dropped_frames.inc()
+
+
+def track_decoder_acquire(source: str, duration: float, idle_count: int):
+    """
+    Enregistre l'obtention d'un décodeur FFmpeg
+
+    Args:
+        source: 'warm' (processus du pool) ou 'spawn' (lancement à froid)
+        duration: Temps d'obtention (secondes)
+        idle_count: Décodeurs chauds restants dans le pool
+    """
+    ffmpeg_decoder_acquire_seconds.labels(source=source).observe(duration)
+    ffmpeg_decoder_pool_idle.set(idle_count)
+
+
+def track_provider_request(provider: str, reused: bool):
+    """Enregistre une requête fournisseur et le type de connexion utilisée"""
+    provider_requests.labels(provider=provider, connection='reused' if reused else 'new').inc()
+
+
+def track_provider_pool(provider: str, open_connections: int, idle_connections: int, reuse_ratio: float):
+    """
+    Met à jour les statistiques du pool de connexions d'un fournisseur
+
+    Args:
+        provider: 'deepgram', 'elevenlabs' ou 'groq'
+        open_connections: Connexions ouvertes
+        idle_connections: Connexions keep-alive inactives (réutilisables)
+        reuse_ratio: Part des requêtes sans nouvelle connexion (0-1)
+    """
+    provider_pool_connections.labels(provider=provider, state='open').set(open_connections)
+    provider_pool_connections.labels(provider=provider, state='idle').set(idle_connections)
+    provider_pool_reuse_ratio.labels(provider=provider).set(reuse_ratio)
+
+
 def track_problem_detection(detected_type: str, score: int):
     """
     Enregistre la détection intelligente du problème
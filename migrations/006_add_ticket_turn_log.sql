@@ -0,0 +1,15 @@
+-- Migration 006: Ajout du journal des tours de parole
+-- Date: 2026-10-17
+-- Description: Stocke avec le ticket les tours client / voicebot (JSON compact, borné côté serveur)
+--              pour que l'analyse de fin d'appel et les techniciens disposent de la conversation
+
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS turn_log JSONB;
+
+-- Ajouter un commentaire
+COMMENT ON COLUMN tickets.turn_log IS 'Tours de parole [{role, text, at}] : role user/assistant, at en secondes depuis le début de l''appel';
+
+-- Log
+DO $$
+BEGIN
+    RAISE NOTICE 'Colonne turn_log ajoutée';
+END$$;
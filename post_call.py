@@ -0,0 +1,515 @@
+"""
+Traitements de fin d'appel (résumé LLM, classification, sentiment, ticket)
+File durable SQLite drainée par des workers : la fin d'appel libère la socket immédiatement
+"""
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+import metrics
+import db_utils
+from llm_client import LLMClient
+from turn_log import transcript_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUMMARY = "Appel traité par le voicebot."
+DEFAULT_CLASSIFICATION = {'tag': 'UNKNOWN', 'severity': 'MEDIUM'}
+DEFAULT_SENTIMENT = 'neutral'
+
+# Ordre de traitement : le technicien attend le ticket d'un transfert
+PRIORITY_BY_STATUS = {'transferred': 0, 'failed': 1, 'resolved': 2}
+
+# Mots critiques à remplacer (insultes, propos sensibles)
+CRITICAL_WORDS = {
+    # Insultes courantes
+    'con': '***',
+    'connard': '***',
+    'connasse': '***',
+    'putain': '***',
+    'merde': '***',
+    'bordel': '***',
+    'enculé': '***',
+    'salope': '***',
+    'pute': '***',
+
+    # Expressions agressives
+    'va te faire': '***',
+    'nique': '***',
+    'fous-toi': '***',
+
+    # Mots sensibles business
+    'arnaque': 'pratique contestable',
+    'voleur': 'surfacturation',
+    'incompétent': 'difficulté technique',
+    'nul': 'insuffisant',
+    'pourri': 'défaillant'
+}
+
+
+def filter_critical_words(text: str) -> str:
+    """
+    Filtre les mots critiques/sensibles du texte pour éviter mauvaises interprétations
+
+    Args:
+        text: Texte à filtrer (summary généré par LLM)
+
+    Returns:
+        Texte filtré sans mots critiques
+    """
+    if not text:
+        return text
+
+    filtered_text = text.lower()
+
+    # Remplacer chaque mot critique
+    for word, replacement in CRITICAL_WORDS.items():
+        filtered_text = filtered_text.replace(word, replacement)
+
+    return filtered_text
+
+
+# Tags stricts par type de problème
+INTERNET_TAGS = ('FIBRE_SYNCHRO', 'FIBRE_DEBIT', 'WIFI_FAIBLE', 'BOX_ETEINTE', 'CONNEXION_INSTABLE', 'DNS_PROBLEME')
+MOBILE_TAGS = ('MOBILE_RESEAU', 'MOBILE_DATA', 'MOBILE_APPELS', 'MOBILE_SMS', 'CARTE_SIM')
+VALID_TAGS = frozenset(INTERNET_TAGS + MOBILE_TAGS)
+VALID_SEVERITIES = ('LOW', 'MEDIUM', 'HIGH')
+VALID_SENTIMENTS = ('positive', 'neutral', 'negative')
+
+ANALYSIS_PROMPT = (
+    "Tu es un expert SAV : résumé, classification et analyse de sentiment d'un appel "
+    "à partir de sa description et de sa transcription.\n"
+    "- summary : résumé très court (1 phrase) de l'appel\n"
+    f"- tag : un tag strict. INTERNET : {', '.join(INTERNET_TAGS)}. MOBILE : {', '.join(MOBILE_TAGS)}\n"
+    "- severity : LOW, MEDIUM ou HIGH\n"
+    "- sentiment : sentiment du client, positive, neutral ou negative\n\n"
+    "Réponds UNIQUEMENT au format JSON strict :\n"
+    "{\"summary\": \"...\", \"tag\": \"XXX\", \"severity\": \"LOW|MEDIUM|HIGH\", "
+    "\"sentiment\": \"positive|neutral|negative\"}"
+)
+
+
+def conversation_context(job: Dict) -> str:
+    """Description de l'appel envoyée au LLM (avec la transcription bornée des tours de parole)"""
+    context = (
+        f"Type de problème: {job.get('problem_type') or 'inconnu'}\n"
+        f"État final: {job.get('final_state')}\n"
+        f"Durée: {job.get('duration_seconds', 0)}s\n"
+        f"Infos utilisateur: {job.get('user_info') or 'Non renseigné'}"
+    )
+    transcript = transcript_text(job.get('turns'))
+    if transcript:
+        context += f"\n\nConversation:\n{transcript}"
+    return context
+
+
+def default_analysis(problem_type: Optional[str] = None) -> Dict[str, str]:
+    """Valeurs du ticket sans analyse LLM (ou si la réponse est invalide)"""
+    return {
+        'summary': f"Problème {problem_type} traité." if problem_type else DEFAULT_SUMMARY,
+        'tag': DEFAULT_CLASSIFICATION['tag'],
+        'severity': DEFAULT_CLASSIFICATION['severity'],
+        'sentiment': DEFAULT_SENTIMENT
+    }
+
+
+def parse_analysis(call_id: str, result: str, problem_type: Optional[str] = None) -> Dict[str, str]:
+    """
+    Valide la réponse JSON de l'analyse, champ par champ
+
+    Un champ absent ou invalide prend sa valeur par défaut sans invalider
+    les autres (ex: un tag hors liste n'empêche pas de garder le résumé).
+
+    Returns:
+        Dict avec 'summary', 'tag', 'severity' et 'sentiment'
+    """
+    analysis = default_analysis(problem_type)
+
+    try:
+        data = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+    if not isinstance(data, dict):
+        logger.warning(f"[{call_id}] Invalid JSON from post-call analysis: {result}")
+        return analysis
+
+    invalid = []
+
+    summary = data.get('summary')
+    if isinstance(summary, str) and summary.strip():
+        analysis['summary'] = summary.strip()
+    else:
+        invalid.append('summary')
+
+    tag = str(data.get('tag', '')).strip().upper()
+    if tag in VALID_TAGS:
+        analysis['tag'] = tag
+    else:
+        invalid.append('tag')
+
+    severity = str(data.get('severity', '')).strip().upper()
+    if severity in VALID_SEVERITIES:
+        analysis['severity'] = severity
+    else:
+        invalid.append('severity')
+
+    sentiment = str(data.get('sentiment', '')).strip().lower()
+    if sentiment in VALID_SENTIMENTS:
+        analysis['sentiment'] = sentiment
+    else:
+        invalid.append('sentiment')
+
+    if invalid:
+        logger.warning(f"[{call_id}] Post-call analysis: invalid {', '.join(invalid)} in {result}, using defaults")
+    return analysis
+
+
+async def analyze_call(llm: LLMClient, call_id: str, job: Dict) -> Dict[str, str]:
+    """
+    Résumé, tag, sévérité et sentiment en une seule requête LLM (JSON strict)
+
+    Remplace la chaîne résumé -> classification -> sentiment (trois requêtes
+    dont deux attendaient la première).
+
+    Raises:
+        Exception: Erreur API ou timeout (le job est retenté)
+    """
+    result = await llm.complete(
+        [
+            {"role": "system", "content": ANALYSIS_PROMPT},
+            {"role": "user", "content": conversation_context(job)}
+        ],
+        task="analysis",
+        response_format={"type": "json_object"}
+    )
+
+    analysis = parse_analysis(call_id, result, job.get('problem_type'))
+    logger.info(
+        f"[{call_id}] Call analyzed: {analysis['tag']} ({analysis['severity']}), "
+        f"sentiment {analysis['sentiment']} - {analysis['summary']}"
+    )
+    return analysis
+
+
+def _extract_email(user_info: str) -> Optional[str]:
+    if '@' not in user_info:
+        return None
+    email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', user_info)
+    return email_match.group(0) if email_match else None
+
+
+class PostCallQueue:
+    """
+    File durable des traitements de fin d'appel
+
+    _cleanup dépose un job (insertion SQLite, quelques ms) et ferme la socket
+    AudioSocket tout de suite : l'appel ne garde plus son slot pendant les
+    requêtes LLM et l'écriture du ticket. Des workers drainent ensuite la file :
+    - priorité : transferts, puis échecs, puis appels résolus
+    - retry avec délai exponentiel (POST_CALL_RETRY_BASE) si le LLM échoue ;
+      la dernière tentative écrit le ticket sans LLM (valeurs par défaut)
+    - contre-pression : au-delà de POST_CALL_DEGRADE_DEPTH jobs en attente,
+      les tickets sont écrits sans analyse LLM pour rattraper le retard
+    Un job interrompu (arrêt, crash) reste dans la base et est repris au
+    démarrage suivant ; le ticket n'est pas dupliqué (ON CONFLICT call_uuid).
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient,
+        path: Path = config.POST_CALL_QUEUE_PATH,
+        workers: int = config.POST_CALL_WORKERS,
+        max_attempts: int = config.POST_CALL_MAX_ATTEMPTS
+    ):
+        self.llm = llm
+        self.path = Path(path)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.depth = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        # sqlite3 n'est pas thread-safe : toutes les requêtes passent par ce thread
+        self._db_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="post-call-db")
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # --- SQLite (thread dédié) ---
+
+    def _open(self) -> int:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")  # Job sur disque avant de fermer la socket
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                enqueued_at REAL NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                last_error TEXT
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, priority, id)")
+        # Jobs en cours lors d'un arrêt précédent : à reprendre
+        conn.execute("UPDATE jobs SET state = 'pending' WHERE state = 'running'")
+        conn.commit()
+        self._conn = conn
+        return self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state IN ('pending', 'running')"
+        ).fetchone()[0]
+
+    def _insert(self, payload: str, priority: int, now: float) -> int:
+        self._conn.execute(
+            "INSERT INTO jobs (priority, payload, next_attempt_at, enqueued_at) VALUES (?, ?, ?, ?)",
+            (priority, payload, now, now)
+        )
+        self._conn.commit()
+        return self._count()
+
+    def _claim(self, now: float) -> Optional[Tuple[int, str, int, float]]:
+        row = self._conn.execute(
+            """
+            SELECT id, payload, attempts, enqueued_at FROM jobs
+            WHERE state = 'pending' AND next_attempt_at <= ?
+            ORDER BY priority, id
+            LIMIT 1
+            """,
+            (now,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._conn.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1 WHERE id = ?", (row[0],))
+        self._conn.commit()
+        return row[0], row[1], row[2] + 1, row[3]
+
+    def _complete(self, job_id: int) -> int:
+        self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._conn.commit()
+        return self._count()
+
+    def _reschedule(self, job_id: int, next_attempt_at: float, error: str) -> int:
+        self._conn.execute(
+            "UPDATE jobs SET state = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (next_attempt_at, error, job_id)
+        )
+        self._conn.commit()
+        return self._count()
+
+    def _fail(self, job_id: int, error: str) -> int:
+        # Conservé (state = 'failed') pour analyse manuelle
+        self._conn.execute("UPDATE jobs SET state = 'failed', last_error = ? WHERE id = ?", (error, job_id))
+        self._conn.commit()
+        return self._count()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._db_thread, fn, *args)
+
+    def _set_depth(self, depth: int):
+        self.depth = depth
+        try:
+            metrics.track_post_call_queue(depth)
+        except Exception as e:
+            logger.debug(f"Failed to track post-call queue: {e}")
+
+    # --- Cycle de vie ---
+
+    async def start(self):
+        """Ouvre la file et lance les workers (reprend les jobs d'un arrêt précédent)"""
+        if self._tasks:
+            return
+
+        self._set_depth(await self._db(self._open))
+        if self.depth:
+            logger.info(f"Post-call queue: resuming {self.depth} pending job(s)")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"✓ Post-call queue ready ({self.workers} workers, {self.path})")
+
+    async def stop(self):
+        """Arrête les workers (les jobs non terminés restent dans la file)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        await self._db(self._close)
+        self._db_thread.shutdown(wait=True)
+        logger.info(f"✓ Post-call queue stopped ({self.depth} job(s) left)")
+
+    async def enqueue(self, job: Dict):
+        """
+        Dépose le job de fin d'appel (écrit sur disque avant de rendre la main)
+
+        Args:
+            job: Données de l'appel (voir CallHandler._post_call_job)
+        """
+        priority = PRIORITY_BY_STATUS.get(job.get('status'), len(PRIORITY_BY_STATUS))
+
+        if not self._tasks:
+            # File non démarrée (outil en ligne de commande) : traitement immédiat
+            await self.process(job)
+            return
+
+        try:
+            depth = await self._db(self._insert, json.dumps(job, default=str), priority, time.time())
+        except Exception as e:
+            logger.error(f"[{job.get('call_id')}] Failed to enqueue post-call job: {e} - processing inline")
+            await self.process(job)
+            return
+
+        self._set_depth(depth)
+        self._wakeup.set()
+        logger.debug(f"[{job.get('call_id')}] Post-call job queued (priority {priority}, depth {depth})")
+
+    # --- Workers ---
+
+    async def _worker(self):
+        while True:
+            try:
+                # Effacé avant la recherche : un job déposé entre-temps réveille le worker
+                self._wakeup.clear()
+                claimed = await self._db(self._claim, time.time())
+                if claimed is None:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=config.POST_CALL_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run_job(*claimed)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Post-call worker error: {e}")
+                await asyncio.sleep(config.POST_CALL_POLL_INTERVAL)
+
+    async def _run_job(self, job_id: int, payload: str, attempts: int, enqueued_at: float):
+        job = json.loads(payload)
+        call_id = job.get('call_id')
+
+        last_attempt = attempts >= self.max_attempts
+        degraded = last_attempt or self.depth > config.POST_CALL_DEGRADE_DEPTH
+
+        try:
+            await self.process(job, use_llm=not degraded)
+        except Exception as e:
+            if last_attempt:
+                logger.error(f"[{call_id}] Post-call job failed after {attempts} attempt(s): {e}")
+                self._set_depth(await self._db(self._fail, job_id, str(e)))
+                self._track('failed', time.time() - enqueued_at)
+            else:
+                delay = config.POST_CALL_RETRY_BASE * 2 ** (attempts - 1)
+                logger.warning(f"[{call_id}] Post-call job attempt {attempts} failed ({e}), retry in {delay:.0f}s")
+                self._set_depth(await self._db(self._reschedule, job_id, time.time() + delay, str(e)))
+                self._track('retry')
+            return
+
+        self._set_depth(await self._db(self._complete, job_id))
+        self._track('degraded' if degraded else 'done', time.time() - enqueued_at)
+
+    @staticmethod
+    def _track(result: str, latency: Optional[float] = None):
+        try:
+            metrics.track_post_call_job(result, latency)
+        except Exception as e:
+            logger.debug(f"Failed to track post-call job: {e}")
+
+    # --- Traitement ---
+
+    async def process(self, job: Dict, use_llm: bool = True) -> Optional[int]:
+        """
+        Analyse l'appel (résumé, tag, sévérité, sentiment) et écrit le ticket
+
+        Args:
+            job: Données de l'appel
+            use_llm: False pour écrire le ticket avec les valeurs par défaut
+
+        Returns:
+            ID du ticket, ou None s'il n'a pas été écrit (journalisé par TicketWriter)
+
+        Raises:
+            Exception: Erreur LLM (le job est retenté)
+        """
+        call_id = job['call_id']
+        problem_type = job.get('problem_type')
+
+        # Sans problème identifié, rien à analyser
+        if use_llm and problem_type:
+            analysis = await analyze_call(self.llm, call_id, job)
+        else:
+            analysis = default_analysis(problem_type)
+
+        summary = analysis['summary']
+        classification = {'tag': analysis['tag'], 'severity': analysis['severity']}
+        sentiment = analysis['sentiment']
+
+        ended_at = datetime.fromtimestamp(job['ended_at'])
+
+        # Préparer les données du ticket
+        ticket_data = {
+            'call_uuid': call_id,
+            'phone_number': job.get('phone_number') or call_id,  # Fallback sur call_id
+            'client_name': job.get('client_name'),
+            'client_email': _extract_email(job.get('user_info') or ''),
+            'problem_type': problem_type or 'unknown',
+            'status': job['status'],
+            'sentiment': sentiment,
+            'summary': filter_critical_words(summary),  # Summary filtré sans mots critiques
+            'duration_seconds': job['duration_seconds'],
+            'tag': classification['tag'],
+            'severity': classification['severity'],
+            'call_date': ended_at.date(),
+            'call_time': ended_at.time(),
+            'turn_log': json.dumps(job.get('turns') or [], ensure_ascii=False)
+        }
+
+        # Sauvegarder dans la DB
+        ticket_id = await db_utils.create_ticket(ticket_data)
+        if not ticket_id:
+            logger.warning(f"[{call_id}] Ticket not saved to DB (journaled for replay if the DB is unreachable)")
+            return None
+
+        logger.info(f"[{call_id}] Ticket saved: {ticket_id} (tag: {classification['tag']}, sentiment: {sentiment})")
+
+        # TRACKING MÉTRIQUES PROMETHEUS
+        try:
+            # Enregistrer l'appel complété
+            metrics.track_call_completed(
+                status=job['status'],
+                problem_type=problem_type or 'unknown',
+                duration=job['duration_seconds'],
+                sentiment=sentiment
+            )
+
+            # Enregistrer le ticket créé
+            metrics.track_ticket_created(
+                severity=classification['severity'],
+                tag=classification['tag'],
+                problem_type=problem_type or 'unknown'
+            )
+        except Exception as e:
+            logger.error(f"[{call_id}] Failed to track metrics: {e}")
+
+        return ticket_id
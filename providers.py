@@ -0,0 +1,414 @@
+"""
+Registre des clients fournisseurs (Deepgram, ElevenLabs, Groq) partagés par tous les appels
+Créé une seule fois dans main() : pré-chauffage des connexions, keep-alive et statistiques de pool
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+from deepgram import DeepgramClient
+from elevenlabs.client import ElevenLabs
+
+import config
+import metrics
+from llm_client import LLMClient
+from stt_profiles import SttProfile, SttProfiles
+
+logger = logging.getLogger(__name__)
+
+DEEPGRAM_HOST = "api.deepgram.com"
+
+
+class ConnectionStats:
+    """
+    Statistiques d'un pool de connexions fournisseur
+
+    Les requêtes HTTP sont observées via l'extension "trace" d'httpcore :
+    une requête qui déclenche connect_tcp a ouvert une nouvelle connexion,
+    les autres ont réutilisé une connexion keep-alive du pool.
+    """
+
+    def __init__(self, provider: str, http_client=None):
+        self.provider = provider
+        self.http_client = http_client
+        self.requests = 0
+        self.new_connections = 0
+        self.last_request_time = 0.0
+        self.healthy = True
+        self._lock = threading.Lock()
+
+    def record(self, reused: bool):
+        with self._lock:
+            self.requests += 1
+            if not reused:
+                self.new_connections += 1
+            self.last_request_time = time.time()
+
+        try:
+            metrics.track_provider_request(self.provider, reused)
+        except Exception as e:
+            logger.debug(f"Failed to track {self.provider} request: {e}")
+
+    @property
+    def reuse_ratio(self) -> float:
+        with self._lock:
+            if self.requests == 0:
+                return 0.0
+            return 1.0 - self.new_connections / self.requests
+
+    def pool_connections(self) -> tuple:
+        """(connexions ouvertes, connexions inactives) du pool httpx sous-jacent"""
+        pool = getattr(getattr(self.http_client, '_transport', None), '_pool', None)
+        connections = list(getattr(pool, 'connections', []))
+        idle = sum(1 for conn in connections if conn.is_idle())
+        return len(connections), idle
+
+    def sync_hooks(self) -> Dict:
+        """Event hooks pour un httpx.Client (appels depuis les threads I/O)"""
+        def on_request(request: httpx.Request):
+            new_connection = False
+
+            def trace(event_name: str, info: dict):
+                nonlocal new_connection
+                if event_name == "connection.connect_tcp.started":
+                    new_connection = True
+                elif event_name.endswith("send_request_headers.started"):
+                    self.record(reused=not new_connection)
+
+            request.extensions["trace"] = trace
+
+        return {'request': [on_request]}
+
+    def async_hooks(self) -> Dict:
+        """Event hooks pour un httpx.AsyncClient"""
+        async def on_request(request: httpx.Request):
+            new_connection = False
+
+            async def trace(event_name: str, info: dict):
+                nonlocal new_connection
+                if event_name == "connection.connect_tcp.started":
+                    new_connection = True
+                elif event_name.endswith("send_request_headers.started"):
+                    self.record(reused=not new_connection)
+
+            request.extensions["trace"] = trace
+
+        return {'request': [on_request]}
+
+
+class ProviderRegistry:
+    """
+    Clients Deepgram, ElevenLabs et Groq créés une fois pour tout le processus
+
+    Évite, à chaque appel entrant, la construction des SDK, de nouveaux pools
+    de connexions et de nouvelles poignées de main TLS sur le chemin critique.
+    - ElevenLabs : httpx.Client partagé (utilisé depuis les threads I/O TTS)
+    - Groq : LLMClient asynchrone sur un httpx.AsyncClient partagé
+    - Deepgram : un client ; chaque appel ouvre sa propre websocket live
+    Les transports réessaient une fois les échecs de connexion (reconnexion
+    transparente si le fournisseur a fermé une connexion keep-alive).
+    """
+
+    def __init__(self):
+        limits = dict(keepalive_expiry=config.PROVIDER_KEEPALIVE_EXPIRY)
+
+        # ElevenLabs (SDK synchrone consommé dans les threads I/O)
+        self.tts_stats = ConnectionStats("elevenlabs")
+        self._tts_http = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=config.TTS_IO_THREADS,
+                max_keepalive_connections=config.TTS_IO_THREADS,
+                **limits
+            ),
+            transport=httpx.HTTPTransport(retries=1),
+            timeout=config.API_TIMEOUT,
+            follow_redirects=True,
+            event_hooks=self.tts_stats.sync_hooks()
+        )
+        self.tts_stats.http_client = self._tts_http
+        self.elevenlabs = ElevenLabs(api_key=config.ELEVENLABS_API_KEY, httpx_client=self._tts_http)
+
+        # Groq (client asynchrone)
+        self.llm_stats = ConnectionStats("groq")
+        self._llm_http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.LLM_MAX_CONCURRENT_REQUESTS,
+                max_keepalive_connections=config.LLM_MAX_CONCURRENT_REQUESTS,
+                **limits
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=1),
+            timeout=config.API_TIMEOUT,
+            event_hooks=self.llm_stats.async_hooks()
+        )
+        self.llm_stats.http_client = self._llm_http
+        self.llm = LLMClient(
+            api_key=config.GROQ_API_KEY,
+            base_url=config.GROQ_BASE_URL,
+            http_client=self._llm_http
+        )
+
+        # Deepgram (une websocket live par appel, ouverte à l'avance dans un pool)
+        self.deepgram_stats = ConnectionStats("deepgram")
+        self.deepgram = DeepgramClient(config.DEEPGRAM_API_KEY)
+        self._deepgram_live = set()
+        self._deepgram_idle = deque()  # (websocket démarrée, profil STT, ouverte à)
+        self._deepgram_profile: Optional[SttProfile] = None  # Profil des websockets du pool
+        self._deepgram_refill = asyncio.Event()
+        self._deepgram_closing = set()  # Fermetures en arrière-plan des websockets écartées
+        self._deepgram_pool_task: Optional[asyncio.Task] = None
+
+        self._maintenance_task: Optional[asyncio.Task] = None
+
+    # --- Deepgram ---
+
+    def open_deepgram_connection(self, track: bool = True):
+        """
+        Crée la websocket live d'un appel
+
+        Args:
+            track: Compter l'ouverture dans les statistiques du pool (False pour
+                un changement de profil STT en cours d'appel : le pool ne sert
+                qu'au rattachement d'un nouvel appel)
+        """
+        connection = self.deepgram.listen.asyncwebsocket.v("1")
+        self._deepgram_live.add(id(connection))
+        if track:
+            self.deepgram_stats.record(reused=False)
+        return connection
+
+    def release_deepgram_connection(self, connection):
+        """À appeler quand la websocket live d'un appel est fermée"""
+        self._deepgram_live.discard(id(connection))
+
+    def acquire_deepgram_connection(self, profile: SttProfile):
+        """
+        Websocket déjà démarrée du pool, sans attente (None si aucune ne convient)
+
+        Le pool suit le profil demandé par le dernier appel : les websockets
+        ouvertes avec un autre profil (stt_keywords.yaml modifié) sont fermées
+        et remplacées en arrière-plan.
+        """
+        self._deepgram_profile = profile
+        self._deepgram_refill.set()
+
+        while self._deepgram_idle:
+            connection, pooled_profile, opened_at = self._deepgram_idle.popleft()
+            if pooled_profile != profile or time.time() - opened_at > config.DEEPGRAM_POOL_MAX_AGE:
+                task = asyncio.create_task(self._close_deepgram(connection))
+                self._deepgram_closing.add(task)
+                task.add_done_callback(self._deepgram_closing.discard)
+                continue
+            self._deepgram_live.add(id(connection))
+            self.deepgram_stats.record(reused=True)
+            return connection
+        return None
+
+    async def _open_pooled_deepgram(self, profile: SttProfile) -> bool:
+        connection = self.deepgram.listen.asyncwebsocket.v("1")
+        try:
+            started = await connection.start(profile.live_options())
+        except Exception as e:
+            logger.debug(f"Deepgram pool connection error: {e}")
+            started = False
+
+        if not started:
+            if self.deepgram_stats.healthy:
+                logger.warning("  deepgram unreachable: pooled websocket failed to start")
+            self.deepgram_stats.healthy = False
+            return False
+
+        if not self.deepgram_stats.healthy:
+            logger.info("✓ deepgram reconnected")
+        self.deepgram_stats.healthy = True
+        self._deepgram_idle.append((connection, profile, time.time()))
+        return True
+
+    async def _close_deepgram(self, connection):
+        try:
+            await connection.finish()
+        except Exception as e:
+            logger.debug(f"Deepgram pool close error: {e}")
+
+    async def _fill_deepgram_pool(self) -> int:
+        """Ouvre les websockets manquantes du pool (en parallèle) ; renvoie le nombre ouvert"""
+        if self._deepgram_profile is None:
+            self._deepgram_profile = SttProfiles.load().for_state(None)
+        missing = config.DEEPGRAM_POOL_SIZE - len(self._deepgram_idle)
+        if missing <= 0:
+            return 0
+        results = await asyncio.gather(*(self._open_pooled_deepgram(self._deepgram_profile) for _ in range(missing)))
+        return sum(results)
+
+    async def _keep_deepgram_pool_alive(self):
+        """KeepAlive des websockets inactives ; celles qui ont échoué ou expiré sont fermées"""
+        now = time.time()
+        for entry in list(self._deepgram_idle):
+            connection, profile, opened_at = entry
+            expired = profile != self._deepgram_profile or now - opened_at > config.DEEPGRAM_POOL_MAX_AGE
+            alive = not expired and await connection.keep_alive()
+            if not alive and entry in self._deepgram_idle:
+                self._deepgram_idle.remove(entry)
+                await self._close_deepgram(connection)
+
+    async def _deepgram_pool_loop(self):
+        """Garde DEEPGRAM_POOL_SIZE websockets démarrées et vivantes (réveillée à chaque prise)"""
+        try:
+            while True:
+                try:
+                    await self._keep_deepgram_pool_alive()
+                    await self._fill_deepgram_pool()
+                except Exception as e:
+                    logger.debug(f"Deepgram pool refill error: {e}")
+
+                self._deepgram_refill.clear()
+                try:
+                    await asyncio.wait_for(self._deepgram_refill.wait(), timeout=config.DEEPGRAM_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            pass
+
+    # --- Pré-chauffage / keep-alive ---
+
+    async def _ping_elevenlabs(self):
+        await asyncio.to_thread(self.elevenlabs.models.get_all)
+
+    async def _ping_groq(self):
+        await self.llm.ping()
+
+    async def _ping(self, stats: ConnectionStats, ping) -> bool:
+        try:
+            await ping()
+        except Exception as e:
+            if stats.healthy:
+                logger.warning(f"  {stats.provider} unreachable: {e}")
+            stats.healthy = False
+            return False
+
+        if not stats.healthy:
+            logger.info(f"✓ {stats.provider} reconnected")
+        stats.healthy = True
+        return True
+
+    def _pingers(self):
+        return [(self.tts_stats, self._ping_elevenlabs), (self.llm_stats, self._ping_groq)]
+
+    async def prewarm(self):
+        """
+        Ouvre les connexions (DNS + TCP + TLS) avant le premier appel
+
+        Les pings sont lancés en parallèle pour remplir le pool avec
+        PROVIDER_PREWARM_CONNECTIONS connexions keep-alive par fournisseur.
+        """
+        start_time = time.time()
+        pings = [
+            self._ping(stats, ping)
+            for stats, ping in self._pingers()
+            for _ in range(config.PROVIDER_PREWARM_CONNECTIONS)
+        ]
+        results = await asyncio.gather(*pings)
+
+        # Deepgram : websockets démarrées à l'avance (pool), sinon résolution DNS seulement
+        if config.DEEPGRAM_POOL_SIZE > 0:
+            opened = await self._fill_deepgram_pool()
+            logger.info(f"✓ Deepgram pool: {opened}/{config.DEEPGRAM_POOL_SIZE} websockets ready")
+        else:
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.getaddrinfo(DEEPGRAM_HOST, 443)
+            except Exception as e:
+                logger.warning(f"  deepgram DNS resolution failed: {e}")
+
+        self.update_metrics()
+        logger.info(
+            f"✓ Provider connections pre-warmed ({sum(results)}/{len(results)} ok) "
+            f"in {(time.time() - start_time) * 1000:.0f}ms"
+        )
+
+    def start(self):
+        """Lance la tâche de keep-alive et de mise à jour des statistiques"""
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+        if self._deepgram_pool_task is None and config.DEEPGRAM_POOL_SIZE > 0:
+            self._deepgram_pool_task = asyncio.create_task(self._deepgram_pool_loop())
+
+    async def _maintenance_loop(self):
+        """Garde les pools chauds (ping des fournisseurs inactifs) et publie les gauges"""
+        try:
+            while True:
+                await asyncio.sleep(config.PROVIDER_STATS_INTERVAL)
+
+                now = time.time()
+                idle_pings = [
+                    self._ping(stats, ping)
+                    for stats, ping in self._pingers()
+                    if now - stats.last_request_time >= config.PROVIDER_KEEPALIVE_INTERVAL
+                ]
+                if idle_pings:
+                    await asyncio.gather(*idle_pings)
+
+                self.update_metrics()
+        except asyncio.CancelledError:
+            pass
+
+    def update_metrics(self):
+        """Publie les statistiques de pool par fournisseur (Prometheus)"""
+        try:
+            for stats in (self.tts_stats, self.llm_stats):
+                open_connections, idle = stats.pool_connections()
+                metrics.track_provider_pool(stats.provider, open_connections, idle, stats.reuse_ratio)
+
+            metrics.track_provider_pool(
+                self.deepgram_stats.provider,
+                len(self._deepgram_live) + len(self._deepgram_idle),
+                len(self._deepgram_idle),
+                self.deepgram_stats.reuse_ratio
+            )
+        except Exception as e:
+            logger.debug(f"Failed to track provider pools: {e}")
+
+    def get_stats(self) -> Dict:
+        """Statistiques par fournisseur (logs / debug)"""
+        stats = {}
+        for provider_stats in (self.tts_stats, self.llm_stats):
+            open_connections, idle = provider_stats.pool_connections()
+            stats[provider_stats.provider] = {
+                'requests': provider_stats.requests,
+                'new_connections': provider_stats.new_connections,
+                'reuse_ratio': round(provider_stats.reuse_ratio, 3),
+                'open': open_connections,
+                'idle': idle
+            }
+        stats['deepgram'] = {
+            'requests': self.deepgram_stats.requests,
+            'new_connections': self.deepgram_stats.new_connections,
+            'reuse_ratio': round(self.deepgram_stats.reuse_ratio, 3),
+            'open': len(self._deepgram_live) + len(self._deepgram_idle),
+            'idle': len(self._deepgram_idle)
+        }
+        return stats
+
+    async def close(self):
+        """Arrête le keep-alive et ferme les pools de connexions"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+            self._maintenance_task = None
+        if self._deepgram_pool_task:
+            self._deepgram_pool_task.cancel()
+            await asyncio.gather(self._deepgram_pool_task, return_exceptions=True)
+            self._deepgram_pool_task = None
+
+        # Websockets Deepgram du pool jamais attribuées
+        while self._deepgram_idle:
+            connection, _, _ = self._deepgram_idle.popleft()
+            await self._close_deepgram(connection)
+
+        logger.info(f"Provider pool stats: {self.get_stats()}")
+        await self.llm.close()
+        self._tts_http.close()
+        logger.info("✓ Provider clients closed")
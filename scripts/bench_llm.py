@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark du client LLM contre un serveur Groq factice (local, latence simulée)
+
+Compare N appels simultanés :
+- ancien comportement : client Groq synchrone appelé depuis la boucle asyncio (sérialisé)
+- LLMClient asynchrone partagé (requêtes en parallèle sur un pool keep-alive)
+
+Usage:
+    python scripts/bench_llm.py --calls 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from groq import Groq  # noqa: E402
+
+from llm_client import LLMClient  # noqa: E402
+
+
+class FakeLLMServer:
+    """
+    Serveur HTTP minimal compatible avec l'API chat/completions de Groq
+
+    Tourne dans son propre thread (boucle dédiée) pour que le client synchrone
+    mesuré ne bloque pas aussi le serveur.
+    """
+
+    def __init__(self, latency: float, reply: str = "D'accord, je vérifie cela."):
+        self.latency = latency
+        self.reply = reply
+        self.requests = 0
+        self.prompt_chars = 0
+        self.completion_chars = 0
+        self.port = None
+        self._server = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    def start(self) -> str:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    async def _stop(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def reply_for(self, request: dict) -> str:
+        """Texte de la réponse (surchargeable)"""
+        return self.reply
+
+    def completion_body(self, request: dict) -> dict:
+        """Réponse renvoyée pour une requête (surchargeable)"""
+        reply = self.reply_for(request)
+        self.completion_chars += len(reply)
+        return {
+            "id": "fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": sum(len(m.get("content", "")) for m in request.get("messages", [])) // 4,
+                "completion_tokens": len(reply) // 4,
+                "total_tokens": 0
+            }
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = {}
+                for line in head.decode("latin-1").split("\r\n")[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                request = json.loads(body or b"{}")
+                self.requests += 1
+                self.prompt_chars += sum(len(m.get("content", "")) for m in request.get("messages", []))
+
+                await asyncio.sleep(self.latency)
+
+                payload = json.dumps(self.completion_body(request)).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii")
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+MESSAGES = [
+    {"role": "system", "content": "Tu es l'assistant vocal du SAV."},
+    {"role": "user", "content": "Ma box ne fonctionne plus depuis ce matin."}
+]
+
+
+async def bench_blocking(base_url: str, calls: int) -> float:
+    """Ancien comportement : client synchrone appelé dans les coroutines (bloque la boucle)"""
+    client = Groq(api_key="fake", base_url=base_url)
+
+    async def call():
+        client.chat.completions.create(model="fake", messages=MESSAGES)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return time.perf_counter() - start
+
+
+async def bench_async(base_url: str, calls: int) -> float:
+    """LLMClient partagé : les requêtes des différents appels se chevauchent"""
+    client = LLMClient(api_key="fake", base_url=base_url, max_concurrent=calls)
+    try:
+        # Connexions établies une fois (comme en production après le premier appel)
+        await client.complete(MESSAGES, task="bench")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client.complete(MESSAGES, task="bench") for _ in range(calls)))
+        return time.perf_counter() - start
+    finally:
+        await client.close()
+
+
+async def main(args: argparse.Namespace):
+    server = FakeLLMServer(latency=args.latency)
+    base_url = server.start()
+
+    try:
+        blocking = await bench_blocking(base_url, args.calls)
+        print(f"Client synchrone (ancien) : {args.calls} appels en {blocking:.2f}s")
+
+        concurrent = await bench_async(base_url, args.calls)
+        print(f"LLMClient asynchrone      : {args.calls} appels en {concurrent:.2f}s")
+        print(f"Gain: x{blocking / concurrent:.1f} (latence simulée {args.latency:.2f}s par requête)")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LLM contre un serveur factice")
+    parser.add_argument("--calls", type=int, default=20, help="Nombre d'appels simultanés")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée par requête (secondes)")
+    asyncio.run(main(parser.parse_args()))
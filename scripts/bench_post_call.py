@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'analyse de fin d'appel contre un serveur Groq factice
+
+Compare, pour N fins d'appel simultanées :
+- ancienne chaîne : résumé, puis classification et sentiment sur ce résumé (3 requêtes)
+- post_call.analyze_call : une requête JSON (résumé, tag, sévérité, sentiment)
+
+Mesure la latence par appel, le nombre de requêtes et les tokens (estimés
+par le serveur factice : ~4 caractères par token).
+
+Usage:
+    python scripts/bench_post_call.py --calls 20 --latency 0.4
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_llm import FakeLLMServer  # noqa: E402
+from llm_client import LLMClient  # noqa: E402
+from post_call import ANALYSIS_PROMPT, analyze_call, conversation_context  # noqa: E402
+
+SUMMARY = "Le client signale une box éteinte depuis ce matin, le redémarrage n'a rien changé."
+
+# Prompts de l'ancienne chaîne (trois requêtes)
+SUMMARY_PROMPT = "Génère un résumé très court (1 phrase) de cet appel SAV."
+CLASSIFY_PROMPT = (
+    "Tu es un expert en classification de problèmes SAV.\n"
+    "Classifie le problème avec un tag strict.\n\n"
+    "TAGS INTERNET : FIBRE_SYNCHRO, FIBRE_DEBIT, WIFI_FAIBLE, BOX_ETEINTE, CONNEXION_INSTABLE, DNS_PROBLEME\n"
+    "TAGS MOBILE : MOBILE_RESEAU, MOBILE_DATA, MOBILE_APPELS, MOBILE_SMS, CARTE_SIM\n\n"
+    "Réponds au format JSON strict : {\"tag\": \"XXX\", \"severity\": \"LOW|MEDIUM|HIGH\"}\n"
+    "Exemple: {\"tag\": \"FIBRE_SYNCHRO\", \"severity\": \"MEDIUM\"}"
+)
+SENTIMENT_PROMPT = (
+    "Tu es un expert en analyse de sentiment. "
+    "Analyse le sentiment du client dans cette conversation SAV.\n"
+    "Réponds UNIQUEMENT par un seul mot : positive, neutral, ou negative."
+)
+
+JOB = {
+    'call_id': 'bench',
+    'problem_type': 'internet',
+    'final_state': 'transfer',
+    'status': 'transferred',
+    'duration_seconds': 184,
+    'user_info': "Box éteinte depuis ce matin, voyant rouge, redémarrage sans effet"
+}
+
+
+class FakeAnalysisServer(FakeLLMServer):
+    """Répond à chaque prompt (ancienne chaîne ou analyse unique) avec un contenu plausible"""
+
+    def reply_for(self, request: dict) -> str:
+        system_prompt = request["messages"][0]["content"]
+        if system_prompt == ANALYSIS_PROMPT:
+            return json.dumps({
+                "summary": SUMMARY, "tag": "BOX_ETEINTE", "severity": "HIGH", "sentiment": "negative"
+            }, ensure_ascii=False)
+        if system_prompt == CLASSIFY_PROMPT:
+            return '{"tag": "BOX_ETEINTE", "severity": "HIGH"}'
+        if system_prompt == SENTIMENT_PROMPT:
+            return "negative"
+        return SUMMARY
+
+
+async def _ask(llm: LLMClient, system_prompt: str, user_message: str, task: str) -> str:
+    return await llm.complete(
+        [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_message}],
+        task=task
+    )
+
+
+async def legacy_chain(llm: LLMClient, job: dict) -> dict:
+    """Ancien comportement : la classification et le sentiment attendent le résumé"""
+    summary = await _ask(llm, SUMMARY_PROMPT, conversation_context(job), "summary")
+    classification = json.loads(await _ask(llm, CLASSIFY_PROMPT, summary, "classification"))
+    sentiment = await _ask(llm, SENTIMENT_PROMPT, summary, "sentiment")
+    return {'summary': summary, **classification, 'sentiment': sentiment}
+
+
+async def single_call(llm: LLMClient, job: dict) -> dict:
+    return await analyze_call(llm, job['call_id'], job)
+
+
+async def run(server: FakeLLMServer, base_url: str, calls: int, analyse) -> dict:
+    """Lance `calls` analyses simultanées ; latences par appel, requêtes et tokens"""
+    client = LLMClient(api_key="fake", base_url=base_url, max_concurrent=calls)
+    try:
+        # Connexions établies une fois (comme en production)
+        await analyse(client, JOB)
+
+        requests, prompt_chars, completion_chars = server.requests, server.prompt_chars, server.completion_chars
+
+        async def timed():
+            start = time.perf_counter()
+            await analyse(client, JOB)
+            return time.perf_counter() - start
+
+        latencies = await asyncio.gather(*(timed() for _ in range(calls)))
+        return {
+            'p50': statistics.median(latencies),
+            'max': max(latencies),
+            'requests': (server.requests - requests) / calls,
+            'tokens_in': (server.prompt_chars - prompt_chars) / calls / 4,
+            'tokens_out': (server.completion_chars - completion_chars) / calls / 4
+        }
+    finally:
+        await client.close()
+
+
+def report(label: str, result: dict):
+    print(
+        f"{label:<28}: p50 {result['p50'] * 1000:6.0f}ms, max {result['max'] * 1000:6.0f}ms, "
+        f"{result['requests']:.0f} requête(s)/appel, "
+        f"~{result['tokens_in']:.0f} tokens in + ~{result['tokens_out']:.0f} out par appel"
+    )
+
+
+async def main(args: argparse.Namespace):
+    server = FakeAnalysisServer(latency=args.latency)
+    base_url = server.start()
+
+    try:
+        chain = await run(server, base_url, args.calls, legacy_chain)
+        report("Chaîne 3 requêtes (ancien)", chain)
+
+        single = await run(server, base_url, args.calls, single_call)
+        report("Analyse JSON unique", single)
+
+        tokens_chain = chain['tokens_in'] + chain['tokens_out']
+        tokens_single = single['tokens_in'] + single['tokens_out']
+        print(
+            f"Gain: latence x{chain['p50'] / single['p50']:.1f}, "
+            f"tokens -{(1 - tokens_single / tokens_chain) * 100:.0f}% "
+            f"(latence simulée {args.latency:.2f}s par requête, {args.calls} appels simultanés)"
+        )
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de l'analyse de fin d'appel contre un serveur factice")
+    parser.add_argument("--calls", type=int, default=20, help="Nombre de fins d'appel simultanées")
+    parser.add_argument("--latency", type=float, default=0.4, help="Latence simulée par requête (secondes)")
+    asyncio.run(main(parser.parse_args()))
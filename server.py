@@ -12,31 +12,38 @@ import signal
 import sys
 import struct
 import time
-import hashlib
 import random
-import json
+import threading
+import mmap
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, List
-from concurrent.futures import ProcessPoolExecutor
-from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque, OrderedDict
 from enum import Enum
+from contextlib import aclosing
 import yaml
 
 # AI APIs
-from deepgram import DeepgramClient, LiveTranscriptionEvents, LiveOptions
-from groq import Groq
-from elevenlabs.client import ElevenLabs
+from deepgram import LiveTranscriptionEvents
 from elevenlabs import VoiceSettings
 
-# Asterisk AMI
-from panoramisk import Manager as AMIManager
+# Asterisk AMI (session partagée)
+from ami_client import CallerIdDirectory
 
 # Local imports
 import config
-from audio_utils import generate_silence, stream_and_convert_to_8khz
+from audio_utils import generate_silence, stream_tts_to_8khz, iterate_in_thread, open_phrase_bank, splice_audio
+from static_phrases import tts_fingerprint, HARVESTED_KEY_PREFIX
+import audio_utils
 import db_utils
-from db_utils import sanitize_string
+from providers import ProviderRegistry
+from post_call import PostCallQueue
+from speculation import SpeculativeExecutor
+from stt_profiles import SttProfiles, SttProfile
+from stt_uplink import DeepgramUplink
+from turn_log import TurnLog, USER, BOT
+from vad import VoiceActivityDetector, SPEECH_START, SPEECH_END
 import metrics
 
 # Configure logging
@@ -48,37 +55,6 @@ logger = logging.getLogger(__name__)
 
 
 # === Utils ===
-def load_stt_keywords() -> list:
-    """
-    Charge les keywords depuis stt_keywords.yaml pour améliorer la reconnaissance STT
-
-    Returns:
-        Liste de keywords formatés pour Deepgram (ex: ["Pierre:3", "Martin:3"])
-    """
-    try:
-        keywords_file = Path(__file__).parent / "stt_keywords.yaml"
-
-        if not keywords_file.exists():
-            logger.warning("stt_keywords.yaml not found, STT will work without keyword boosting")
-            return []
-
-        with open(keywords_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-
-        # Fusionner toutes les catégories de keywords
-        all_keywords = []
-        for category, keywords_list in data.items():
-            if isinstance(keywords_list, list):
-                all_keywords.extend(keywords_list)
-
-        logger.info(f"✓ Loaded {len(all_keywords)} STT keywords for improved recognition")
-        return all_keywords
-
-    except Exception as e:
-        logger.error(f"Failed to load STT keywords: {e}")
-        return []
-
-
 def sanitize_call_id(call_id: str) -> str:
     """
     Nettoie un call_id pour éviter les caractères dangereux dans les chemins de fichiers
@@ -134,6 +110,70 @@ def clean_email_text(text: str) -> str:
     return match.group(0) if match else text
 
 
+# Fin de phrase (ponctuation forte) ou de proposition (ponctuation faible) suivie d'un espace
+SENTENCE_BOUNDARY = re.compile(r'[.!?…]+["»)]*\s+')
+CLAUSE_BOUNDARY = re.compile(r'[,;:]\s+')
+LAST_WORD = re.compile(r'(\w+)$')
+
+# Abréviations suivies d'un point qui ne terminent pas la phrase ("M. Dupont")
+ABBREVIATIONS = {"m", "mm", "mme", "mmes", "mlle", "mlles", "dr", "pr", "me", "st", "ste", "cf", "ex", "env", "tél"}
+
+
+def _sentence_boundary(buffer: str) -> Optional[re.Match]:
+    """Première fin de phrase du texte, en ignorant les points d'abréviation et d'initiale"""
+    for match in SENTENCE_BOUNDARY.finditer(buffer):
+        if match.group().strip() != '.':
+            return match
+        word = LAST_WORD.search(buffer, 0, match.start())
+        if not word:
+            return match
+        word = word.group(1)
+        if word.lower() in ABBREVIATIONS or (len(word) == 1 and word.isupper()):
+            continue
+        return match
+    return None
+
+
+def split_speakable_segments(buffer: str, min_clause_chars: int = 40) -> tuple:
+    """
+    Découpe le texte reçu en streaming du LLM en segments prêts à être synthétisés
+
+    Coupe aux fins de phrase (sauf après une abréviation comme "M." ou "Dr.") ;
+    coupe aussi aux virgules / points-virgules si le segment est assez long,
+    pour lancer la synthèse du début de réponse au plus tôt.
+
+    Args:
+        buffer: Texte accumulé non encore synthétisé
+        min_clause_chars: Longueur minimale d'un segment coupé sur une proposition
+
+    Returns:
+        (segments, reste): segments complets, et texte restant à compléter
+    """
+    segments = []
+    while True:
+        match = _sentence_boundary(buffer)
+        if not match:
+            clause = None
+            for candidate in CLAUSE_BOUNDARY.finditer(buffer):
+                if candidate.start() >= min_clause_chars:
+                    clause = candidate
+                    break
+            match = clause
+        if not match:
+            break
+
+        segment = buffer[:match.end()].strip()
+        if segment:
+            segments.append(segment)
+        buffer = buffer[match.end():]
+
+    return segments, buffer
+
+
+# Trame de silence (20ms @ 8kHz 16-bit)
+SILENCE_FRAME = b'\x00' * config.AUDIO_FRAME_BYTES
+
+
 # === États de la conversation ===
 class ConversationState(Enum):
     """États de la machine à états SAV Wouippleul"""
@@ -154,25 +194,273 @@ class ConversationState(Enum):
     ERROR = "error"
 
 
+# Réponses oui / non attendues par état : (mots du oui, mots du non), le oui est testé en premier.
+# Sans liste du non, toute réponse qui n'est pas un oui est traitée comme un non.
+YES_NO_KEYWORDS = {
+    ConversationState.TICKET_VERIFICATION: (
+        ["oui", "yes", "exact", "c'est", "correct", "affirmatif", "bien sûr", "tout à fait", "effectivement"],
+        # Incluant "du tout", "pas du tout", etc.
+        ["non", "no", "pas", "autre", "différent", "tout", "du tout", "pas du tout", "aucunement",
+         "absolument pas", "négatif", "jamais"]
+    ),
+    ConversationState.NAME_CONFIRMATION: (
+        ["oui", "exact", "correct", "c'est ça", "affirmatif", "tout à fait"], []
+    ),
+    ConversationState.COMPANY_CONFIRMATION: (
+        ["oui", "exact", "correct", "c'est ça", "affirmatif", "tout à fait"], []
+    ),
+    ConversationState.VERIFICATION: (
+        ["oui", "marche", "fonctionne", "ok", "bien"],
+        ["non", "marche pas", "ne fonctionne pas", "toujours pas", "pareil", "rien", "toujours rien"]
+    ),
+}
+
+# États dont le traitement peut démarrer sur une transcription intermédiaire stable
+SPECULATIVE_STATES = set(YES_NO_KEYWORDS) | {ConversationState.WELCOME, ConversationState.DIAGNOSTIC}
+
+
+# === Cache TTS dynamique persistant ===
+class DiskTTSCache:
+    """
+    Cache disque des phrases TTS dynamiques, adressé par contenu
+
+    La clé est un hash (texte, voix, modèle, réglages de voix, format de sortie) :
+    un changement de voix ou de réglages n'invalide que les entrées concernées.
+    Les fichiers sont écrits de façon atomique (fichier temporaire + os.replace)
+    et lus via mmap, ce qui permet de partager le cache entre plusieurs processus
+    serveur. L'éviction est LRU sous budget d'octets : la date de modification
+    du fichier sert de date de dernier accès (mise à jour à chaque hit).
+    Seul le cache dynamique publie ses métriques (`track`) : les clips de
+    noms réutilisent la classe sans fausser les compteurs du cache dynamique.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, max_mapped: int = 128, track: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_mapped = max_mapped
+        self.track = track
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._mapped: "OrderedDict[str, mmap.mmap]" = OrderedDict()  # Entrées chaudes déjà mappées
+        self._evicting = False
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        self.entry_count, self.total_bytes = self._scan_usage()
+        self._update_gauges()
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        """Hash du texte et de tous les paramètres qui influencent l'audio produit"""
+        return tts_fingerprint(text)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.raw"
+
+    def _scan_usage(self) -> tuple:
+        count, total = 0, 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.raw'):
+                count += 1
+                total += entry.stat().st_size
+        return count, total
+
+    # --- I/O fichiers : exécutées dans un thread (jamais sur la boucle du playout) ---
+
+    @staticmethod
+    def _map_file(path: Path):
+        """Mappe une entrée (None si absente ou vide) et met à jour sa date de dernier accès"""
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # Absent, ou fichier vide (mmap impossible)
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return mapped
+
+    @staticmethod
+    def _touch(path: Path) -> bool:
+        """Date de dernier accès (partagée entre processus) ; False si l'entrée a été évincée"""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _write_file(path: Path, audio_data: bytes) -> Optional[int]:
+        """Écriture atomique ; renvoie la taille de l'entrée remplacée (None si nouvelle)"""
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(audio_data)
+            try:
+                previous_size = path.stat().st_size
+            except FileNotFoundError:
+                previous_size = None
+            os.replace(tmp_path, path)
+            return previous_size
+        except Exception:
+            try:
+                tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _evict_files(self) -> tuple:
+        """Supprime les entrées les moins récemment utilisées ; renvoie (nombre, octets, clés évincées)"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.raw'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path, entry.name[:-4]))
+
+        # Recalcul complet : d'autres processus écrivent dans le même répertoire
+        total = sum(size for _, size, _, _ in entries)
+        count = len(entries)
+        entries.sort()
+
+        evicted = []
+        for _, size, path, key in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            evicted.append(key)
+            total -= size
+            count -= 1
+
+        return count, total, evicted
+
+    # --- API asynchrone (état du cache modifié uniquement sur la boucle) ---
+
+    async def get(self, text: str):
+        """
+        Retourne l'audio (mmap en lecture seule) ou None si absent
+
+        Le mmap se manipule comme des bytes (len, slicing, memoryview).
+        """
+        key = self.make_key(text)
+        path = self._path(key)
+
+        mapped = self._mapped.get(key)
+        if mapped is None:
+            mapped = await asyncio.to_thread(self._map_file, path)
+            if mapped is None:
+                self._record('misses')
+                return None
+
+            self._mapped[key] = mapped
+            if len(self._mapped) > self.max_mapped:
+                # Le mmap sera libéré par le GC quand plus aucune lecture ne l'utilise
+                self._mapped.popitem(last=False)
+        else:
+            self._mapped.move_to_end(key)
+            if not await asyncio.to_thread(self._touch, path):
+                # Évincé par un autre processus : le mmap reste lisible pour cette lecture
+                self._mapped.pop(key, None)
+
+        self._record('hits')
+        return mapped
+
+    async def set(self, text: str, audio_data: bytes):
+        """Écrit l'audio de façon atomique (thread I/O) puis applique le budget d'octets"""
+        if len(audio_data) > self.max_bytes:
+            return
+
+        key = self.make_key(text)
+        try:
+            previous_size = await asyncio.to_thread(self._write_file, self._path(key), audio_data)
+        except Exception as e:
+            logger.error(f"Failed to write dynamic TTS cache entry: {e}")
+            return
+
+        # Remplacement d'une entrée existante : seul l'écart de taille change le total
+        self._mapped.pop(key, None)
+        if previous_size is None:
+            self.entry_count += 1
+        self.total_bytes += len(audio_data) - (previous_size or 0)
+
+        if self.total_bytes > self.max_bytes and not self._evicting:
+            await self._evict()
+
+        self._update_gauges()
+
+    async def _evict(self):
+        """Repasse sous le budget d'octets (scan et suppressions dans un thread)"""
+        self._evicting = True
+        try:
+            count, total, evicted = await asyncio.to_thread(self._evict_files)
+        except Exception as e:
+            logger.error(f"Dynamic TTS cache eviction failed: {e}")
+            return
+        finally:
+            self._evicting = False
+
+        for key in evicted:
+            self._mapped.pop(key, None)
+            self._record('evictions')
+
+        self.entry_count, self.total_bytes = count, total
+        logger.debug(f"Dynamic TTS cache evicted to {total} bytes ({count} entries)")
+
+    def _record(self, event: str):
+        self.stats[event] += 1
+        if not self.track:
+            return
+        try:
+            lookups = self.stats['hits'] + self.stats['misses']
+            metrics.track_dynamic_cache_event(
+                event,
+                hit_ratio=self.stats['hits'] / lookups if lookups else 0.0
+            )
+        except Exception as e:
+            logger.debug(f"Failed to track dynamic cache event: {e}")
+
+    def _update_gauges(self):
+        if not self.track:
+            return
+        try:
+            metrics.track_dynamic_cache_usage(self.entry_count, self.total_bytes)
+        except Exception as e:
+            logger.debug(f"Failed to track dynamic cache usage: {e}")
+
+
 # === Cache Audio Manager ===
 class AudioCache:
     """
-    Gestionnaire de cache audio 8kHz pré-généré + cache dynamique pour solutions fréquentes
+    Gestionnaire de cache audio 8kHz pré-généré + cache dynamique persistant pour solutions fréquentes
     """
 
     def __init__(self):
         self.cache: Dict[str, bytes] = {}  # Cache statique (phrases pré-générées)
-        self.dynamic_cache: Dict[str, bytes] = {}  # Cache dynamique (solutions LLM fréquentes)
-        self.dynamic_cache_max_size = 50  # Limite du cache dynamique
+        # config.CACHED_PHRASES + phrases constantes de server.py (récoltées par generate_cache.py, lues dans la banque)
+        self.static_phrases: Dict[str, str] = dict(config.CACHED_PHRASES)
+        self.text_keys: Dict[str, str] = {}  # Texte -> clé du cache statique
+        # Cache dynamique (solutions LLM fréquentes), persistant et partagé entre processus
+        self.dynamic_cache = DiskTTSCache(config.DYNAMIC_CACHE_DIR, config.DYNAMIC_CACHE_MAX_BYTES)
+        # Clips de prénoms / noms / entreprises (générés par generate_cache.py --names)
+        self.name_clips = DiskTTSCache(config.NAME_CLIPS_DIR, config.NAME_CLIPS_MAX_BYTES, track=False)
         self._load_cache()
 
     def _load_cache(self):
-        """Charge tous les fichiers .raw du répertoire cache"""
+        """Mappe la banque de phrases (ou, à défaut, charge les fichiers .raw du répertoire cache)"""
         if not config.CACHE_DIR.exists():
             logger.warning(f"Cache directory not found: {config.CACHE_DIR}")
             return
 
-        for phrase_key in config.CACHED_PHRASES.keys():
+        if config.PHRASE_BANK_PATH.exists():
+            self._load_phrase_bank()
+
+        missing = []
+        for phrase_key in self.static_phrases.keys():
+            if phrase_key in self.cache:
+                continue
             cache_file = config.CACHE_DIR / f"{phrase_key}.raw"
             if cache_file.exists():
                 try:
@@ -182,7 +470,47 @@ class AudioCache:
                 except Exception as e:
                     logger.error(f"Failed to load cache {phrase_key}: {e}")
             else:
-                logger.warning(f"Missing cache file: {cache_file}")
+                missing.append(phrase_key)
+                logger.warning(f"Missing cache file: {cache_file} ('{self.static_phrases[phrase_key][:50]}')")
+
+        if missing:
+            logger.warning(
+                f"  {len(missing)} static phrase(s) without pre-generated audio "
+                f"(will use live TTS) - run generate_cache.py"
+            )
+
+        self.text_keys = {
+            self.static_phrases[phrase_key]: phrase_key for phrase_key in self.cache
+        }
+
+        try:
+            metrics.cache_size.set(len(self.cache))
+        except Exception as e:
+            logger.debug(f"Failed to track cache size: {e}")
+
+    def _load_phrase_bank(self):
+        """Mappe la banque de phrases : vues sans copie, partagées entre processus serveur"""
+        try:
+            views, texts = open_phrase_bank(config.PHRASE_BANK_PATH)
+        except Exception as e:
+            logger.error(f"Failed to open phrase bank {config.PHRASE_BANK_PATH}: {e}")
+            return
+
+        # Phrases constantes récoltées dans server.py : texte stocké dans l'index de la banque
+        known_texts = set(self.static_phrases.values())
+        for phrase_key, phrase_text in texts.items():
+            if phrase_key.startswith(HARVESTED_KEY_PREFIX) and phrase_text not in known_texts:
+                self.static_phrases[phrase_key] = phrase_text
+
+        for phrase_key, phrase_text in self.static_phrases.items():
+            if phrase_key not in views:
+                continue
+            if texts.get(phrase_key) != phrase_text:
+                logger.warning(f"Phrase bank entry '{phrase_key}' is outdated (text changed), run generate_cache.py")
+                continue
+            self.cache[phrase_key] = views[phrase_key]
+
+        logger.info(f"✓ Phrase bank mapped: {config.PHRASE_BANK_PATH} ({len(self.cache)} phrases)")
 
     def get(self, phrase_key: str) -> Optional[bytes]:
         """Récupère un audio depuis le cache statique"""
@@ -192,9 +520,20 @@ class AudioCache:
         """Vérifie si une phrase est en cache statique"""
         return phrase_key in self.cache
 
-    def get_dynamic(self, text: str) -> Optional[bytes]:
+    def get_by_text(self, text: str) -> Optional[bytes]:
+        """Récupère un audio du cache statique à partir de son texte exact"""
+        phrase_key = self.text_keys.get(text)
+        return self.cache.get(phrase_key) if phrase_key else None
+
+    async def get_name_clip(self, name: str) -> Optional[bytes]:
+        """Récupère le clip audio pré-généré d'un prénom, nom ou entreprise"""
+        if not name or not name.strip():
+            return None
+        return await self.name_clips.get(name.strip())
+
+    async def get_dynamic(self, text: str) -> Optional[bytes]:
         """
-        Récupère un audio depuis le cache dynamique (basé sur hash du texte)
+        Récupère un audio depuis le cache dynamique (basé sur hash du texte et de la voix)
 
         Args:
             text: Texte à chercher dans le cache dynamique
@@ -202,15 +541,14 @@ class AudioCache:
         Returns:
             Audio 8kHz si trouvé, None sinon
         """
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+        audio_data = await self.dynamic_cache.get(text)
 
-        if text_hash in self.dynamic_cache:
+        if audio_data is not None:
             logger.info(f"✓ Dynamic cache HIT: {text[:50]}...")
-            return self.dynamic_cache[text_hash]
 
-        return None
+        return audio_data
 
-    def set_dynamic(self, text: str, audio_data: bytes):
+    async def set_dynamic(self, text: str, audio_data: bytes):
         """
         Stocke un audio dans le cache dynamique
 
@@ -218,26 +556,104 @@ class AudioCache:
             text: Texte de la solution (clé)
             audio_data: Audio 8kHz (valeur)
         """
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-
-        # Si le cache est plein, supprimer l'entrée la plus ancienne (FIFO)
-        if len(self.dynamic_cache) >= self.dynamic_cache_max_size:
-            oldest_key = next(iter(self.dynamic_cache))
-            del self.dynamic_cache[oldest_key]
-            logger.debug("Dynamic cache full, removed oldest entry")
-
-        self.dynamic_cache[text_hash] = audio_data
-        logger.info(f"✓ Dynamic cache STORED: {text[:50]}... (size: {len(self.dynamic_cache)})")
+        await self.dynamic_cache.set(text, audio_data)
+        logger.info(
+            f"✓ Dynamic cache STORED: {text[:50]}... "
+            f"(size: {self.dynamic_cache.entry_count} entries, {self.dynamic_cache.total_bytes} bytes)"
+        )
 
     def get_cache_stats(self) -> Dict:
         """Retourne les statistiques du cache"""
         return {
             'static_cache_size': len(self.cache),
-            'dynamic_cache_size': len(self.dynamic_cache),
-            'dynamic_cache_max': self.dynamic_cache_max_size
+            'dynamic_cache_size': self.dynamic_cache.entry_count,
+            'dynamic_cache_bytes': self.dynamic_cache.total_bytes,
+            'dynamic_cache_max_bytes': self.dynamic_cache.max_bytes,
+            **{f'dynamic_cache_{k}': v for k, v in self.dynamic_cache.stats.items()}
         }
 
 
+# === Playout Scheduler ===
+class PlayoutScheduler:
+    """
+    Horloge de playout unique pour tous les appels actifs
+
+    Un seul tick toutes les 20ms (échéances absolues sur loop.time()) écrit la
+    trame suivante de chaque appel enregistré. Les échéances étant absolues,
+    l'erreur de timing ne s'accumule pas sur un appel de 10 minutes ; en cas de
+    retard, on rattrape quelques trames puis on se resynchronise.
+    """
+
+    def __init__(self):
+        self.handlers: Dict[str, "CallHandler"] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, handler: "CallHandler"):
+        """Ajoute un appel à l'horloge de playout"""
+        self.handlers[handler.call_id] = handler
+
+    def unregister(self, call_id: str):
+        """Retire un appel de l'horloge de playout"""
+        self.handlers.pop(call_id, None)
+
+    def start(self):
+        """Démarre la boucle de playout (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Arrête la boucle de playout"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        frame_duration = config.AUDIO_FRAME_DURATION
+        next_deadline = loop.time()
+
+        try:
+            while True:
+                delay = next_deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                now = loop.time()
+                jitter = max(0.0, now - next_deadline)
+
+                # Nombre de trames dues (rattrapage borné si la boucle a pris du retard)
+                frames_due = min(int(jitter / frame_duration) + 1, config.PLAYOUT_MAX_CATCHUP_FRAMES)
+
+                try:
+                    metrics.track_playout_tick(jitter)
+                except Exception as e:
+                    logger.debug(f"Failed to track playout tick: {e}")
+
+                for handler in list(self.handlers.values()):
+                    for _ in range(frames_due):
+                        try:
+                            written = handler.write_playout_frame(jitter)
+                        except Exception as e:
+                            # Une erreur sur un appel ne doit pas couper la lecture des autres
+                            logger.error(f"[{handler.call_id}] Playout frame error: {e}", exc_info=True)
+                            written = False
+                        if not written:
+                            # Plus d'audio possible : l'appel se termine (_audio_output_handler sort, _cleanup suit)
+                            handler.is_active = False
+                            self.unregister(handler.call_id)
+                            break
+
+                next_deadline += frames_due * frame_duration
+
+                # Compensation de dérive : trop de retard → on repart de maintenant
+                if loop.time() - next_deadline > frame_duration * config.PLAYOUT_MAX_CATCHUP_FRAMES:
+                    logger.warning(f"Playout clock late by {(loop.time() - next_deadline) * 1000:.0f}ms - resyncing")
+                    next_deadline = loop.time() + frame_duration
+
+        except asyncio.CancelledError:
+            pass
+
+
 PROMPTS_CONFIG = None
 
 
@@ -364,6 +780,11 @@ class CallHandler:
         writer: asyncio.StreamWriter,
         audio_cache: AudioCache,
         process_pool: ProcessPoolExecutor,
+        io_pool: ThreadPoolExecutor,
+        playout: PlayoutScheduler,
+        providers: ProviderRegistry,
+        caller_ids: CallerIdDirectory,
+        post_call: PostCallQueue,
         phone_number: Optional[str] = None
     ):
         self.call_id = call_id
@@ -371,6 +792,10 @@ class CallHandler:
         self.writer = writer
         self.audio_cache = audio_cache
         self.process_pool = process_pool
+        self.io_pool = io_pool
+        self.playout = playout
+        self.providers = providers  # Clients fournisseurs partagés (créés une fois dans main)
+        self.llm = providers.llm
         self.phone_number = phone_number
 
         # État de la conversation
@@ -382,28 +807,51 @@ class CallHandler:
             self.context['phone_number'] = phone_number
 
         # Queues audio
-        self.input_queue = asyncio.Queue()  # Audio brut depuis Asterisk
+        self.input_queue = asyncio.Queue()  # (trame audio brute, décision VAD) depuis Asterisk
+        # Audio reçu avant que la websocket Deepgram soit attachée (borné)
+        self.stt_preroll = deque(maxlen=round(config.DEEPGRAM_PREROLL_BUFFER_MS / 1000 / config.AUDIO_FRAME_DURATION))
+        self.stt_preroll_dropped = 0
         self.output_queue = deque()  # Audio à envoyer vers Asterisk
 
-        # Clients API
-        self.deepgram_client = DeepgramClient(config.DEEPGRAM_API_KEY)
-        self.groq_client = Groq(api_key=config.GROQ_API_KEY)
-        self.elevenlabs_client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
+        # Statistiques de playout (horloge partagée)
+        self.playout_stats = {'frames_sent': 0, 'underruns': 0, 'dropped': 0, 'max_jitter_ms': 0.0}
+
+        # Clients API (partagés par tous les appels, pas de construction par appel)
+        self.deepgram_client = providers.deepgram
+        self.elevenlabs_client = providers.elevenlabs
 
-        # Asterisk AMI (pour récupérer CALLERID si absent du handshake)
-        self.ami_manager = None
+        # Asterisk AMI partagé (pour récupérer CALLERID si absent du handshake)
+        self.caller_ids = caller_ids
+
+        # File durable des traitements de fin d'appel (analyse LLM + ticket)
+        self.post_call = post_call
 
         # Contrôle de flux
         self.is_active = True
         self.is_speaking = False  # Robot parle actuellement
+        self.tts_cancel_event: Optional[threading.Event] = None  # Interruption du flux TTS en cours
+        self.llm_cancel_event: Optional[threading.Event] = None  # Interruption de la chaîne LLM -> TTS en cours
         self.last_user_speech_time = time.time()
         self.call_start_time = time.time()
 
+        # Tours de parole (contexte LLM borné + transcription stockée avec le ticket)
+        self.turns = TurnLog(started_at=self.call_start_time)
+
+        # VAD locale : barge-in sans attendre la transcription Deepgram
+        self.vad = VoiceActivityDetector()
+        self.ducking = False  # Lecture atténuée (début de parole du client, barge-in non confirmé)
+
+        # Traitement spéculatif des tours sur les transcriptions intermédiaires
+        self.speculation = SpeculativeExecutor(self.call_id, self._prepare_turn)
+
         # Deepgram connection
         self.deepgram_connection = None
+        self.uplink: Optional[DeepgramUplink] = None  # Envoi audio (paquets, silence supprimé)
 
-        # STT Keywords pour améliorer la reconnaissance
-        self.stt_keywords = load_stt_keywords()
+        # Profils STT par état (endpointing, fin d'énoncé, mots-clés de stt_keywords.yaml)
+        self.stt_profiles = SttProfiles.load()
+        self.stt_profile: Optional[SttProfile] = None  # Profil de la websocket Deepgram en cours
+        self._stt_closing: set = set()  # Fermetures différées des anciennes websockets
 
         # Logging audio
         self.audio_log_file = None
@@ -525,64 +973,19 @@ class CallHandler:
             logger.info(f"[{self.call_id}] Problem type unclear (scores equal: {internet_score}), defaulting to INTERNET")
             return "internet"
 
-    def _filter_critical_words(self, text: str) -> str:
-        """
-        Filtre les mots critiques/sensibles du texte pour éviter mauvaises interprétations
-
-        Args:
-            text: Texte à filtrer (summary généré par LLM)
-
-        Returns:
-            Texte filtré sans mots critiques
-        """
-        if not text:
-            return text
-
-        # Liste de mots critiques à remplacer (insultes, propos sensibles)
-        critical_words = {
-            # Insultes courantes
-            'con': '***',
-            'connard': '***',
-            'connasse': '***',
-            'putain': '***',
-            'merde': '***',
-            'bordel': '***',
-            'enculé': '***',
-            'salope': '***',
-            'pute': '***',
-
-            # Expressions agressives
-            'va te faire': '***',
-            'nique': '***',
-            'fous-toi': '***',
-
-            # Mots sensibles business
-            'arnaque': 'pratique contestable',
-            'voleur': 'surfacturation',
-            'incompétent': 'difficulté technique',
-            'nul': 'insuffisant',
-            'pourri': 'défaillant'
-        }
-
-        filtered_text = text.lower()
-
-        # Remplacer chaque mot critique
-        for word, replacement in critical_words.items():
-            filtered_text = filtered_text.replace(word, replacement)
-
-        return filtered_text
-
     async def _get_callerid_via_ami(self, uniqueid: str) -> Optional[str]:
         """
-        Récupère le numéro de téléphone (CALLERID) via Asterisk AMI
-        en utilisant une variable globale définie dans Asterisk.
+        Récupère le numéro de téléphone (CALLERID) via la session AMI partagée
 
-        IMPORTANT: Cette fonction suppose que dans le dialplan Asterisk,
-        une variable globale a été définie AVANT l'appel à AudioSocket:
+        IMPORTANT: Le dialplan Asterisk doit définir une variable globale
+        AVANT l'appel à AudioSocket:
 
         Set(GLOBAL(CALLER_${UNIQUEID})=${CALLERID(num)})
         AudioSocket(${UNIQUEID},<IP_SERVEUR_IA>:9090)
 
+        L'événement VarSet correspondant est reçu avant le handshake : le numéro
+        est en général déjà en mémoire. Sinon, Getvar sur la même session.
+
         Args:
             uniqueid: L'UNIQUEID de l'appel Asterisk (ex: "1763568391.4")
 
@@ -590,47 +993,7 @@ class CallHandler:
             Le numéro de téléphone (str) ou None si non trouvé
         """
         try:
-            # Créer la connexion AMI si nécessaire
-            if self.ami_manager is None:
-                logger.info(f"[{self.call_id}] Connecting to Asterisk AMI at {config.AMI_HOST}:{config.AMI_PORT}")
-                self.ami_manager = AMIManager(
-                    host=config.AMI_HOST,
-                    port=config.AMI_PORT,
-                    username=config.AMI_USERNAME,
-                    secret=config.AMI_SECRET,
-                    ping_delay=10,
-                    ping_timeout=5
-                )
-                await self.ami_manager.connect()
-                logger.info(f"[{self.call_id}] AMI connected successfully")
-
-            # Récupérer la variable globale CALLER_<UNIQUEID>
-            # Cette variable doit avoir été définie dans Asterisk avec:
-            # Set(GLOBAL(CALLER_${UNIQUEID})=${CALLERID(num)})
-
-            # Utiliser l'UNIQUEID tel quel (garder les tirets pour format UUID standard)
-            variable_name = f'CALLER_{uniqueid}'
-
-            logger.info(f"[{self.call_id}] Fetching global variable '{variable_name}' via AMI")
-
-            response = await self.ami_manager.send_action({
-                'Action': 'Getvar',
-                'Variable': variable_name
-            })
-
-            # Vérifier la réponse
-            if response and hasattr(response, 'Value'):
-                # SÉCURITÉ : Nettoyer les octets nuls des données AMI
-                phone_number = sanitize_string(response.Value)
-                logger.info(f"[{self.call_id}] CALLERID retrieved via AMI: {phone_number}")
-                return phone_number
-            else:
-                logger.warning(
-                    f"[{self.call_id}] Could not retrieve phone number from AMI. "
-                    f"Make sure Asterisk dialplan sets: Set(GLOBAL(CALLER_${{UNIQUEID}})=${{CALLERID(num)}})"
-                )
-                return None
-
+            return await self.caller_ids.resolve(uniqueid, call_id=self.call_id)
         except Exception as e:
             logger.error(f"[{self.call_id}] Failed to retrieve CALLERID via AMI: {e}")
             return None
@@ -651,32 +1014,8 @@ class CallHandler:
 
                 return
 
-            # RÉCUPÉRATION DU NUMÉRO DE TÉLÉPHONE VIA AMI (si absent du handshake)
-            if not self.phone_number:
-                logger.info(f"[{self.call_id}] Phone number not in handshake, fetching via AMI...")
-                self.phone_number = await self._get_callerid_via_ami(self.call_id)
-
-                if self.phone_number:
-                    self.context['phone_number'] = self.phone_number
-                    logger.info(f"[{self.call_id}] Phone number retrieved: {self.phone_number}")
-                else:
-                    logger.warning(f"[{self.call_id}] Could not retrieve phone number via AMI")
-
-            # RÉCUPÉRATION INFOS CLIENT (si numéro de téléphone disponible)
-            client_info = None
-            client_history = []
-            if self.phone_number:
-                client_info = await db_utils.get_client_info(self.phone_number)
-                # MÉMOIRE LONG TERME : Récupérer l'historique des tickets du client
-                client_history = await db_utils.get_client_history(self.phone_number, limit=10)
-            else:
-                logger.warning(f"[{self.call_id}] No phone number available for client lookup")
-            if client_info:
-                self.context['client_info'] = client_info
-                logger.info(f"[{self.call_id}] Client recognized: {client_info['first_name']} {client_info['last_name']}")
-            if client_history:
-                self.context['client_history'] = client_history
-                logger.info(f"[{self.call_id}] Client history loaded: {len(client_history)} ticket(s)")
+            # Le contexte appelant (numéro AMI, fiche, tickets) est chargé par
+            # _conversation_handler : l'audio et Deepgram démarrent en parallèle
 
             # Démarrer les tâches en parallèle
             tasks = [
@@ -737,9 +1076,16 @@ class CallHandler:
                     except Exception as e:
                         logger.error(f"Audio logging error: {e}")
 
-                # Envoyer à la queue d'input (seulement si c'est une trame audio)
+                # Envoyer à la queue d'input avec la décision VAD (seulement si c'est une trame audio)
                 if frame_type == 0x10:
-                    await self.input_queue.put(chunk)
+                    speech = await self._update_vad(chunk)
+                    if self.uplink:
+                        await self.input_queue.put((chunk, speech))
+                    else:
+                        # STT pas encore attachée : pré-roll borné (le plus ancien est perdu au-delà)
+                        if len(self.stt_preroll) == self.stt_preroll.maxlen:
+                            self.stt_preroll_dropped += 1
+                        self.stt_preroll.append((chunk, speech))
 
         except asyncio.CancelledError:
             pass
@@ -750,65 +1096,147 @@ class CallHandler:
             logger.error(f"[{self.call_id}] Audio input error: {e}")
             self.is_active = False
 
-    async def _audio_output_handler(self):
-        """Envoie l'audio vers AudioSocket depuis la queue de sortie"""
-        try:
-            # Générer un chunk de silence (320 bytes = 20ms @ 8kHz 16-bit)
-            silence_chunk = b'\x00' * 320
+    @property
+    def bot_audible(self) -> bool:
+        """Le bot parle ou de l'audio reste à jouer"""
+        return self.is_speaking or bool(self.output_queue)
 
-            while self.is_active:
-                # Vérifier s'il y a de l'audio dans la queue
-                if self.output_queue:
-                    chunk = self.output_queue.popleft()
-                else:
-                    # CRITIQUE: Envoyer du silence pour maintenir le flux audio constant
-                    # Asterisk s'attend à recevoir de l'audio toutes les 20ms
-                    chunk = silence_chunk
+    async def _update_vad(self, chunk: bytes) -> bool:
+        """
+        VAD locale sur une trame entrante : atténuation puis barge-in
+
+        Dès qu'un début de parole est détecté pendant que le bot parle, la
+        lecture est atténuée (VAD_DUCKING_DB) ; si la parole dure au moins
+        VAD_BARGE_IN_CONFIRM_MS (trames voisées), la lecture est coupée sans attendre Deepgram.
+        Un bruit bref (toux, claquement) rétablit simplement le volume.
 
+        Returns:
+            True si le client parle (décision transmise à l'envoi STT)
+        """
+        bot_audible = self.bot_audible
+        event = self.vad.process(chunk, margin_db=config.VAD_BARGE_IN_MARGIN_DB if bot_audible else 0.0)
+
+        if event == SPEECH_START:
+            self._track_vad(SPEECH_START)
+            if bot_audible and config.VAD_BARGE_IN:
+                logger.info(f"[{self.call_id}] VAD: user speech onset while bot speaking - ducking playback")
+                self.ducking = True
+                self._track_vad('duck')
+
+        elif event == SPEECH_END:
+            self._track_vad(SPEECH_END, self.vad.segment_ms / 1000)
+            if self.ducking:
+                logger.info(f"[{self.call_id}] VAD: short noise ({self.vad.segment_ms:.0f}ms) - playback volume restored")
+                self.ducking = False
+                self._track_vad('duck_released')
+
+        if self.ducking:
+            if not bot_audible:
+                self.ducking = False
+            elif self.vad.is_speech and self.vad.voiced_ms >= config.VAD_BARGE_IN_CONFIRM_MS:
+                logger.info(f"[{self.call_id}] Barge-in triggered by local VAD ({self.vad.voiced_ms:.0f}ms of speech)")
                 try:
-                    # Encapsuler dans une trame AudioSocket
-                    # Format: 0x10 (type audio) + length (2 bytes big-endian) + data
-                    frame_type = bytes([0x10])
-                    frame_length = len(chunk).to_bytes(2, byteorder='big')
-                    frame = frame_type + frame_length + chunk
-
-                    self.writer.write(frame)
-                    await self.writer.drain()
+                    metrics.track_barge_in('vad')
                 except Exception as e:
-                    logger.error(f"[{self.call_id}] Failed to send audio: {e}")
-                    self.is_active = False
-                    break
+                    logger.debug(f"[{self.call_id}] Failed to track barge-in: {e}")
+                await self._handle_barge_in()
+
+        return self.vad.is_speech
+
+    def _track_vad(self, event: str, segment_duration: Optional[float] = None):
+        try:
+            metrics.track_vad_event(event, segment_duration)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track VAD event: {e}")
 
-                # Attendre 20ms avant le prochain chunk (maintenir 8kHz)
-                await asyncio.sleep(0.02)
+    async def _audio_output_handler(self):
+        """Enregistre l'appel sur l'horloge de playout partagée du serveur"""
+        self.playout.register(self)
+        try:
+            # Le rythme 20ms est assuré par PlayoutScheduler ; on reste actif
+            # tant que l'appel l'est (et que l'écriture n'a pas échoué)
+            while self.is_active:
+                await asyncio.sleep(0.3)
 
         except asyncio.CancelledError:
             pass
-        except Exception as e:
-            logger.error(f"[{self.call_id}] Audio output error: {e}")
+        finally:
+            self.playout.unregister(self.call_id)
+
+    def write_playout_frame(self, jitter: float) -> bool:
+        """
+        Écrit la trame suivante vers AudioSocket (appelé par PlayoutScheduler à chaque tick)
+
+        Args:
+            jitter: Retard du tick courant par rapport à son échéance (secondes)
+
+        Returns:
+            False si l'appel doit être retiré de l'horloge et terminé (écriture impossible)
+        """
+        if not self.is_active or self.writer.is_closing():
+            return False
+
+        # Pas de drain() sur l'horloge partagée : le tampon d'écriture est borné ici
+        buffered = self.writer.transport.get_write_buffer_size()
+        if buffered > config.PLAYOUT_STALLED_WRITE_BUFFER:
+            logger.error(f"[{self.call_id}] AudioSocket stalled ({buffered} bytes buffered) - ending call")
             self.is_active = False
+            return False
+
+        if self.output_queue:
+            chunk = self.output_queue.popleft()
+            if self.ducking:
+                # Le client commence à parler : lecture atténuée en attendant la confirmation du barge-in
+                chunk = audio_utils.adjust_volume(chunk, config.VAD_DUCKING_DB)
+        else:
+            # CRITIQUE: Envoyer du silence pour maintenir le flux audio constant
+            # Asterisk s'attend à recevoir de l'audio toutes les 20ms
+            chunk = SILENCE_FRAME
+            if self.is_speaking:
+                # Le bot devrait parler mais aucune trame n'est prête
+                self.playout_stats['underruns'] += 1
+                try:
+                    metrics.track_playout_underrun()
+                except Exception as e:
+                    logger.debug(f"[{self.call_id}] Failed to track playout underrun: {e}")
+
+        if buffered > config.PLAYOUT_MAX_WRITE_BUFFER:
+            # Asterisk ne lit plus assez vite : la trame est abandonnée (la lecture garde le rythme)
+            self.playout_stats['dropped'] += 1
+            try:
+                metrics.track_playout_drop()
+            except Exception as e:
+                logger.debug(f"[{self.call_id}] Failed to track playout drop: {e}")
+            return True
 
-    async def _deepgram_handler(self):
-        """Gère la connexion Deepgram STT avec streaming"""
         try:
-            # Options Deepgram
-            options = LiveOptions(
-                model=config.DEEPGRAM_MODEL,
-                language=config.DEEPGRAM_LANGUAGE,
-                encoding=config.DEEPGRAM_ENCODING,
-                sample_rate=config.DEEPGRAM_SAMPLE_RATE,
-                channels=1,
-                interim_results=True,
-                punctuate=True,
-                vad_events=True,
-                endpointing=config.DEEPGRAM_ENDPOINTING_LONG,  # 1200ms pour ne pas couper pendant les descriptions
-                keywords=self.stt_keywords if self.stt_keywords else None  # Booste la reconnaissance des noms propres
-            )
+            # Encapsuler dans une trame AudioSocket
+            # Format: 0x10 (type audio) + length (2 bytes big-endian) + data
+            frame = b'\x10' + len(chunk).to_bytes(2, byteorder='big') + chunk
+            self.writer.write(frame)
+        except Exception as e:
+            logger.error(f"[{self.call_id}] Failed to send audio: {e}")
+            self.is_active = False
+            return False
+
+        self.playout_stats['frames_sent'] += 1
+        jitter_ms = jitter * 1000
+        if jitter_ms > self.playout_stats['max_jitter_ms']:
+            self.playout_stats['max_jitter_ms'] = jitter_ms
 
-            # Créer la connexion (API Deepgram 3.7+)
-            self.deepgram_connection = self.deepgram_client.listen.asyncwebsocket.v("1")
+        return True
+
+    async def _deepgram_handler(self):
+        """
+        Gère la connexion Deepgram STT avec streaming
 
-            # Handlers d'événements
+        Le profil STT (endpointing court pour un oui/non, long pour une
+        description) suit l'état de la conversation : à chaque changement, une
+        nouvelle websocket est ouverte dès que le client ne parle plus, l'audio
+        arrivé pendant la connexion attend dans input_queue, et l'ancienne
+        websocket est fermée après ses derniers résultats.
+        """
+        try:
             async def on_message(conn, result, **kwargs):
                 try:
                     sentence = result.channel.alternatives[0].transcript
@@ -818,6 +1246,10 @@ class CallHandler:
                         # Si le robot parle ET qu'on reçoit N'IMPORTE QUEL MOT, on coupe et on analyse
                         if self.is_speaking:
                             logger.info(f"[{self.call_id}] Barge-in triggered by user speech: '{sentence}'")
+                            try:
+                                metrics.track_barge_in('transcript')
+                            except Exception as e:
+                                logger.debug(f"[{self.call_id}] Failed to track barge-in: {e}")
                             await self._handle_barge_in()
 
                             # On traite la phrase immédiatement (même si pas finale)
@@ -849,8 +1281,9 @@ class CallHandler:
                                 # Analyser la demande d'interruption et répondre intelligemment
                                 await self._process_user_input(sentence)
                             else:
-                                # Transcription intermédiaire (interim) - on log juste
+                                # Transcription intermédiaire (interim) : traitement spéculatif si stable
                                 logger.debug(f"[{self.call_id}] User interrupted (interim): '{sentence}'")
+                                self._on_interim(sentence)
                         # ------------------------------------
 
                         # Traitement normal si le bot ne parlait pas
@@ -881,40 +1314,79 @@ class CallHandler:
                             # Continuer le traitement normal
                             await self._process_user_input(sentence)
 
+                        else:
+                            # Transcription intermédiaire : traitement spéculatif si elle reste stable
+                            self._on_interim(sentence)
+
                 except Exception as e:
                     logger.error(f"Deepgram message error: {e}")
 
             async def on_speech_started(conn, speech_started, **kwargs):
-                """Détection VAD : On log juste l'activité, MAIS ON NE COUPE PAS"""
-                logger.info(f"[{self.call_id}] VAD activity detected (bruit/voix) - Ignored for barge-in")
-                # Supprimé : await self._handle_barge_in()  <-- Ne pas couper sur simple VAD
+                """VAD Deepgram : informatif (le barge-in rapide est assuré par la VAD locale)"""
+                logger.debug(f"[{self.call_id}] Deepgram VAD activity detected")
+
+            async def on_utterance_end(conn, utterance_end, **kwargs):
+                """Fin d'énoncé Deepgram : informatif (chaque transcription finale est déjà traitée)"""
+                logger.debug(f"[{self.call_id}] Deepgram utterance end")
 
             async def on_error(conn, error, **kwargs):
                 logger.error(f"Deepgram error: {error}")
 
-            # Enregistrer les handlers
-            self.deepgram_connection.on(LiveTranscriptionEvents.Transcript, on_message)
-            self.deepgram_connection.on(LiveTranscriptionEvents.SpeechStarted, on_speech_started)
-            self.deepgram_connection.on(LiveTranscriptionEvents.Error, on_error)
-
-            # Démarrer la connexion
-            if not await self.deepgram_connection.start(options):
+            def attach(connection):
+                """Enregistre les handlers de l'appel (possible après le démarrage de la websocket)"""
+                connection.on(LiveTranscriptionEvents.Transcript, on_message)
+                connection.on(LiveTranscriptionEvents.SpeechStarted, on_speech_started)
+                connection.on(LiveTranscriptionEvents.UtteranceEnd, on_utterance_end)
+                connection.on(LiveTranscriptionEvents.Error, on_error)
+                return connection
+
+            async def connect(profile: SttProfile, track: bool = True):
+                """Ouvre une websocket Deepgram avec les réglages du profil (API Deepgram 3.7+)"""
+                connection = attach(self.providers.open_deepgram_connection(track=track))
+
+                # Démarrer la connexion
+                if not await connection.start(profile.live_options()):
+                    self.providers.release_deepgram_connection(connection)
+                    return None
+                return connection
+
+            # Websocket déjà démarrée du pool (sans attente), sinon ouverture
+            self.stt_profile = self.stt_profiles.for_state(self.state.value)
+            source = "pool"
+            self.deepgram_connection = self.providers.acquire_deepgram_connection(self.stt_profile)
+            if self.deepgram_connection:
+                attach(self.deepgram_connection)
+            else:
+                source = "new"
+                self.deepgram_connection = await connect(self.stt_profile)
+            if not self.deepgram_connection:
                 logger.error("Failed to start Deepgram connection")
                 logger.warning(f"[{self.call_id}] Continuing call without STT (Speech-to-Text disabled)")
                 # NE PAS terminer l'appel - continuer sans STT
                 return
 
-            # Streamer l'audio vers Deepgram
+            # Streamer l'audio vers Deepgram (paquets pendant la parole, KeepAlive pendant le silence)
+            self.uplink = DeepgramUplink(
+                self.deepgram_connection, self.call_id,
+                tail_ms=self.stt_profile.endpointing + config.DEEPGRAM_UPLINK_TAIL_MARGIN_MS
+            )
+            await self._drain_stt_preroll(source)
+
             while self.is_active:
                 try:
-                    chunk = await asyncio.wait_for(
+                    chunk, speech = await asyncio.wait_for(
                         self.input_queue.get(),
                         timeout=1.0
                     )
-                    await self.deepgram_connection.send(chunk)
+                    await self.uplink.push(chunk, speech)
 
                 except asyncio.TimeoutError:
-                    continue
+                    await self.uplink.tick()
+
+                # Profil STT de l'état courant, appliqué entre deux énoncés
+                profile = self.stt_profiles.for_state(self.state.value)
+                if profile != self.stt_profile and self.uplink.idle:
+                    await self._switch_stt_profile(profile, connect)
 
         except asyncio.CancelledError:
             pass
@@ -925,21 +1397,131 @@ class CallHandler:
         finally:
             if self.deepgram_connection:
                 try:
+                    if self.uplink:
+                        await self.uplink.flush()
                     await self.deepgram_connection.finish()
                 except Exception as e:
                     logger.error(f"Deepgram finish error: {e}")
+                self.providers.release_deepgram_connection(self.deepgram_connection)
+
+    async def _drain_stt_preroll(self, source: str):
+        """
+        Envoie l'audio reçu avant l'attachement de la websocket Deepgram
+
+        self.uplink est déjà défini : les nouvelles trames vont dans
+        input_queue et sont lues après le pré-roll (ordre conservé).
+        """
+        attach_delay = time.time() - self.call_start_time
+        buffered = len(self.stt_preroll)
+        while self.stt_preroll:
+            chunk, speech = self.stt_preroll.popleft()
+            await self.uplink.push(chunk, speech)
+
+        logger.info(
+            f"[{self.call_id}] STT attached ({source}) after {attach_delay * 1000:.0f}ms, "
+            f"{buffered} pre-roll frames sent, {self.stt_preroll_dropped} dropped"
+        )
+        try:
+            metrics.track_stt_attach(source, attach_delay, self.stt_preroll_dropped)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track STT attach: {e}")
+
+    async def _switch_stt_profile(self, profile: SttProfile, connect):
+        """
+        Passe la websocket Deepgram sur un autre profil STT sans perdre d'audio
+
+        La nouvelle websocket est ouverte avant de quitter l'ancienne ; les
+        trames reçues pendant la connexion restent dans input_queue.
+        """
+        previous = self.stt_profile
+        self.stt_profile = profile  # Pas de nouvelle tentative avant le prochain changement d'état
+        start = time.time()
+
+        # Hors statistiques du pool : seul le rattachement en début d'appel compte pour reuse_ratio
+        connection = await connect(profile, track=False)
+        if not connection:
+            logger.warning(f"[{self.call_id}] STT profile switch to '{profile.name}' failed - keeping '{previous.name}'")
+            self._track_stt_switch(profile.name, 'failed')
+            return
+
+        old_connection = self.deepgram_connection
+        await self.uplink.switch_connection(connection, profile.endpointing + config.DEEPGRAM_UPLINK_TAIL_MARGIN_MS)
+        self.deepgram_connection = connection
+
+        task = asyncio.create_task(self._close_stt_connection(old_connection))
+        self._stt_closing.add(task)
+        task.add_done_callback(self._stt_closing.discard)
+
+        logger.info(
+            f"[{self.call_id}] STT profile '{previous.name}' -> '{profile.name}' "
+            f"(endpointing {profile.endpointing}ms, {len(profile.keywords)} keywords) "
+            f"in {(time.time() - start) * 1000:.0f}ms"
+        )
+        self._track_stt_switch(profile.name, 'ok')
+
+    async def _close_stt_connection(self, connection):
+        """Ferme une ancienne websocket Deepgram après ses derniers résultats"""
+        try:
+            await connection.finalize()
+            await asyncio.sleep(config.STT_SWITCH_GRACE)
+            await connection.finish()
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Error closing previous Deepgram connection: {e}")
+        finally:
+            self.providers.release_deepgram_connection(connection)
+
+    def _track_stt_switch(self, profile: str, result: str):
+        try:
+            metrics.track_stt_profile_switch(profile, result)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track STT profile switch: {e}")
+
+    async def _load_caller_context(self) -> Optional[db_utils.CallerContext]:
+        """
+        Résout le numéro de l'appelant puis charge son contexte en un aller-retour
+
+        Remplit self.context (client_info, client_history) ; l'accueil est choisi
+        dès que ce résultat est disponible.
+        """
+        # RÉCUPÉRATION DU NUMÉRO DE TÉLÉPHONE VIA AMI (si absent du handshake)
+        if not self.phone_number:
+            logger.info(f"[{self.call_id}] Phone number not in handshake, fetching via AMI...")
+            self.phone_number = await self._get_callerid_via_ami(self.call_id)
+
+            if self.phone_number:
+                self.context['phone_number'] = self.phone_number
+                logger.info(f"[{self.call_id}] Phone number retrieved: {self.phone_number}")
+            else:
+                logger.warning(f"[{self.call_id}] Could not retrieve phone number via AMI")
+
+        if not self.phone_number:
+            logger.warning(f"[{self.call_id}] No phone number available for client lookup")
+            return None
+
+        # RÉCUPÉRATION INFOS CLIENT + MÉMOIRE LONG TERME + TICKETS EN ATTENTE
+        start_time = time.time()
+        caller = await db_utils.load_caller_context(self.phone_number, history_limit=10)
+        logger.info(f"[{self.call_id}] Caller context loaded in {(time.time() - start_time) * 1000:.0f}ms")
+
+        if caller.client_info:
+            self.context['client_info'] = caller.client_info
+            logger.info(f"[{self.call_id}] Client recognized: {caller.client_info['first_name']} {caller.client_info['last_name']}")
+        if caller.history:
+            self.context['client_history'] = caller.history
+            logger.info(f"[{self.call_id}] Client history loaded: {len(caller.history)} ticket(s)")
+
+        return caller
 
     async def _conversation_handler(self):
         """Gestionnaire de la machine à états conversationnelle"""
         try:
-            # Démarrer avec le message de bienvenue PERSONNALISÉ si client reconnu
-            client_info = self.context.get('client_info')
-            client_history = self.context.get('client_history', [])
+            # CONTEXTE APPELANT (fiche client, historique, tickets en attente pour tous les clients)
+            caller = await self._load_caller_context()
 
-            # VÉRIFIER LES TICKETS EN ATTENTE (pour tous les clients, même sans fiche)
-            pending_tickets = []
-            if self.phone_number:
-                pending_tickets = await db_utils.get_pending_tickets(self.phone_number)
+            # Démarrer avec le message de bienvenue PERSONNALISÉ si client reconnu
+            client_info = caller.client_info if caller else None
+            client_history = caller.history if caller else []
+            pending_tickets = caller.pending_tickets if caller else []
 
             if client_info:
                 # CLIENT AVEC FICHE COMPLÈTE
@@ -948,9 +1530,12 @@ class CallHandler:
                     ticket = pending_tickets[0]  # Premier ticket en attente
                     problem_type_fr = "connexion" if ticket['problem_type'] == "internet" else "mobile"
 
-                    # ARCHITECTURE HYBRIDE: Cache joué immédiatement, génération en arrière-plan
-                    await self._say_hybrid(
+                    # Clips de noms + phrase porteuse en cache (sinon ARCHITECTURE HYBRIDE)
+                    carrier_key = "carrier_pending_internet" if ticket['problem_type'] == "internet" else "carrier_pending_mobile"
+                    await self._say_spliced(
                         "greet",  # Cache joué instantanément
+                        [client_info['first_name'], client_info['last_name']],
+                        carrier_key,
                         f"{client_info['first_name']} {client_info['last_name']}, je vois un ticket ouvert concernant votre {problem_type_fr}. Est-ce à ce sujet ?"
                     )
                     logger.info(f"[{self.call_id}] Ticket verification: {ticket['id']} ({ticket['problem_type']})")
@@ -961,8 +1546,10 @@ class CallHandler:
 
                 else:
                     # Pas de ticket en attente, message personnalisé avec cache
-                    await self._say_hybrid(
+                    await self._say_spliced(
                         "greet",  # Cache : "Bonjour" joué instantanément
+                        [client_info['first_name'], client_info['last_name']],
+                        "carrier_how_can_i_help",
                         f"{client_info['first_name']} {client_info['last_name']}, comment puis-je vous aider aujourd'hui ?"
                     )
                     logger.info(f"[{self.call_id}] Personalized welcome (no pending tickets)")
@@ -1045,20 +1632,90 @@ class CallHandler:
         except Exception as e:
             logger.error(f"[{self.call_id}] Timeout monitor error: {e}")
 
+    def _on_interim(self, sentence: str):
+        """Transcription intermédiaire : transmise à l'exécuteur spéculatif si l'état s'y prête"""
+        if config.SPECULATION_ENABLED and self.state in SPECULATIVE_STATES:
+            self.speculation.on_interim(sentence, self.state)
+
+    def _yes_no_intent(self, state: ConversationState, user_text: str) -> Optional[str]:
+        """
+        Réponse oui / non attendue dans l'état
+
+        Returns:
+            "yes", "no" ou None (réponse pas claire, seulement si l'état a une liste du non)
+        """
+        yes_words, no_words = YES_NO_KEYWORDS[state]
+        user_lower = user_text.lower()
+        if any(word in user_lower for word in yes_words):
+            return "yes"
+        if not no_words or any(word in user_lower for word in no_words):
+            return "no"
+        return None
+
+    async def _prepare_turn(self, state: ConversationState, user_text: str) -> Dict:
+        """
+        Partie du traitement d'un tour sans effet de bord (ni audio, ni changement d'état)
+
+        Lancée par l'exécuteur spéculatif sur une transcription intermédiaire
+        stable ; _process_user_input utilise ce résultat si la transcription
+        finale est identique. Seul l'appel LLM prend un temps notable.
+        """
+        if state in YES_NO_KEYWORDS:
+            prepared = {'intent': self._yes_no_intent(state, user_text)}
+            if state == ConversationState.VERIFICATION and prepared['intent'] == "yes":
+                client_info = self.context.get('client_info')
+                if client_info and client_info.get('first_name'):
+                    prepared['congratulation'] = await self.llm.complete(
+                        self._llm_messages(self._congratulation_prompt(client_info), ""), task="understanding"
+                    )
+            return prepared
+
+        if state == ConversationState.DIAGNOSTIC:
+            return {'problem_type': self._detect_problem_type(user_text)}
+
+        if state == ConversationState.WELCOME:
+            system_prompt = construct_system_prompt(
+                self.context.get('client_info'), self.context.get('client_history', [])
+            )
+            return {'llm_response': await self.llm.complete(
+                self._llm_messages(system_prompt, user_text), task="understanding"
+            )}
+
+        return {}
+
+    @staticmethod
+    def _congratulation_prompt(client_info: Dict) -> str:
+        return (
+            f"Le client {client_info['first_name']} a résolu son problème. "
+            f"Génère UNE SEULE phrase très courte (max 10 mots) pour le féliciter chaleureusement. "
+            f"Sois naturel et amical."
+        )
+
+    async def _say_prepared(self, response: str):
+        """Dit une réponse LLM déjà générée (spéculation confirmée)"""
+        logger.info(f"[{self.call_id}]  IA (speculative): {response}")
+        await self._say_dynamic(response)
+
     async def _process_user_input(self, user_text: str):
         """Traite l'input utilisateur selon l'état actuel"""
         try:
+            # Résultat spéculatif (transcription intermédiaire identique à la finale), sinon calcul normal
+            prepared = await self.speculation.take(user_text, self.state) or {}
+
+            self.turns.add(USER, user_text)
+
             # Récupérer les infos client et historique si disponibles
             client_info = self.context.get('client_info')
             client_history = self.context.get('client_history', [])
 
             # Logique de la machine à états SAV Wouippleul
+            if self.state in YES_NO_KEYWORDS:
+                intent = prepared.get('intent', self._yes_no_intent(self.state, user_text))
+
             if self.state == ConversationState.TICKET_VERIFICATION:
                 # Vérifier si le client appelle pour le ticket en attente
-                user_lower = user_text.lower()
-
                 # Détection améliorée du OUI
-                if any(word in user_lower for word in ["oui", "yes", "exact", "c'est", "correct", "affirmatif", "bien sûr", "tout à fait", "effectivement"]):
+                if intent == "yes":
                     # OUI, c'est pour le ticket en attente
                     logger.info(f"[{self.call_id}] Client confirms ticket: {self.context['pending_ticket']['id']}")
                     await self._say("ticket_transfer_ok")
@@ -1071,11 +1728,7 @@ class CallHandler:
                     self.is_active = False
 
                 # Détection améliorée du NON (incluant "du tout", "pas du tout", etc.)
-                elif any(word in user_lower for word in [
-                    "non", "no", "pas", "autre", "différent",
-                    "tout", "du tout", "pas du tout", "aucunement",
-                    "absolument pas", "négatif", "jamais"
-                ]):
+                elif intent == "no":
                     # NON, c'est pour un autre problème
                     logger.info(f"[{self.call_id}] Client has different issue")
                     await self._say("ticket_not_related")
@@ -1092,12 +1745,14 @@ class CallHandler:
                     await self._say_dynamic(clarification)
 
             elif self.state == ConversationState.WELCOME:
-                # Demander le prénom
-                response = await self._ask_llm(
-                    user_text,
-                    system_prompt=construct_system_prompt(client_info, client_history)
-                )
-                await self._say_dynamic(response)
+                # Demander le prénom (réponse LLM synthétisée phrase par phrase)
+                if prepared.get('llm_response'):
+                    await self._say_prepared(prepared['llm_response'])
+                else:
+                    await self._ask_llm_and_say(
+                        user_text,
+                        system_prompt=construct_system_prompt(client_info, client_history)
+                    )
                 self.state = ConversationState.IDENTIFICATION
 
             elif self.state == ConversationState.IDENTIFICATION:
@@ -1143,8 +1798,7 @@ class CallHandler:
 
             elif self.state == ConversationState.NAME_CONFIRMATION:
                 # Vérifier la confirmation du nom
-                user_lower = user_text.lower()
-                if any(word in user_lower for word in ["oui", "exact", "correct", "c'est ça", "affirmatif", "tout à fait"]):
+                if intent == "yes":
                     # Nom confirmé, passer à la confirmation de l'entreprise
                     company = self.context.get('company', '')
                     await self._say_dynamic(f"Vous êtes bien de la société {company} ?")
@@ -1156,8 +1810,7 @@ class CallHandler:
 
             elif self.state == ConversationState.COMPANY_CONFIRMATION:
                 # Vérifier la confirmation de l'entreprise
-                user_lower = user_text.lower()
-                if any(word in user_lower for word in ["oui", "exact", "correct", "c'est ça", "affirmatif", "tout à fait"]):
+                if intent == "yes":
                     # Entreprise confirmée, passer au diagnostic avec transition
                     transition = (
                         "Je vais vous poser une suite de questions afin que nos techniciens arrivent "
@@ -1176,7 +1829,7 @@ class CallHandler:
                 await self._say(random.choice(filler_phrases))
 
                 # Déterminer le type de problème avec détection intelligente
-                problem_type = self._detect_problem_type(user_text)
+                problem_type = prepared.get('problem_type') or self._detect_problem_type(user_text)
                 self.context['problem_type'] = problem_type
 
                 logger.info(f"[{self.call_id}] User described problem: '{user_text[:100]}...' → {problem_type.upper()}")
@@ -1204,26 +1857,25 @@ class CallHandler:
 
             elif self.state == ConversationState.VERIFICATION:
                 # Vérifier si ça marche
-                if any(word in user_text.lower() for word in ["oui", "marche", "fonctionne", "ok", "bien"]):
+                if intent == "yes":
                     # Problème résolu - PERSONNALISER la félicitation avec LLM
                     client_info = self.context.get('client_info')
-                    if client_info and client_info.get('first_name'):
+                    if prepared.get('congratulation'):
+                        # Félicitation déjà générée pendant que le client finissait sa phrase
+                        await self._say_prepared(prepared['congratulation'])
+                    elif client_info and client_info.get('first_name'):
                         # Générer une félicitation courte et personnalisée
-                        congratulation_prompt = (
-                            f"Le client {client_info['first_name']} a résolu son problème. "
-                            f"Génère UNE SEULE phrase très courte (max 10 mots) pour le féliciter chaleureusement. "
-                            f"Sois naturel et amical."
-                        )
-                        congratulation = await self._ask_llm("", congratulation_prompt)
-
-                        # ARCHITECTURE HYBRIDE: Filler + félicitation personnalisée
-                        await self._say_hybrid("filler_ok", congratulation)
+                        congratulation_prompt = self._congratulation_prompt(client_info)
+                        # ARCHITECTURE HYBRIDE: Filler + félicitation personnalisée (streaming)
+                        llm_task = asyncio.create_task(self._ask_llm_and_say("", congratulation_prompt))
+                        await self._say("filler_ok")
+                        await llm_task
 
                     # Finir avec au revoir du cache
                     await self._say("goodbye")
                     self.is_active = False
 
-                elif any(word in user_lower for word in ["non", "marche pas", "ne fonctionne pas", "toujours pas", "pareil", "rien", "toujours rien"]):
+                elif intent == "no":
                     # Problème NON résolu -> Technicien
                     tech_available = await self._check_technician()
 
@@ -1254,27 +1906,34 @@ class CallHandler:
             logger.error(f"[{self.call_id}] Error processing user input: {e}")
             await self._say("error")
 
-    async def _ask_llm(self, user_message: str, system_prompt: str) -> str:
-        """Appelle Groq LLM pour générer une réponse"""
+    def _llm_messages(self, system_prompt: str, user_message: str) -> List[Dict[str, str]]:
+        """
+        Prompt système + historique borné de l'appel
+
+        Le message du client est normalement déjà le dernier tour du journal
+        (enregistré par _process_user_input) ; sinon il est ajouté à la fin.
+        """
+        messages = [{"role": "system", "content": system_prompt}, *self.turns.context_messages()]
+
+        user_message = " ".join(user_message.split())
+        last = messages[-1]
+        if user_message and not (last["role"] == USER and last["content"].endswith(user_message)):
+            messages.append({"role": "user", "content": user_message})
+        return messages
+
+    async def _ask_llm(self, user_message: str, system_prompt: str, task: str = "understanding") -> str:
+        """Appelle Groq LLM pour générer une réponse (client asynchrone partagé)"""
         try:
             start_time = time.time()
 
             # LOG DÉBOGAGE: Message du client
             logger.info(f"[{self.call_id}]  CLIENT: {user_message}")
 
-            response = self.groq_client.chat.completions.create(
-                model=config.GROQ_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=config.GROQ_TEMPERATURE,
-                max_tokens=config.GROQ_MAX_TOKENS,
-                timeout=config.API_TIMEOUT
+            ai_response = await self.llm.complete(
+                self._llm_messages(system_prompt, user_message),
+                task=task
             )
 
-            ai_response = response.choices[0].message.content.strip()
-
             # LOG DÉBOGAGE: Réponse de l'IA
             logger.info(f"[{self.call_id}]  IA: {ai_response}")
 
@@ -1289,82 +1948,79 @@ class CallHandler:
             logger.info(f"[{self.call_id}]  IA (fallback): {fallback_response}")
             return fallback_response
 
-    async def _analyze_sentiment_llm(self, conversation_summary: str) -> str:
+    async def _ask_llm_and_say(self, user_message: str, system_prompt: str) -> str:
         """
-        Analyse le sentiment du client via LLM
+        Appelle Groq en streaming et synthétise la réponse phrase par phrase
 
-        Args:
-            conversation_summary: Résumé de la conversation
+        La première phrase part en synthèse pendant que la suite de la réponse
+        est encore en cours de génération ; les phrases sont jouées dans l'ordre.
+        Un barge-in interrompt à la fois le flux LLM et la synthèse.
 
         Returns:
-            'positive', 'neutral', ou 'negative'
+            Texte complet de la réponse (éventuellement tronqué par un barge-in)
         """
-        try:
-            sentiment_prompt = (
-                "Tu es un expert en analyse de sentiment. "
-                "Analyse le sentiment du client dans cette conversation SAV.\n"
-                "Réponds UNIQUEMENT par un seul mot : positive, neutral, ou negative."
-            )
-
-            result = await self._ask_llm(conversation_summary, sentiment_prompt)
-            result = result.lower().strip()
-
-            # Validation stricte
-            if result in ['positive', 'neutral', 'negative']:
-                logger.info(f"[{self.call_id}] Sentiment analyzed: {result}")
-                return result
-            else:
-                logger.warning(f"[{self.call_id}] Invalid sentiment response: {result}, defaulting to neutral")
-                return 'neutral'
-
-        except Exception as e:
-            logger.error(f"[{self.call_id}] Sentiment analysis error: {e}")
-            return 'neutral'
+        if not config.LLM_STREAMING_TTS:
+            response = await self._ask_llm(user_message, system_prompt)
+            await self._say_dynamic(response)
+            return response
+
+        logger.info(f"[{self.call_id}]  CLIENT: {user_message}")
+
+        start_time = time.time()
+        cancel_event = threading.Event()
+        self.llm_cancel_event = cancel_event
+        segments: asyncio.Queue = asyncio.Queue()
+
+        async def speaker():
+            # Synthèse séquentielle : préserve l'ordre de lecture des phrases
+            first = True
+            while True:
+                segment = await segments.get()
+                if segment is None or cancel_event.is_set():
+                    break
+                if first:
+                    logger.info(f"[{self.call_id}] LLM stream: first segment after {time.time() - start_time:.3f}s")
+                    first = False
+                await self._say_dynamic(segment)
 
-    async def _classify_problem(self, problem_description: str, problem_type: str) -> Dict[str, str]:
-        """
-        Classifie le problème avec des tags stricts via LLM
+        speaker_task = asyncio.create_task(speaker())
+        response_parts = []
+        pending = ""
 
-        Args:
-            problem_description: Description du problème
-            problem_type: 'internet' ou 'mobile'
+        messages = self._llm_messages(system_prompt, user_message)
 
-        Returns:
-            Dict avec 'tag' et 'severity' (LOW, MEDIUM, HIGH)
-        """
         try:
-            classify_prompt = (
-                "Tu es un expert en classification de problèmes SAV.\n"
-                "Classifie le problème avec un tag strict.\n\n"
-                "TAGS INTERNET : FIBRE_SYNCHRO, FIBRE_DEBIT, WIFI_FAIBLE, BOX_ETEINTE, CONNEXION_INSTABLE, DNS_PROBLEME\n"
-                "TAGS MOBILE : MOBILE_RESEAU, MOBILE_DATA, MOBILE_APPELS, MOBILE_SMS, CARTE_SIM\n\n"
-                "Réponds au format JSON strict : {\"tag\": \"XXX\", \"severity\": \"LOW|MEDIUM|HIGH\"}\n"
-                "Exemple: {\"tag\": \"FIBRE_SYNCHRO\", \"severity\": \"MEDIUM\"}"
-            )
-
-            result = await self._ask_llm(problem_description, classify_prompt)
-
-            # Parser le JSON
-            try:
-                classification = json.loads(result)
-                tag = classification.get('tag', 'UNKNOWN').upper()
-                severity = classification.get('severity', 'MEDIUM').upper()
+            async with aclosing(self.llm.stream(messages, task="understanding")) as tokens:
+                async for token in tokens:
+                    if cancel_event.is_set():
+                        break
+                    response_parts.append(token)
+                    ready, pending = split_speakable_segments(pending + token, config.LLM_STREAM_MIN_CLAUSE_CHARS)
+                    for segment in ready:
+                        segments.put_nowait(segment)
 
-                # Validation
-                if severity not in ['LOW', 'MEDIUM', 'HIGH']:
-                    severity = 'MEDIUM'
+            if pending.strip() and not cancel_event.is_set():
+                segments.put_nowait(pending.strip())
 
-                logger.info(f"[{self.call_id}] Problem classified: {tag} ({severity})")
+        except Exception as e:
+            logger.error(f"[{self.call_id}] Groq streaming error: {e}")
+            if not response_parts:
+                fallback_response = "Je suis désolé, pouvez-vous répéter ?"
+                logger.info(f"[{self.call_id}]  IA (fallback): {fallback_response}")
+                response_parts.append(fallback_response)
+                segments.put_nowait(fallback_response)
 
-                return {'tag': tag, 'severity': severity}
+        finally:
+            segments.put_nowait(None)
+            await speaker_task
+            if self.llm_cancel_event is cancel_event:
+                self.llm_cancel_event = None
 
-            except json.JSONDecodeError:
-                logger.warning(f"[{self.call_id}] Invalid JSON from classification: {result}")
-                return {'tag': 'UNKNOWN', 'severity': 'MEDIUM'}
+        ai_response = "".join(response_parts).strip()
+        logger.info(f"[{self.call_id}]  IA: {ai_response}")
+        logger.debug(f"[{self.call_id}] LLM+TTS streaming latency: {time.time() - start_time:.3f}s")
 
-        except Exception as e:
-            logger.error(f"[{self.call_id}] Classification error: {e}")
-            return {'tag': 'UNKNOWN', 'severity': 'MEDIUM'}
+        return ai_response
 
     async def _say(self, phrase_key: str):
         """Dit une phrase depuis le cache (pas de CPU)"""
@@ -1375,6 +2031,8 @@ class CallHandler:
                 logger.warning(f"[{self.call_id}] Cache miss: {phrase_key}")
                 return
 
+            self.turns.add(BOT, self.audio_cache.static_phrases.get(phrase_key, ""))
+
             # TRACKING: Cache TTS hit (économie API)
             try:
                 metrics.track_tts_cache_hit()
@@ -1479,6 +2137,55 @@ class CallHandler:
             # Fallback: jouer au moins le cache
             await self._say(cache_key)
 
+    async def _say_spliced(self, cache_key: str, name_parts: List[str], carrier_key: str, fallback_text: str):
+        """
+        Phrase personnalisée assemblée depuis le cache (aucune latence TTS)
+
+        Joue la phrase cache, puis les clips pré-générés des noms suivis de la
+        phrase porteuse, avec de courts fondus enchaînés. Si un clip manque,
+        on revient à l'architecture hybride (génération ElevenLabs du texte complet).
+
+        Args:
+            cache_key: Phrase cache jouée en premier (ex: "greet")
+            name_parts: Prénom, nom, entreprise... à prononcer
+            carrier_key: Phrase porteuse en cache jouée après les noms
+            fallback_text: Texte complet à générer si l'assemblage est impossible
+
+        Exemple:
+            await self._say_spliced("greet", ["Pierre", "Dupont"], "carrier_how_can_i_help", "...")
+            → "Bonjour..." + "Pierre" + "Dupont" + ", comment puis-je vous aider aujourd'hui ?"
+        """
+        clips = [await self.audio_cache.get_name_clip(part) for part in name_parts]
+        carrier = self.audio_cache.get(carrier_key)
+
+        if carrier is None or any(clip is None for clip in clips):
+            logger.info(f"[{self.call_id}] SPLICE: clip(s) missing, falling back to hybrid TTS")
+            await self._say_hybrid(cache_key, fallback_text)
+            return
+
+        start_time = time.time()
+        try:
+            pause = generate_silence(config.SPLICE_PAUSE_MS)
+            audio = splice_audio([*clips, pause, carrier], crossfade_ms=config.SPLICE_CROSSFADE_MS)
+        except Exception as e:
+            logger.error(f"[{self.call_id}] Error in _say_spliced: {e}")
+            await self._say_hybrid(cache_key, fallback_text)
+            return
+
+        try:
+            metrics.track_tts_cache_hit()
+            metrics.tts_response_time.labels(source='cache').observe(time.time() - start_time)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track spliced cache hit: {e}")
+
+        await self._say(cache_key)
+
+        logger.info(f"[{self.call_id}]  IA PARLE (assemblé): {fallback_text}")
+        self.turns.add(BOT, fallback_text)
+        self.is_speaking = True
+        await self._send_audio(audio)
+        self.is_speaking = False
+
     async def _generate_audio(self, text: str):
         """
         Génère et joue de l'audio avec ElevenLabs (utilisé par _say_hybrid)
@@ -1492,12 +2199,15 @@ class CallHandler:
         try:
             # LOG DÉBOGAGE: Ce que l'IA va dire
             logger.info(f"[{self.call_id}]  IA PARLE: {text}")
+            self.turns.add(BOT, text)
 
             self.is_speaking = True
             start_time = time.time()
 
-            # 1. Cache Check
-            cached_audio = self.audio_cache.get_dynamic(text)
+            # 1. Cache Check (phrase constante pré-générée, puis cache dynamique)
+            cached_audio = self.audio_cache.get_by_text(text)
+            if cached_audio is None:
+                cached_audio = await self.audio_cache.get_dynamic(text)
             if cached_audio:
                 logger.info(f"[{self.call_id}] Cache HIT dynamic")
 
@@ -1513,32 +2223,43 @@ class CallHandler:
                 return
 
             # 2. Streaming Generation (Turbo v2.5)
+            # Le flux HTTP et le pipe FFmpeg sont bloquants : ils sont consommés
+            # dans un thread I/O pour ne pas figer les autres appels
             logger.info(f"[{self.call_id}] Streaming TTS generation...")
 
-            audio_stream_iterator = self.elevenlabs_client.generate(
-                text=text,
-                voice=config.ELEVENLABS_VOICE_ID,
-                model=config.ELEVENLABS_MODEL,  # Utilise la config centralisée
-                stream=True,
-                output_format="mp3_44100_128"
-            )
+            def open_pcm_stream():
+                audio_stream_iterator = self.elevenlabs_client.generate(
+                    text=text,
+                    voice=config.ELEVENLABS_VOICE_ID,
+                    model=config.ELEVENLABS_MODEL,  # Utilise la config centralisée
+                    stream=True,
+                    output_format=config.ELEVENLABS_OUTPUT_FORMAT
+                )
+                # 3. Conversion à la volée (NumPy pour PCM/μ-law, pipe FFmpeg pour MP3)
+                return stream_tts_to_8khz(audio_stream_iterator, config.ELEVENLABS_OUTPUT_FORMAT)
 
-            # 3. Conversion à la volée (Pipe)
-            pcm_stream = stream_and_convert_to_8khz(audio_stream_iterator)
+            cancel_event = threading.Event()
+            self.tts_cancel_event = cancel_event
 
-            # 4. Envoi immédiat à Asterisk
+            # 4. Envoi immédiat à Asterisk au fil des chunks
             full_audio_for_cache = bytearray()
+            interrupted = False
 
-            for chunk in pcm_stream:
-                if not self.output_queue and not self.is_speaking:
-                    break # Stop si interruption
+            async for chunk in iterate_in_thread(open_pcm_stream, cancel_event, executor=self.io_pool):
+                if cancel_event.is_set() or not self.is_speaking:
+                    interrupted = True  # Stop si interruption (barge-in)
+                    break
 
                 self.output_queue.append(chunk)
                 full_audio_for_cache.extend(chunk)
 
-            # 5. Mise en cache
-            if len(full_audio_for_cache) > 0:
-                self.audio_cache.set_dynamic(text, bytes(full_audio_for_cache))
+            cancel_event.set()
+            if self.tts_cancel_event is cancel_event:
+                self.tts_cancel_event = None
+
+            # 5. Mise en cache (uniquement si la phrase a été générée en entier)
+            if full_audio_for_cache and not interrupted:
+                await self.audio_cache.set_dynamic(text, bytes(full_audio_for_cache))
 
             # TRACKING: Appel API ElevenLabs
             try:
@@ -1555,15 +2276,16 @@ class CallHandler:
             await self._say("error")
 
     async def _send_audio(self, audio_data: bytes):
-        """Envoie de l'audio à la queue de sortie par chunks"""
+        """Envoie de l'audio à la queue de sortie par chunks (vues sans copie)"""
         # Découper en chunks de 320 bytes (20ms @ 8kHz)
-        chunk_size = 320
-        for i in range(0, len(audio_data), chunk_size):
-            chunk = audio_data[i:i + chunk_size]
+        chunk_size = config.AUDIO_FRAME_BYTES
+        view = memoryview(audio_data)
+        for i in range(0, len(view), chunk_size):
+            chunk = view[i:i + chunk_size]
 
-            # Padding si nécessaire
+            # Padding si nécessaire (dernière trame ; déjà appliqué dans la banque de phrases)
             if len(chunk) < chunk_size:
-                chunk += b'\x00' * (chunk_size - len(chunk))
+                chunk = bytes(chunk) + b'\x00' * (chunk_size - len(chunk))
 
             self.output_queue.append(chunk)
 
@@ -1571,9 +2293,16 @@ class CallHandler:
         """Gère l'interruption (barge-in) de l'utilisateur"""
         logger.info(f"[{self.call_id}] Barge-in detected - clearing output queue")
 
+        # Interrompre la chaîne LLM -> TTS et le flux TTS en cours (HTTP + FFmpeg dans le thread I/O)
+        if self.llm_cancel_event:
+            self.llm_cancel_event.set()
+        if self.tts_cancel_event:
+            self.tts_cancel_event.set()
+
         # Vider la queue de sortie immédiatement
         self.output_queue.clear()
         self.is_speaking = False
+        self.ducking = False
 
     async def _check_technician(self) -> bool:
         """Vérifie si un technicien est disponible via la charge réelle des tickets transférés."""
@@ -1582,12 +2311,11 @@ class CallHandler:
             window_minutes = getattr(config, "TECHNICIAN_LOAD_WINDOW_MIN", 10)
             max_active = getattr(config, "TECHNICIAN_MAX_ACTIVE_TRANSFERS", 5)
 
-            is_available = await db_utils.is_technician_available(
-                max_active=max_active,
-                window_minutes=window_minutes
-            )
+            # Fenêtre glissante en mémoire (amorcée depuis la DB, tenue à jour par LISTEN/NOTIFY)
+            load = db_utils.technician_load.count()
+            is_available = load < max_active
 
-            logger.info(f"[{self.call_id}] Technician availability (window {window_minutes}m, max {max_active}): {is_available}")
+            logger.info(f"[{self.call_id}] Technician availability (window {window_minutes}m, load {load}/{max_active}): {is_available}")
             return is_available
 
         except Exception as e:
@@ -1596,153 +2324,110 @@ class CallHandler:
             return True
 
     async def _cleanup(self):
-        """Nettoyage des ressources + sauvegarde ticket avec analyse LLM"""
+        """Libère les ressources de l'appel puis dépose le job de fin d'appel (analyse LLM + ticket)"""
         try:
-            # SAUVEGARDER LE TICKET DANS LA BASE DE DONNÉES
             call_duration = int(time.time() - self.call_start_time)
 
-            # Générer un résumé de la conversation via LLM
-            summary = "Appel traité par le voicebot."
-            classification = {'tag': 'UNKNOWN', 'severity': 'MEDIUM'}
-
-            if self.context.get('problem_type'):
-                try:
-                    # Construire un contexte de conversation
-                    conversation_context = (
-                        f"Type de problème: {self.context.get('problem_type', 'inconnu')}\n"
-                        f"État final: {self.state.value}\n"
-                        f"Durée: {call_duration}s\n"
-                        f"Infos utilisateur: {self.context.get('user_info', 'Non renseigné')}"
-                    )
-
-                    # Demander au LLM un résumé court
-                    summary = await self._ask_llm(
-                        conversation_context,
-                        system_prompt="Génère un résumé très court (1 phrase) de cet appel SAV."
-                    )
-
-                    # CLASSIFICATION AUTOMATIQUE avec tags stricts
-                    classification = await self._classify_problem(
-                        summary,
-                        self.context.get('problem_type', 'unknown')
-                    )
-
-                except Exception as e:
-                    logger.error(f"[{self.call_id}] Failed to generate summary/classification: {e}")
-                    summary = f"Problème {self.context.get('problem_type', 'inconnu')} traité."
-
-            # Déterminer le statut final
-            if self.state == ConversationState.GOODBYE:
-                status = "resolved"
-            elif self.state == ConversationState.TRANSFER:
-                status = "transferred"
-            else:
-                status = "failed"
-
-            # ANALYSE DE SENTIMENT VIA LLM (amélioration)
-            sentiment = await self._analyze_sentiment_llm(summary)
-
-            # Filtrer les mots critiques du summary pour éviter mauvaises interprétations
-            filtered_summary = self._filter_critical_words(summary)
-
-            # Récupérer infos client depuis le contexte
-            client_info = self.context.get('client_info', {})
-            client_name = None
-            client_email = None
+            # Fermer le writer en premier : Asterisk récupère la socket sans attendre le ticket
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+            except Exception as e:
+                logger.debug(f"[{self.call_id}] Error closing writer: {e}")
 
-            if client_info:
-                first_name = client_info.get('first_name', '')
-                last_name = client_info.get('last_name', '')
-                client_name = f"{first_name} {last_name}".strip() or None
-
-            # Récupérer email depuis user_info si renseigné
-            user_info = self.context.get('user_info', '')
-            if '@' in user_info:
-                # Extraire l'email du user_info
-                import re
-                email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', user_info)
-                if email_match:
-                    client_email = email_match.group(0)
-
-            # Date et heure de l'appel
-            now = datetime.now()
-            call_date = now.date()
-            call_time = now.time()
-
-            # Préparer les données du ticket
-            ticket_data = {
-                'call_uuid': self.call_id,
-                'phone_number': self.context.get('phone_number', self.call_id),  # Fallback sur call_id
-                'client_name': client_name,
-                'client_email': client_email,
-                'problem_type': self.context.get('problem_type', 'unknown'),
-                'status': status,
-                'sentiment': sentiment,
-                'summary': filtered_summary,  # Summary filtré sans mots critiques
-                'duration_seconds': call_duration,
-                'tag': classification['tag'],
-                'severity': classification['severity'],
-                'call_date': call_date,
-                'call_time': call_time
-            }
-
-            # Sauvegarder dans la DB
-            ticket_id = await db_utils.create_ticket(ticket_data)
-            if ticket_id:
-                logger.info(f"[{self.call_id}] Ticket saved: {ticket_id} (tag: {classification['tag']}, sentiment: {sentiment})")
-
-                # TRACKING MÉTRIQUES PROMETHEUS
+            # Fermer la connexion Deepgram
+            if self.deepgram_connection:
                 try:
-                    # Enregistrer l'appel complété
-                    metrics.track_call_completed(
-                        status=status,
-                        problem_type=self.context.get('problem_type', 'unknown'),
-                        duration=call_duration,
-                        sentiment=sentiment
-                    )
-
-                    # Enregistrer le ticket créé
-                    metrics.track_ticket_created(
-                        severity=classification['severity'],
-                        tag=classification['tag'],
-                        problem_type=self.context.get('problem_type', 'unknown')
-                    )
+                    await self.deepgram_connection.finish()
                 except Exception as e:
-                    logger.error(f"[{self.call_id}] Failed to track metrics: {e}")
-            else:
-                logger.warning(f"[{self.call_id}] Failed to save ticket")
+                    logger.debug(f"[{self.call_id}] Error closing Deepgram connection: {e}")
+                self.providers.release_deepgram_connection(self.deepgram_connection)
 
             # Fermer le fichier de log audio
             if self.audio_log_file:
                 self.audio_log_file.close()
 
-            # Fermer la connexion Deepgram
-            if self.deepgram_connection:
-                try:
-                    await self.deepgram_connection.finish()
-                except Exception as e:
-                    logger.debug(f"[{self.call_id}] Error closing Deepgram connection: {e}")
+            # Libérer l'entrée de l'annuaire AMI
+            self.caller_ids.forget(self.call_id)
 
-            # Fermer le writer
-            try:
-                self.writer.close()
-                await self.writer.wait_closed()
-            except Exception as e:
-                logger.debug(f"[{self.call_id}] Error closing writer: {e}")
+            # Abandonner un éventuel travail spéculatif (requête LLM en cours)
+            self.speculation.cancel()
+
+            # Résumé, classification, sentiment et ticket : traités par la file durable
+            await self.post_call.enqueue(self._post_call_job(call_duration))
 
+            logger.info(
+                f"[{self.call_id}] Playout stats: {self.playout_stats['frames_sent']} frames, "
+                f"{self.playout_stats['underruns']} underruns, "
+                f"{self.playout_stats['dropped']} dropped, "
+                f"max jitter {self.playout_stats['max_jitter_ms']:.1f}ms"
+            )
+            logger.info(
+                f"[{self.call_id}] VAD stats: {self.vad.stats['segments']} speech segments, "
+                f"{self.vad.speech_ratio:.0%} speech"
+            )
+            if self.speculation.stats['started']:
+                logger.info(
+                    f"[{self.call_id}] Speculation stats: {self.speculation.stats['hits']} hits / "
+                    f"{self.speculation.stats['started']} started ({self.speculation.hit_rate:.0%}), "
+                    f"{self.speculation.stats['saved_ms']:.0f}ms saved"
+                )
+            if self.uplink:
+                uplink = self.uplink.summary()
+                logger.info(
+                    f"[{self.call_id}] Deepgram uplink: {uplink['messages']} messages "
+                    f"({uplink['keepalives']} KeepAlive), {uplink['audio_bytes'] / 1024:.0f} KB, "
+                    f"{uplink['audio_seconds']}s audio, {uplink['suppressed_ratio']:.0%} silence suppressed"
+                )
             logger.info(f"[{self.call_id}] Cleanup completed")
 
         except Exception as e:
             logger.error(f"[{self.call_id}] Cleanup error: {e}")
 
+    def _post_call_job(self, call_duration: int) -> Dict:
+        """Données de l'appel nécessaires au ticket (sérialisables en JSON)"""
+        # Déterminer le statut final
+        if self.state == ConversationState.GOODBYE:
+            status = "resolved"
+        elif self.state == ConversationState.TRANSFER:
+            status = "transferred"
+        else:
+            status = "failed"
+
+        # Récupérer infos client depuis le contexte
+        client_info = self.context.get('client_info') or {}
+        client_name = None
+        if client_info:
+            first_name = client_info.get('first_name', '')
+            last_name = client_info.get('last_name', '')
+            client_name = f"{first_name} {last_name}".strip() or None
+
+        return {
+            'call_id': self.call_id,
+            'phone_number': self.context.get('phone_number'),
+            'client_name': client_name,
+            'problem_type': self.context.get('problem_type'),
+            'final_state': self.state.value,
+            'status': status,
+            'duration_seconds': call_duration,
+            'user_info': self.context.get('user_info', ''),
+            'turns': self.turns.to_records(),
+            'ended_at': time.time()
+        }
+
 
 # === AudioSocket Server ===
 class AudioSocketServer:
     """Serveur TCP AudioSocket principal"""
 
-    def __init__(self):
+    def __init__(self, providers: ProviderRegistry):
+        self.providers = providers
+        self.caller_ids = CallerIdDirectory()  # Session AMI unique (événements VarSet / Newchannel)
+        self.post_call = PostCallQueue(providers.llm)  # Analyse LLM + ticket après la fermeture de la socket
         self.audio_cache = AudioCache()
         self.process_pool = ProcessPoolExecutor(max_workers=config.PROCESS_POOL_WORKERS)
+        self.io_pool = ThreadPoolExecutor(max_workers=config.TTS_IO_THREADS, thread_name_prefix="tts-io")
+        self.playout = PlayoutScheduler()
         self.active_calls = 0
 
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
@@ -1844,6 +2529,11 @@ class AudioSocketServer:
                 writer=writer,
                 audio_cache=self.audio_cache,
                 process_pool=self.process_pool,
+                io_pool=self.io_pool,
+                playout=self.playout,
+                providers=self.providers,
+                caller_ids=self.caller_ids,
+                post_call=self.post_call,
                 phone_number=phone_number
             )
 
@@ -1865,6 +2555,18 @@ class AudioSocketServer:
             config.AUDIOSOCKET_PORT
         )
 
+        # Horloge de playout unique pour tous les appels
+        self.playout.start()
+
+        # Session AMI persistante : les numéros arrivent avant les handshakes
+        self.caller_ids.start()
+
+        # Workers de fin d'appel (reprend les jobs laissés par un arrêt précédent)
+        await self.post_call.start()
+
+        # Pool de décodeurs FFmpeg chauds (health check périodique)
+        asyncio.create_task(self._decoder_pool_maintenance())
+
         addr = server.sockets[0].getsockname()
         logger.info("=" * 60)
         logger.info(f"  AudioSocket Server started on {addr[0]}:{addr[1]}")
@@ -1876,10 +2578,36 @@ class AudioSocketServer:
         async with server:
             await server.serve_forever()
 
+    async def _decoder_pool_maintenance(self):
+        """Recycle périodiquement les décodeurs FFmpeg morts ou trop anciens"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self.io_pool,
+                audio_utils.init_decoder_pool,
+                config.FFMPEG_POOL_SIZE,
+                config.TTS_IO_THREADS,
+                config.FFMPEG_POOL_MAX_IDLE
+            )
+            while True:
+                await asyncio.sleep(config.FFMPEG_POOL_HEALTH_INTERVAL)
+                pool = audio_utils.get_decoder_pool()
+                if pool:
+                    await loop.run_in_executor(self.io_pool, pool.maintain)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"FFmpeg decoder pool maintenance error: {e}")
+            logger.warning("  Continuing with on-demand FFmpeg processes")
+
     def shutdown(self):
         """Arrêt propre du serveur"""
         logger.info("Shutting down server...")
+        self.playout.stop()
+        self.caller_ids.close()
         self.process_pool.shutdown(wait=True)
+        self.io_pool.shutdown(wait=False, cancel_futures=True)
+        audio_utils.close_decoder_pool()
 
 
 # === Main Entry Point ===
@@ -1896,6 +2624,12 @@ async def main():
         logger.info("Initializing database pools...")
         await db_utils.init_db_pools()
         logger.info("✓ Database pools ready")
+
+        # Charge techniciens en mémoire (plus de COUNT(*) à chaque décision de transfert)
+        db_utils.technician_load.start()
+
+        # Écriture des tickets par lots (rejoue le journal laissé par une panne précédente)
+        db_utils.ticket_writer.start()
     except Exception as e:
         logger.error(f" Failed to initialize database: {e}")
         logger.warning("  Continuing without database (tickets won't be saved)")
@@ -1909,13 +2643,20 @@ async def main():
         logger.error(f" Failed to start metrics server: {e}")
         logger.warning("  Continuing without metrics")
 
+    # CLIENTS FOURNISSEURS PARTAGÉS (une seule construction, connexions pré-chauffées)
+    providers = ProviderRegistry()
+    await providers.prewarm()
+    providers.start()
+
     # Créer le serveur
-    server = AudioSocketServer()
+    server = AudioSocketServer(providers)
 
     # Gérer les signaux pour arrêt propre
     def signal_handler(sig, frame):
         logger.info("Received shutdown signal")
         server.shutdown()
+        # Tickets pas encore écrits : journal disque (rejoués au prochain démarrage)
+        db_utils.ticket_writer.journal_pending()
         # Fermer les pools DB
         asyncio.create_task(db_utils.close_db_pools())
         os._exit(0)
@@ -1930,6 +2671,10 @@ async def main():
         logger.info("Server stopped by user")
     finally:
         server.shutdown()
+        await server.post_call.stop()
+        await providers.close()
+        await db_utils.technician_load.stop()
+        await db_utils.ticket_writer.stop()
         # Fermer les pools DB proprement
         await db_utils.close_db_pools()
 
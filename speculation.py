@@ -0,0 +1,153 @@
+"""
+Traitement spéculatif d'un tour de parole sur les transcriptions intermédiaires Deepgram
+Le travail (intention, type de problème, réponse LLM) démarre avant la transcription finale
+"""
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HIT = "hit"
+MISS = "miss"
+
+_PUNCTUATION = re.compile(r"[^\w\s@'-]")
+
+
+def normalize_transcript(text: str) -> str:
+    """Texte comparable entre interim et final (casse, ponctuation et espaces ignorés)"""
+    return " ".join(_PUNCTUATION.sub(" ", (text or "").lower()).split())
+
+
+class SpeculativeExecutor:
+    """
+    Exécuteur spéculatif d'un appel
+
+    Quand une transcription intermédiaire ne change plus pendant
+    SPECULATION_STABLE_MS, `prepare(state, texte)` est lancé (sans effet de
+    bord : ni audio, ni changement d'état). À l'arrivée de la transcription
+    finale, `take` renvoie son résultat si le texte et l'état correspondent
+    (hit) ; sinon la spéculation est annulée (miss) et le tour est traité
+    normalement.
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        prepare: Callable[[Any, str], Awaitable[Optional[Dict]]],
+        stable_ms: int = config.SPECULATION_STABLE_MS
+    ):
+        self.call_id = call_id
+        self.prepare = prepare
+        self.stable_delay = stable_ms / 1000
+
+        self._text = ""  # Dernière transcription intermédiaire (normalisée)
+        self._state = None
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None  # Début du travail spéculatif
+        self._done_at: Optional[float] = None
+
+        self.stats = {'started': 0, 'hits': 0, 'misses': 0, 'saved_ms': 0.0}
+
+    def on_interim(self, text: str, state):
+        """Transcription intermédiaire : (re)lance l'attente de stabilité si le texte a changé"""
+        normalized = normalize_transcript(text)
+        if not normalized or (normalized == self._text and state == self._state):
+            return
+
+        self._discard()
+        self._text = normalized
+        self._state = state
+        self._task = asyncio.create_task(self._run(text, state))
+
+    async def _run(self, text: str, state) -> Optional[Dict]:
+        await asyncio.sleep(self.stable_delay)
+
+        self._started_at = time.time()
+        self.stats['started'] += 1
+        logger.debug(f"[{self.call_id}] Speculating on stable interim: '{text}'")
+        try:
+            return await self.prepare(state, text)
+        finally:
+            self._done_at = time.time()
+
+    async def take(self, final_text: str, state) -> Optional[Dict]:
+        """
+        Résultat spéculatif pour la transcription finale (None si absent ou divergent)
+
+        Le travail encore en cours est attendu : il a déjà une avance sur un
+        traitement lancé maintenant.
+        """
+        task, started_at = self._task, self._started_at
+        matches = (
+            task is not None and started_at is not None
+            and state == self._state and normalize_transcript(final_text) == self._text
+        )
+
+        if not matches:
+            if started_at is not None:
+                logger.debug(f"[{self.call_id}] Speculation discarded (final: '{final_text}', interim: '{self._text}')")
+            self._discard()
+            return None
+
+        final_at = time.time()
+        self._task = None
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"[{self.call_id}] Speculative work failed: {e}")
+            result = None
+        done_at = self._done_at or final_at
+        self._reset()
+
+        if result is None:
+            self._record(MISS)
+            return None
+
+        # Avance prise : travail déjà effectué à l'arrivée de la transcription finale
+        saved = min(done_at, final_at) - started_at
+        self._record(HIT, saved)
+        logger.info(f"[{self.call_id}] Speculation hit: {saved * 1000:.0f}ms saved")
+        return result
+
+    def cancel(self):
+        """Abandonne la spéculation en cours sans la compter (fin d'appel)"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._reset()
+
+    def _discard(self):
+        """Annule la spéculation en cours ; comptée comme miss si le travail avait commencé"""
+        if self._started_at is not None:
+            self._record(MISS)
+        if self._task and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._reset()
+
+    def _reset(self):
+        self._text = ""
+        self._state = None
+        self._started_at = None
+        self._done_at = None
+
+    def _record(self, result: str, saved: Optional[float] = None):
+        self.stats['hits' if result == HIT else 'misses'] += 1
+        if saved is not None:
+            self.stats['saved_ms'] += saved * 1000
+        try:
+            metrics.track_speculation(result, saved)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track speculation: {e}")
+
+    @property
+    def hit_rate(self) -> float:
+        """Part des spéculations lancées dont le résultat a été utilisé"""
+        decided = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / decided if decided else 0.0
@@ -0,0 +1,105 @@
+"""
+Phrases statiques du voicebot (pré-générées par generate_cache.py)
+Empreinte TTS des phrases et récolte des phrases constantes du code serveur
+"""
+import ast
+import json
+import hashlib
+from pathlib import Path
+
+import config
+
+
+def tts_fingerprint(text: str) -> str:
+    """
+    Hash du texte et de tous les paramètres qui influencent l'audio produit
+    (voix, modèle, réglages de voix, format de sortie)
+    """
+    payload = json.dumps({
+        'text': text,
+        'voice_id': config.ELEVENLABS_VOICE_ID,
+        'model': config.ELEVENLABS_MODEL,
+        'stability': config.ELEVENLABS_STABILITY,
+        'similarity_boost': config.ELEVENLABS_SIMILARITY_BOOST,
+        'style': config.ELEVENLABS_STYLE,
+        'speaker_boost': config.ELEVENLABS_USE_SPEAKER_BOOST,
+        'output_format': config.ELEVENLABS_OUTPUT_FORMAT,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# Méthodes de synthèse dynamique dont les arguments constants sont pré-générés
+HARVESTED_SAY_METHODS = ("_say_dynamic", "_say_smart")
+SERVER_SOURCE_PATH = Path(__file__).parent / "server.py"
+HARVESTED_KEY_PREFIX = "auto_"
+
+
+def harvested_phrase_key(text: str) -> str:
+    """Clé stable d'une phrase récoltée (dérivée du texte)"""
+    return HARVESTED_KEY_PREFIX + hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+def harvest_constant_utterances(source_path: Path = SERVER_SOURCE_PATH) -> dict:
+    """
+    Récolte les phrases constantes passées à _say_dynamic / _say_smart dans le code serveur
+
+    Sont retenus les littéraux de chaîne et les variables locales dont toutes les
+    affectations sont des littéraux (ex: warning = "Attention, ..."). Les f-strings
+    et les appels avec variables de template (personnalisés) sont ignorés.
+
+    Returns:
+        Dict {clé: texte} des phrases à pré-générer
+    """
+    tree = ast.parse(source_path.read_text(encoding='utf-8'))
+    harvested = {}
+
+    for function in ast.walk(tree):
+        if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+
+        # Variables locales affectées uniquement avec des chaînes constantes
+        constants: dict = {}
+        non_constant = set()
+        for node in ast.walk(function):
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if not isinstance(target, ast.Name):
+                        continue
+                    if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                        constants.setdefault(target.id, set()).add(node.value.value)
+                    else:
+                        non_constant.add(target.id)
+
+        for node in ast.walk(function):
+            if not (
+                isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in HARVESTED_SAY_METHODS
+                and node.args
+                and not node.keywords
+            ):
+                continue
+
+            argument = node.args[0]
+            if isinstance(argument, ast.Constant) and isinstance(argument.value, str):
+                texts = {argument.value}
+            elif isinstance(argument, ast.Name) and argument.id in constants and argument.id not in non_constant:
+                texts = constants[argument.id]
+            else:
+                continue
+
+            for text in texts:
+                if text.strip():
+                    harvested[harvested_phrase_key(text)] = text
+
+    return harvested
+
+
+def all_static_phrases() -> dict:
+    """Phrases de config.CACHED_PHRASES + phrases constantes récoltées dans server.py"""
+    phrases = dict(config.CACHED_PHRASES)
+    known_texts = set(phrases.values())
+    for phrase_key, phrase_text in harvest_constant_utterances().items():
+        if phrase_text not in known_texts:
+            phrases[phrase_key] = phrase_text
+    return phrases
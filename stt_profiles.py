@@ -0,0 +1,105 @@
+"""
+Profils STT par état de conversation (endpointing, fin d'énoncé, mots-clés Deepgram)
+Une réponse oui/non n'attend pas l'endpointing d'une description de panne
+"""
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+from deepgram import LiveOptions
+
+import config
+
+logger = logging.getLogger(__name__)
+
+KEYWORDS_FILE = Path(__file__).parent / "stt_keywords.yaml"
+
+
+def load_keyword_categories(path: Path = KEYWORDS_FILE) -> Dict[str, List[str]]:
+    """
+    Charge les keywords de stt_keywords.yaml par catégorie
+
+    Returns:
+        Catégorie -> keywords formatés pour Deepgram (ex: {"firstnames": ["Pierre:3", ...]})
+    """
+    try:
+        if not path.exists():
+            logger.warning("stt_keywords.yaml not found, STT will work without keyword boosting")
+            return {}
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+
+        categories = {
+            category: keywords_list
+            for category, keywords_list in data.items()
+            if isinstance(keywords_list, list)
+        }
+
+        logger.info(f"✓ Loaded {sum(map(len, categories.values()))} STT keywords for improved recognition")
+        return categories
+
+    except Exception as e:
+        logger.error(f"Failed to load STT keywords: {e}")
+        return {}
+
+
+@dataclass(frozen=True)
+class SttProfile:
+    """Réglages d'une websocket Deepgram (fixés à l'ouverture de la connexion)"""
+    name: str
+    endpointing: int  # ms de silence avant la transcription finale
+    utterance_end_ms: int  # ms sans mot avant l'événement UtteranceEnd (>= 1000)
+    keywords: Tuple[str, ...]
+
+    def live_options(self) -> LiveOptions:
+        return LiveOptions(
+            model=config.DEEPGRAM_MODEL,
+            language=config.DEEPGRAM_LANGUAGE,
+            encoding=config.DEEPGRAM_ENCODING,
+            sample_rate=config.DEEPGRAM_SAMPLE_RATE,
+            channels=1,
+            interim_results=True,
+            punctuate=True,
+            vad_events=True,
+            endpointing=self.endpointing,
+            utterance_end_ms=str(self.utterance_end_ms),
+            keywords=list(self.keywords) if self.keywords else None  # Booste la reconnaissance des noms propres
+        )
+
+
+class SttProfiles:
+    """
+    Profils STT d'un appel (config.STT_PROFILES), résolus par état de conversation
+
+    Les mots-clés de chaque profil sont le sous-ensemble des catégories de
+    stt_keywords.yaml listées dans le profil (`None` : toutes les catégories).
+    """
+
+    def __init__(self, keyword_categories: Dict[str, List[str]]):
+        self.profiles: Dict[str, SttProfile] = {}
+        for name, settings in config.STT_PROFILES.items():
+            categories = settings.get('keywords')
+            if categories is None:
+                categories = list(keyword_categories)
+            keywords = tuple(
+                keyword for category in categories for keyword in keyword_categories.get(category, [])
+            )
+            self.profiles[name] = SttProfile(
+                name=name,
+                endpointing=settings['endpointing'],
+                utterance_end_ms=settings.get('utterance_end_ms', config.DEEPGRAM_UTTERANCE_END_MS),
+                keywords=keywords
+            )
+
+    @classmethod
+    def load(cls) -> "SttProfiles":
+        """Profils construits à partir de stt_keywords.yaml (relu à chaque appel)"""
+        return cls(load_keyword_categories())
+
+    def for_state(self, state: Optional[str]) -> SttProfile:
+        """Profil de l'état de conversation (valeur de ConversationState), profil par défaut sinon"""
+        name = config.STT_STATE_PROFILES.get(state, config.STT_DEFAULT_PROFILE)
+        return self.profiles[name]
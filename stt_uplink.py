@@ -0,0 +1,194 @@
+"""
+Envoi de l'audio d'un appel vers Deepgram (websocket live)
+Trames de 20ms regroupées en paquets pendant la parole, KeepAlive pendant le silence confirmé
+"""
+import logging
+import time
+from collections import deque
+from typing import Dict
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BYTES_PER_SECOND = config.SAMPLE_RATE_ASTERISK * config.SAMPLE_WIDTH
+
+
+def _frames(duration_ms: float) -> int:
+    """Nombre de trames AudioSocket (20ms) couvrant `duration_ms`"""
+    return max(1, round(duration_ms / (config.AUDIO_FRAME_DURATION * 1000)))
+
+
+class DeepgramUplink:
+    """
+    Émetteur audio d'un appel vers la websocket Deepgram
+
+    Reçoit chaque trame avec la décision de la VAD locale (CallHandler._update_vad) :
+    - parole : trames regroupées en paquets de DEEPGRAM_UPLINK_PACKET_MS
+      (50 messages/s -> 10 messages/s à 100ms). Au début de parole, le
+      pré-roll (DEEPGRAM_UPLINK_PREROLL_MS) est envoyé en tête pour ne pas
+      perdre l'attaque des mots (la VAD confirme après 60ms).
+    - fin de parole : le silence continue d'être envoyé pendant `tail_ms`
+      (endpointing Deepgram + marge) pour que la transcription finale arrive,
+      puis Finalize vide le tampon Deepgram.
+    - silence confirmé : plus d'audio (non facturé), un KeepAlive toutes les
+      DEEPGRAM_KEEPALIVE_INTERVAL secondes maintient la websocket ouverte.
+    """
+
+    def __init__(
+        self,
+        connection,
+        call_id: str,
+        packet_ms: int = config.DEEPGRAM_UPLINK_PACKET_MS,
+        preroll_ms: int = config.DEEPGRAM_UPLINK_PREROLL_MS,
+        tail_ms: int = config.DEEPGRAM_ENDPOINTING_LONG + config.DEEPGRAM_UPLINK_TAIL_MARGIN_MS,
+        keepalive_interval: float = config.DEEPGRAM_KEEPALIVE_INTERVAL,
+        suppress_silence: bool = config.DEEPGRAM_SILENCE_SUPPRESSION
+    ):
+        self.connection = connection
+        self.call_id = call_id
+        self.packet_bytes = _frames(packet_ms) * config.AUDIO_FRAME_BYTES
+        self.keepalive_interval = keepalive_interval
+        self.suppress_silence = suppress_silence
+        self.tail_ms = tail_ms
+
+        self._packet = bytearray()
+        self._preroll = deque(maxlen=_frames(preroll_ms))
+        self._streaming = False  # Audio transmis (parole ou fin de parole en cours)
+        self._silent_frames = 0  # Trames de silence depuis la dernière trame de parole
+        self._last_sent_at = time.monotonic()
+
+        self.stats = {
+            'frames': 0, 'suppressed_frames': 0,
+            'audio_messages': 0, 'audio_bytes': 0,
+            'keepalives': 0, 'finalizes': 0
+        }
+
+    @property
+    def tail_ms(self) -> int:
+        """Silence transmis après la fin de parole (ms)"""
+        return self._tail_frames * config.AUDIO_FRAME_DURATION * 1000
+
+    @tail_ms.setter
+    def tail_ms(self, value: int):
+        self._tail_frames = _frames(value)
+
+    @property
+    def idle(self) -> bool:
+        """Aucune parole en cours d'envoi (changement de websocket possible sans couper un énoncé)"""
+        return not self._streaming and not self._packet
+
+    async def switch_connection(self, connection, tail_ms: int):
+        """Envoie la suite de l'audio (pré-roll compris) sur une nouvelle websocket"""
+        await self.flush()
+        self.connection = connection
+        self.tail_ms = tail_ms
+
+    @property
+    def messages(self) -> int:
+        """Messages websocket envoyés (audio, KeepAlive et Finalize)"""
+        return self.stats['audio_messages'] + self.stats['keepalives'] + self.stats['finalizes']
+
+    @property
+    def suppressed_ratio(self) -> float:
+        """Part de l'audio reçu qui n'a pas été envoyée à Deepgram"""
+        if self.stats['frames'] == 0:
+            return 0.0
+        return self.stats['suppressed_frames'] / self.stats['frames']
+
+    async def push(self, chunk: bytes, speech: bool):
+        """
+        Transmet une trame reçue d'Asterisk
+
+        Args:
+            chunk: Trame audio RAW 16-bit (20ms)
+            speech: Décision de la VAD locale pour cette trame
+        """
+        self.stats['frames'] += 1
+
+        if not self.suppress_silence:
+            await self._append(chunk)
+            return
+
+        if speech:
+            self._silent_frames = 0
+            if not self._streaming:
+                # Début de parole : le pré-roll part en tête du premier paquet
+                self._streaming = True
+                self._packet.extend(b"".join(self._preroll))
+                self.stats['suppressed_frames'] -= len(self._preroll)
+                self._preroll.clear()
+            await self._append(chunk)
+            return
+
+        if self._streaming:
+            await self._append(chunk)
+            self._silent_frames += 1
+            if self._silent_frames >= self._tail_frames:
+                await self.flush()
+                self._streaming = False
+                await self._finalize()
+            return
+
+        # Silence confirmé : trame gardée en pré-roll, non envoyée
+        self._preroll.append(chunk)
+        self.stats['suppressed_frames'] += 1
+        await self.tick()
+
+    async def tick(self):
+        """KeepAlive si rien n'a été envoyé depuis DEEPGRAM_KEEPALIVE_INTERVAL (aussi appelé sans trame reçue)"""
+        if time.monotonic() - self._last_sent_at < self.keepalive_interval:
+            return
+        await self.flush()
+        if time.monotonic() - self._last_sent_at < self.keepalive_interval:
+            return
+        try:
+            await self.connection.keep_alive()
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Deepgram KeepAlive failed: {e}")
+        self._last_sent_at = time.monotonic()
+        self.stats['keepalives'] += 1
+        self._track('keepalive')
+
+    async def flush(self):
+        """Envoie le paquet en cours (même incomplet)"""
+        if not self._packet:
+            return
+        packet = bytes(self._packet)
+        self._packet.clear()
+        await self.connection.send(packet)
+        self._last_sent_at = time.monotonic()
+        self.stats['audio_messages'] += 1
+        self.stats['audio_bytes'] += len(packet)
+        self._track('audio', len(packet))
+
+    async def _append(self, chunk: bytes):
+        self._packet.extend(chunk)
+        if len(self._packet) >= self.packet_bytes:
+            await self.flush()
+
+    async def _finalize(self):
+        """Demande à Deepgram de transcrire l'audio restant (plus d'audio avant la prochaine parole)"""
+        try:
+            await self.connection.finalize()
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Deepgram Finalize failed: {e}")
+        self._last_sent_at = time.monotonic()
+        self.stats['finalizes'] += 1
+        self._track('finalize')
+
+    def _track(self, kind: str, size: int = 0):
+        try:
+            metrics.track_stt_uplink(kind, size, size / BYTES_PER_SECOND)
+        except Exception as e:
+            logger.debug(f"[{self.call_id}] Failed to track Deepgram uplink: {e}")
+
+    def summary(self) -> Dict:
+        """Compteurs de l'appel (logs de fin d'appel)"""
+        return {
+            **self.stats,
+            'messages': self.messages,
+            'audio_seconds': round(self.stats['audio_bytes'] / BYTES_PER_SECOND, 1),
+            'suppressed_ratio': round(self.suppressed_ratio, 3)
+        }
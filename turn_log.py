@@ -0,0 +1,161 @@
+"""
+Journal des tours de parole d'un appel (client / voicebot)
+Fenêtre de contexte LLM bornée en tokens : tours récents verbatim, tours anciens abrégés
+"""
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import config
+
+USER = "user"
+BOT = "assistant"
+ROLE_LABELS = {USER: "Client", BOT: "Voicebot"}
+_NOTE_HEADER_TOKENS = 20  # En-tête de la note des tours abrégés
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens (~4 caractères par token, sans tokenizer)"""
+    return len(text) // 4 + 1
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1].rstrip() + "…"
+
+
+@dataclass
+class Turn:
+    """Un tour de parole (les phrases consécutives d'un même locuteur sont regroupées)"""
+    role: str
+    text: str
+    at: float  # secondes depuis le début de l'appel
+
+    def line(self, max_chars: Optional[int] = None) -> str:
+        """Ligne lisible "[mm:ss] Client: ..." (éventuellement raccourcie)"""
+        text = _shorten(self.text, max_chars) if max_chars else self.text
+        minutes, seconds = divmod(int(self.at), 60)
+        return f"[{minutes:02d}:{seconds:02d}] {ROLE_LABELS.get(self.role, self.role)}: {text}"
+
+
+def _budgeted_lines(turns: List[Turn], budget_tokens: int, max_chars: Optional[int] = None) -> tuple:
+    """Lignes les plus récentes tenant dans le budget (ordre chronologique) et nombre de tours omis"""
+    lines = []
+    used = 0
+    index = len(turns)
+    while index > 0:
+        line = turns[index - 1].line(max_chars)
+        cost = estimate_tokens(line)
+        if used + cost > budget_tokens:
+            break
+        lines.append(line)
+        used += cost
+        index -= 1
+    lines.reverse()
+    return lines, index
+
+
+class TurnLog:
+    """
+    Journal compact des tours de parole d'un appel
+
+    Alimenté par CallHandler (_process_user_input pour le client, _say /
+    _say_dynamic pour le voicebot). Sert à la fois de contexte pour les
+    requêtes LLM pendant l'appel et de transcription stockée avec le ticket.
+    """
+
+    def __init__(
+        self,
+        started_at: Optional[float] = None,
+        max_turns: int = config.TURN_LOG_MAX_TURNS,
+        max_turn_chars: int = config.TURN_LOG_MAX_TURN_CHARS
+    ):
+        self.started_at = started_at or time.time()
+        self.max_turns = max_turns
+        self.max_turn_chars = max_turn_chars
+        self.turns: List[Turn] = []
+        self.dropped = 0  # Tours abandonnés (au-delà de max_turns)
+
+    def add(self, role: str, text: str):
+        """
+        Ajoute une phrase ; regroupée avec le tour précédent s'il vient du même locuteur
+
+        Au-delà de max_turn_chars, la phrase ouvre un nouveau tour du même
+        locuteur : la fin d'un long tour (question posée par le bot, fin
+        d'une description de panne) n'est jamais perdue.
+        """
+        text = " ".join((text or "").split())
+        if not text:
+            return
+
+        if self.turns and self.turns[-1].role == role:
+            last = self.turns[-1]
+            merged = f"{last.text} {text}"
+            if len(merged) <= self.max_turn_chars:
+                last.text = merged
+                return
+
+        self.turns.append(Turn(role, _shorten(text, self.max_turn_chars), round(time.time() - self.started_at, 1)))
+        if len(self.turns) > self.max_turns:
+            del self.turns[0]
+            self.dropped += 1
+
+    def context_messages(
+        self,
+        budget_tokens: int = config.LLM_CONTEXT_BUDGET_TOKENS,
+        recent_turns: int = config.LLM_CONTEXT_RECENT_TURNS
+    ) -> List[Dict[str, str]]:
+        """
+        Historique de l'appel au format chat, borné à `budget_tokens`
+
+        Les `recent_turns` derniers tours sont envoyés verbatim (rôles user /
+        assistant) ; les tours plus anciens sont abrégés dans une seule note
+        système, puis omis quand le budget est atteint. La taille du prompt
+        (et donc la latence LLM) reste stable quelle que soit la durée de l'appel.
+        """
+        messages = []
+        used = 0
+        index = len(self.turns)
+
+        # 1. Tours récents, du plus récent au plus ancien (le dernier est toujours envoyé)
+        while index > 0 and len(messages) < recent_turns:
+            turn = self.turns[index - 1]
+            cost = estimate_tokens(turn.text)
+            if messages and used + cost > budget_tokens:
+                break
+            messages.append({"role": turn.role, "content": turn.text})
+            used += cost
+            index -= 1
+        messages.reverse()
+
+        # 2. Tours plus anciens : lignes raccourcies dans la limite du budget restant
+        earlier, omitted = _budgeted_lines(
+            self.turns[:index], budget_tokens - used - _NOTE_HEADER_TOKENS, config.LLM_CONTEXT_COMPRESSED_TURN_CHARS
+        )
+        omitted += self.dropped
+
+        if earlier or omitted:
+            header = "Début de la conversation (abrégé)"
+            if omitted:
+                header += f", {omitted} échange(s) plus ancien(s) omis"
+            messages.insert(0, {"role": "system", "content": "\n".join([header + " :", *earlier])})
+
+        return messages
+
+    def to_records(self) -> List[Dict]:
+        """Tours sérialisables (job de fin d'appel, colonne tickets.turn_log)"""
+        return [asdict(turn) for turn in self.turns]
+
+
+def transcript_text(records: List[Dict], budget_tokens: int = config.POST_CALL_TRANSCRIPT_BUDGET_TOKENS) -> str:
+    """
+    Transcription lisible d'un journal sérialisé, bornée à `budget_tokens`
+
+    Les tours les plus récents sont conservés (fin d'appel : issue du diagnostic).
+    """
+    turns = [Turn(record['role'], record['text'], record.get('at', 0)) for record in records or []]
+    lines, omitted = _budgeted_lines(turns, budget_tokens)
+    if omitted:
+        lines.insert(0, f"({omitted} échange(s) plus ancien(s) omis)")
+    return "\n".join(lines)
@@ -0,0 +1,147 @@
+"""
+Détection locale d'activité vocale (VAD) sur les trames AudioSocket 8kHz 16-bit
+Énergie et taux de passage par zéro vectorisés (NumPy), plancher de bruit adaptatif et hangover
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+import config
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+FRAME_SAMPLES = config.AUDIO_FRAME_BYTES // config.SAMPLE_WIDTH  # 160 échantillons (20ms)
+FULL_SCALE_POWER = 32768.0 ** 2
+
+
+def frame_features(pcm: bytes, frame_samples: int = FRAME_SAMPLES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Énergie (dBFS) et taux de passage par zéro de chaque trame
+
+    Args:
+        pcm: Audio RAW 16-bit (une ou plusieurs trames de 20ms)
+
+    Returns:
+        (énergie en dBFS, taux de passage par zéro entre 0 et 1), une valeur par trame
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16, count=len(pcm) // 2)
+    usable = len(samples) - len(samples) % frame_samples
+    frames = samples[:usable].reshape(-1, frame_samples).astype(np.float32)
+
+    energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) / FULL_SCALE_POWER + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_samples - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """
+    VAD par trame pour un appel (aucune I/O, quelques µs par trame)
+
+    Une trame est voisée si son énergie dépasse le plancher de bruit de
+    VAD_SNR_DB (et VAD_MIN_ENERGY_DB).
+    - début de parole après VAD_ONSET_FRAMES trames voisées consécutives dont
+      le taux de passage par zéro reste sous VAD_MAX_ZCR (voyelles ; le souffle
+      et le bruit large bande ne déclenchent pas)
+    - fin de parole après VAD_HANGOVER_FRAMES trames non voisées (les
+      fricatives, voisées mais bruitées, prolongent le segment)
+    Le plancher de bruit suit vite les baisses d'énergie et monte lentement,
+    pour s'adapter au bruit de fond de la ligne sans absorber la parole.
+    """
+
+    def __init__(
+        self,
+        snr_db: float = config.VAD_SNR_DB,
+        min_energy_db: float = config.VAD_MIN_ENERGY_DB,
+        max_zcr: float = config.VAD_MAX_ZCR,
+        onset_frames: int = config.VAD_ONSET_FRAMES,
+        hangover_frames: int = config.VAD_HANGOVER_FRAMES
+    ):
+        self.snr_db = snr_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.onset_frames = onset_frames
+        self.hangover_frames = hangover_frames
+
+        self.noise_floor_db = config.VAD_INITIAL_NOISE_DB
+        self.is_speech = False
+        self._voiced_run = 0  # Trames voisées consécutives (avant le début de parole)
+        self._unvoiced_run = 0  # Trames non voisées depuis la dernière trame voisée
+        self.segment_frames = 0  # Durée du segment de parole en cours (trames)
+        self.segment_voiced_frames = 0  # Trames voisées du segment (hors hangover)
+
+        self.stats = {'frames': 0, 'speech_frames': 0, 'segments': 0}
+
+    @property
+    def segment_ms(self) -> float:
+        """Durée du segment de parole en cours (ms)"""
+        return self.segment_frames * config.AUDIO_FRAME_DURATION * 1000
+
+    @property
+    def voiced_ms(self) -> float:
+        """Parole effective du segment en cours (ms, sans les trames de hangover)"""
+        return self.segment_voiced_frames * config.AUDIO_FRAME_DURATION * 1000
+
+    def process(self, pcm: bytes, margin_db: float = 0.0) -> Optional[str]:
+        """
+        Analyse une ou plusieurs trames
+
+        Args:
+            pcm: Audio RAW 16-bit reçu d'AudioSocket
+            margin_db: Marge ajoutée au seuil (ex: pendant que le bot parle)
+
+        Returns:
+            SPEECH_START, SPEECH_END ou None
+        """
+        energy_db, zcr = frame_features(pcm)
+        event = None
+
+        for energy, crossings in zip(energy_db.tolist(), zcr.tolist()):
+            threshold = max(self.noise_floor_db + self.snr_db + margin_db, self.min_energy_db)
+            voiced = energy > threshold
+
+            self._update_noise_floor(energy, voiced)
+            self.stats['frames'] += 1
+
+            if not self.is_speech:
+                # Début de parole : trames voisées ET peu de passages par zéro (écarte souffle et bruit large bande)
+                onset = voiced and crossings <= self.max_zcr
+                self._voiced_run = self._voiced_run + 1 if onset else 0
+                if self._voiced_run >= self.onset_frames:
+                    self.is_speech = True
+                    self._unvoiced_run = 0
+                    self.segment_frames = self._voiced_run
+                    self.segment_voiced_frames = self._voiced_run
+                    self.stats['segments'] += 1
+                    event = SPEECH_START
+            else:
+                self.segment_frames += 1
+                if voiced:
+                    self.segment_voiced_frames += 1
+                self._unvoiced_run = 0 if voiced else self._unvoiced_run + 1
+                if self._unvoiced_run > self.hangover_frames:
+                    self.is_speech = False
+                    self._voiced_run = 0
+                    event = SPEECH_END
+
+            if self.is_speech:
+                self.stats['speech_frames'] += 1
+
+        return event
+
+    def _update_noise_floor(self, energy: float, voiced: bool):
+        if energy < self.noise_floor_db:
+            rate = config.VAD_NOISE_DOWN_RATE
+        elif voiced:
+            # Montée très lente pendant la parole : un bruit de fond qui augmente durablement finit par être absorbé
+            rate = config.VAD_NOISE_UP_RATE / 10
+        else:
+            rate = config.VAD_NOISE_UP_RATE
+        self.noise_floor_db += rate * (energy - self.noise_floor_db)
+
+    @property
+    def speech_ratio(self) -> float:
+        if self.stats['frames'] == 0:
+            return 0.0
+        return self.stats['speech_frames'] / self.stats['frames']